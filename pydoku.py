@@ -1,11 +1,18 @@
 #!/usr/bin/env python3.13
-import numpy as np
+import functools
+import importlib
 import random
 import time
 import math
 import sys
 import os
+import mmap
+import struct
+import threading
+from collections import OrderedDict, deque
 from datetime import datetime
+from itertools import combinations, count, cycle, islice
+from operator import itemgetter
 
 # ANSI Color Codes
 BLUE = "\033[94m"  # Bright blue for clues
@@ -14,53 +21,4136 @@ BOLD = "\033[1m"
 YELLOW_BG = "\033[103m"  # Bright yellow background for cursor
 RESET = "\033[0m"
 
-def cell_has_conflict(player_flat, row, col):
-    num = player_flat[row, col]
-    if num == 0:
+class _LazyModule:
+    """Placeholder for a slow-to-import module, bound under its usual global name.
+
+    The first attribute access imports the real module and rebinds the global, so
+    the menu can be drawn before NumPy has loaded and later lookups skip the proxy.
+    """
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+np = _LazyModule("numpy", "np")
+sqlite3 = _LazyModule("sqlite3", "sqlite3")
+asyncio = _LazyModule("asyncio", "asyncio")
+json = _LazyModule("json", "json")
+STARTUP_BUDGET_MS = 120  # launch to first menu prompt, see startup-check
+
+WARM_PUZZLES = {}  # remove count -> a puzzle warm_up made for the first PuzzlePool
+
+def warm_up():
+    """Import NumPy and make one puzzle per difficulty on a daemon thread while the user reads the first menu.
+
+    The puzzles wait for the returned event, set just before the menu prompt, so
+    generating them never holds up the first screen.
+    """
+    menu_shown = threading.Event()
+    threading.Thread(target=_warm_up, args=(menu_shown,), daemon=True, name="pydoku-warmup").start()
+    return menu_shown
+
+def _warm_up(menu_shown):
+    importlib.import_module("numpy")
+    menu_shown.wait()
+    for remove_count in SERVE_DIFFICULTIES.values():
+        WARM_PUZZLES.setdefault(remove_count, generate_puzzle(remove_count))
+
+PROFILE_PATH = os.environ.get("PYDOKU_PROFILE_FILE", "pydoku_profile.json")
+
+class TimingHistogram:
+    """Log-scale latency histogram: ten buckets per decade from 1 us up to 100 s."""
+    BUCKETS = 80
+    def __init__(self):
+        self.counts = [0] * (self.BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    def add(self, seconds):
+        k = 0 if seconds <= 1e-6 else min(self.BUCKETS, int(math.log10(seconds * 1e6) * 10) + 1)
+        self.counts[k] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile, in seconds."""
+        target = q / 100 * self.count
+        seen = 0
+        for k, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return min(1e-6 * 10 ** (k / 10), self.max)
+        return self.max
+    def summary(self):
+        return {"count": self.count, "mean_ms": self.total / self.count * 1e3 if self.count else 0.0,
+                **{f"p{q}_ms": self.percentile(q) * 1e3 for q in (50, 90, 99)}, "max_ms": self.max * 1e3}
+
+class Instrumentation:
+    """Opt-in hot-path timing, enabled with PYDOKU_PROFILE=1 or the --profile flag.
+
+    timed() hands back the undecorated function when disabled, so instrumented code
+    pays nothing. Percentiles are written to PROFILE_PATH on exit. PYDOKU_CPROFILE=PATH
+    also records a cProfile of the session, sampled with probability
+    PYDOKU_CPROFILE_RATE (default 1).
+    """
+    def __init__(self, enabled=False, path=PROFILE_PATH, cprofile_path=None):
+        self.enabled = enabled
+        self.path = path
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.profiler = None
+        self.cprofile_path = cprofile_path
+        if enabled or cprofile_path:
+            import atexit
+            atexit.register(self.dump)
+        if cprofile_path:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+    @classmethod
+    def from_environment(cls, argv=()):
+        enabled = os.environ.get("PYDOKU_PROFILE", "") not in ("", "0") or "--profile" in argv
+        cprofile_path = os.environ.get("PYDOKU_CPROFILE")
+        if cprofile_path and random.random() >= float(os.environ.get("PYDOKU_CPROFILE_RATE", "1")):
+            cprofile_path = None
+        return cls(enabled, cprofile_path=cprofile_path)
+    def record(self, event, seconds):
+        with self.lock:
+            histogram = self.histograms.get(event)
+            if histogram is None:
+                histogram = self.histograms[event] = TimingHistogram()
+            histogram.add(seconds)
+    def timed(self, event):
+        def decorate(fn):
+            if not self.enabled:
+                return fn
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(event, time.perf_counter() - start)
+            return wrapper
+        return decorate
+    def report(self):
+        with self.lock:
+            return {event: h.summary() for event, h in sorted(self.histograms.items())}
+    def dump(self):
+        import multiprocessing
+        if multiprocessing.parent_process() is not None:
+            return  # worker processes inherit the settings but only the session process reports
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.cprofile_path)
+        if self.enabled and self.histograms:
+            import json
+            with open(self.path, "w") as f:
+                json.dump(self.report(), f, indent=2)
+
+INSTRUMENTATION = Instrumentation.from_environment(sys.argv if __name__ == "__main__" else ())
+timed = INSTRUMENTATION.timed
+
+class BoardState:
+    """Player Board plus per-row/column/box digit counts, updated in O(1) on every change.
+
+    Also keeps a candidate bitmask per cell (bit d-1 for digit d, 0 on filled cells) and
+    the pencil marks in the same encoding, as flat per-cell lists. Writes must go
+    through set() so all of it stays in step with the wrapped Board, whose geometry
+    sets the grid size. With track_candidates=False the per-cell candidates,
+    auto-notes and redraw tracking are skipped, for headless use where nothing
+    draws them.
+    """
+    def __init__(self, player, solution, track_candidates=True):
+        self.player = Board.of(player)
+        self.solution = Board.of(solution)
+        self.geometry = geo = self.player.geometry
+        n = geo.size
+        self.row_counts = [[0] * (n + 1) for _ in range(n)]
+        self.col_counts = [[0] * (n + 1) for _ in range(n)]
+        self.box_counts = [[0] * (n + 1) for _ in range(n)]
+        self.row_used = [0] * n
+        self.col_used = [0] * n
+        self.box_used = [0] * n
+        self.correct = [0] * (n + 1)
+        self.candidates = [0] * geo.cells
+        self.notes = [0] * geo.cells
+        self.auto_notes = False
+        self.track_candidates = track_candidates
+        self.changed = set(range(geo.cells))  # cells whose value, candidates or notes changed since the last redraw
+        for i, num in enumerate(self.player.cells):
+            self._count(i, num, 1)
+        if track_candidates:
+            for i in range(geo.cells):
+                self._refresh(i)
+    def _count(self, i, num, delta):
+        if num:
+            geo = self.geometry
+            r, c, b = geo.row_of[i], geo.col_of[i], geo.box_of[i]
+            self.row_counts[r][num] += delta
+            self.col_counts[c][num] += delta
+            self.box_counts[b][num] += delta
+            bit = 1 << (num - 1)
+            for used, k, n in ((self.row_used, r, self.row_counts[r][num]),
+                               (self.col_used, c, self.col_counts[c][num]),
+                               (self.box_used, b, self.box_counts[b][num])):
+                used[k] = used[k] | bit if n else used[k] & ~bit
+            if num == self.solution.cells[i]:
+                self.correct[num] += delta
+    def _refresh(self, i, cleared=False):
+        if self.player.cells[i]:
+            cand = 0
+        else:
+            geo = self.geometry
+            cand = geo.all_digits & ~(self.row_used[geo.row_of[i]] | self.col_used[geo.col_of[i]]
+                                      | self.box_used[geo.box_of[i]])
+        self.candidates[i] = cand
+        if self.auto_notes:
+            self.notes[i] = cand if cleared else self.notes[i] & cand
+    def set(self, r, c, num):
+        peers = self.geometry.peers
+        i = r * self.geometry.size + c
+        cells = self.player.cells
+        self._count(i, cells[i], -1)
+        cells[i] = num
+        self._count(i, num, 1)
+        if self.track_candidates:
+            self._refresh(i, cleared=num == 0)
+            for p in peers[i]:
+                self._refresh(p)
+            self.changed.add(i)
+            self.changed.update(peers[i])
+    def candidate_count(self, r, c):
+        geo = self.geometry
+        i = r * geo.size + c
+        if self.track_candidates:
+            return geo.popcount[self.candidates[i]]
+        if self.player.cells[i]:
+            return 0
+        return geo.popcount[geo.all_digits & ~(self.row_used[r] | self.col_used[c] | self.box_used[geo.box_of[i]])]
+    def note_digits(self, r, c):
+        return [k + 1 for k in self.geometry.mask_digit_indexes[self.notes[r * self.geometry.size + c]]]
+    def toggle_note(self, r, c, num):
+        i = r * self.geometry.size + c
+        self.notes[i] ^= 1 << (num - 1)
+        self.changed.add(i)
+    def clear_notes(self, r, c):
+        self.set_notes(r, c, 0)
+    def set_notes(self, r, c, mask):
+        i = r * self.geometry.size + c
+        self.notes[i] = mask
+        self.changed.add(i)
+    def set_auto_notes(self, on):
+        """Turn auto-notes on (filling every empty cell's marks from its candidates) or off."""
+        self.auto_notes = on
+        if on:
+            self.notes[:] = self.candidates
+            self.changed.update(range(self.geometry.cells))
+    def take_changes(self):
+        changed, self.changed = self.changed, set()
+        return changed
+    def has_conflict(self, r, c):
+        i = r * self.geometry.size + c
+        num = self.player.cells[i]
+        if num == 0:
+            return False
+        return (self.row_counts[r][num] > 1 or self.col_counts[c][num] > 1
+                or self.box_counts[self.geometry.box_of[i]][num] > 1)
+    def correct_count(self, num):
+        """How many of digit num sit where the solution has them."""
+        return self.correct[num]
+    def solved(self):
+        return sum(self.correct) == self.geometry.cells
+
+# Bitmask solver tables: cells are indexed row-major and digit d is bit 1 << (d - 1)
+class _MaskTable(dict):
+    """Mask-indexed lookup filled in on first use, for grids whose full table would be too big."""
+    def __init__(self, fn):
+        super().__init__()
+        self.fn = fn
+    def __missing__(self, mask):
+        value = self[mask] = self.fn(mask)
+        return value
+
+class Geometry:
+    """Index tables for an N x N grid of box x box boxes, N = box * box.
+
+    The 9x9 tables are also bound to the module-level names below. POPCOUNT-style
+    tables are full lists for 9x9 and _MaskTable caches above that, where a list would
+    need 2**N entries. Use geometry(box) rather than building one directly.
+    """
+    def __init__(self, box):
+        n = box * box
+        self.box, self.size, self.cells = box, n, n * n
+        self.all_digits = (1 << n) - 1
+        self.row_units = [[r * n + c for c in range(n)] for r in range(n)]
+        self.col_units = [[r * n + c for r in range(n)] for c in range(n)]
+        self.box_units = [[(box * (b // box) + r) * n + box * (b % box) + c for r in range(box) for c in range(box)]
+                          for b in range(n)]
+        self.units = self.row_units + self.col_units + self.box_units
+        self.row_of = [i // n for i in range(n * n)]
+        self.col_of = [i % n for i in range(n * n)]
+        self.box_of = [box * (i // (n * box)) + (i % n) // box for i in range(n * n)]
+        self.unit_getters = [(unit, itemgetter(*unit)) for unit in self.units]
+        self.row_peers = [[p for p in self.row_units[self.row_of[i]] if p != i] for i in range(n * n)]
+        self.col_peers = [[p for p in self.col_units[self.col_of[i]] if p != i] for i in range(n * n)]
+        self.box_peers = [[p for p in self.box_units[self.box_of[i]] if p != i] for i in range(n * n)]
+        self.peers = [sorted(set(self.row_units[self.row_of[i]] + self.col_units[self.col_of[i]]
+                                 + self.box_units[self.box_of[i]]) - {i}) for i in range(n * n)]
+        self.bit_digit = {1 << k: k + 1 for k in range(n)}
+        mask_bits = lambda m: [1 << k for k in range(n) if m >> k & 1]
+        mask_digit_indexes = lambda m: [k for k in range(n) if m >> k & 1]
+        if n <= 9:
+            self.popcount = [bin(m).count("1") for m in range(self.all_digits + 1)]
+            self.mask_bits = [mask_bits(m) for m in range(self.all_digits + 1)]
+            self.mask_digit_indexes = [mask_digit_indexes(m) for m in range(self.all_digits + 1)]
+        else:
+            self.popcount = _MaskTable(int.bit_count)
+            self.mask_bits = _MaskTable(mask_bits)
+            self.mask_digit_indexes = _MaskTable(mask_digit_indexes)
+    def symbol(self, digit):
+        """The character shown for digit: 1-9, then letters from A on bigger grids."""
+        return SYMBOLS[digit - 1] if digit else "0"
+    def digit(self, char):
+        """Inverse of symbol(); None for characters that are not a digit of this grid."""
+        k = SYMBOLS.find(char.upper()) if len(char) == 1 else -1
+        return k + 1 if 0 <= k < self.size else None
+
+SYMBOLS = "123456789ABCDEFGHIJKLMNOP"
+BOX_SIZES = (3, 4, 5)  # 9x9, 16x16 and 25x25
+_GEOMETRIES = {}
+
+def geometry(box=3):
+    """Shared Geometry for box x box boxes."""
+    geo = _GEOMETRIES.get(box)
+    if geo is None:
+        if not 2 <= box <= 5:
+            raise ValueError(f"unsupported box size {box}; grids run from 4x4 to 25x25")
+        geo = _GEOMETRIES[box] = Geometry(box)
+    return geo
+def box_of_cells(count):
+    """The box size of a grid with count cells, or None if no supported grid has that many."""
+    for box in range(2, 6):
+        if box ** 4 == count:
+            return box
+    return None
+
+GEOMETRY = geometry(3)
+ALL_DIGITS = GEOMETRY.all_digits
+ROW_UNITS, COL_UNITS, BOX_UNITS, UNITS = GEOMETRY.row_units, GEOMETRY.col_units, GEOMETRY.box_units, GEOMETRY.units
+ROW_OF, COL_OF, BOX_OF = GEOMETRY.row_of, GEOMETRY.col_of, GEOMETRY.box_of
+ROW_MASKS, COL_MASKS, BOX_MASKS = ([sum(1 << i for i in unit) for unit in units] for units in (ROW_UNITS, COL_UNITS, BOX_UNITS))
+UNIT_MASKS = ROW_MASKS + COL_MASKS + BOX_MASKS
+BOX_LINES = [(BOX_MASKS[b], [ROW_MASKS[3 * (b // 3) + k] for k in range(3)] + [COL_MASKS[3 * (b % 3) + k] for k in range(3)])
+             for b in range(9)]
+UNIT_GETTERS = GEOMETRY.unit_getters
+PEERS = GEOMETRY.peers
+POPCOUNT = GEOMETRY.popcount
+MASK_BITS = GEOMETRY.mask_bits
+BIT_DIGIT = GEOMETRY.bit_digit
+MASK_DIGIT_INDEXES = GEOMETRY.mask_digit_indexes
+
+class Board:
+    """An N x N grid in one contiguous N*N-byte buffer, row-major, 0 for an empty cell.
+
+    Cells are read and written by flat index or (row, col) pair. copy() and snapshot()
+    are single buffer copies, and view() is a zero-copy (N, N) uint8 NumPy array over
+    the same bytes for the code that wants one. geometry holds the size and each
+    cell's peers, row_peers, col_peers and box_peers.
+    """
+    __slots__ = ("cells", "geometry")
+    def __init__(self, cells=None, box=3):
+        self.geometry = geometry(box)
+        self.cells = bytearray(self.geometry.cells) if cells is None else bytearray(cells)
+    @classmethod
+    def from_array(cls, grid):
+        """Copy a NumPy grid of any shape, e.g. generate_puzzle's (3, 3, 3, 3) arrays."""
+        grid = np.asarray(grid, dtype=np.uint8)
+        box = box_of_cells(grid.size)
+        if box is None:
+            raise ValueError(f"a grid of {grid.size} cells is not a supported board")
+        return cls(grid.tobytes(), box)
+    @classmethod
+    def of(cls, grid):
+        """grid itself if it is already a Board, otherwise a Board copied from it."""
+        return grid if isinstance(grid, cls) else cls.from_array(grid)
+    @property
+    def size(self):
+        return self.geometry.size
+    def __getitem__(self, key):
+        if key.__class__ is tuple:
+            return self.cells[key[0] * self.geometry.size + key[1]]
+        return self.cells[key]
+    def __setitem__(self, key, num):
+        if key.__class__ is tuple:
+            key = key[0] * self.geometry.size + key[1]
+        self.cells[key] = num
+    def __eq__(self, other):
+        return isinstance(other, Board) and self.cells == other.cells
+    def __repr__(self):
+        return f"Board({bytes(self.cells)!r}, box={self.geometry.box})"
+    def copy(self):
+        return Board(self.cells, self.geometry.box)
+    def snapshot(self):
+        """Immutable copy of the cells, restorable with restore()."""
+        return bytes(self.cells)
+    def restore(self, snapshot):
+        self.cells[:] = snapshot
+    def view(self):
+        n = self.geometry.size
+        return np.frombuffer(self.cells, dtype=np.uint8).reshape(n, n)
+    def to_string(self):
+        """The digit string used by puzzle files, 0 for empty (letters from A past 9)."""
+        return "".join(self.geometry.symbol(d) for d in self.cells)
+
+def _bm_place(grid, cand, i, bit, geo=GEOMETRY):
+    """Place bit's digit at cell i and prune it from the peers.
+
+    Returns the peers left with a single candidate, or None on a contradiction.
+    """
+    grid[i] = geo.bit_digit[bit]
+    cand[i] = 0
+    singles = []
+    for p in geo.peers[i]:
+        m = cand[p]
+        if m & bit:
+            m ^= bit
+            if not m:
+                return None
+            cand[p] = m
+            if not m & (m - 1):
+                singles.append(p)
+    return singles
+def _bm_propagate(grid, cand, pending, hidden_singles=True, geo=GEOMETRY):
+    while True:
+        while pending:
+            i = pending.pop()
+            if grid[i]:
+                continue
+            singles = _bm_place(grid, cand, i, cand[i], geo)
+            if singles is None:
+                return False
+            pending.extend(singles)
+        if not hidden_singles:
+            return True
+        for unit, getter in geo.unit_getters:
+            once = twice = 0
+            for m in getter(cand):
+                twice |= once & m
+                once |= m
+            hidden = once & ~twice
+            if hidden:
+                for i in unit:
+                    m = cand[i] & hidden
+                    if m:
+                        if m & (m - 1):
+                            return False  # two digits can only go in this one cell
+                        cand[i] = m
+                        pending.append(i)
+        if not pending:
+            return True
+class _SearchBudgetExceeded(Exception):
+    pass
+
+def _bm_solutions(grid, cand, pending, rng=None, geo=GEOMETRY, hidden_singles=True, budget=None):
+    """Depth-first search yielding every solution, branching on the cell with the fewest candidates.
+
+    budget, a one-item list, caps the nodes visited; running out raises
+    _SearchBudgetExceeded. Big grids need it, where an unlucky branch order can
+    otherwise run for minutes.
+    """
+    if budget is not None:
+        budget[0] -= 1
+        if budget[0] < 0:
+            raise _SearchBudgetExceeded
+    if not _bm_propagate(grid, cand, pending, hidden_singles, geo):
+        return
+    popcount = geo.popcount
+    best, best_count = -1, geo.size + 1
+    for i in range(geo.cells):
+        if not grid[i]:
+            n = popcount[cand[i]]
+            if n < best_count:
+                best, best_count = i, n
+                if n == 2:
+                    break
+    if best < 0:
+        yield grid
+        return
+    bits = geo.mask_bits[cand[best]]
+    if rng is not None:
+        bits = bits[:]
+        rng.shuffle(bits)
+    for bit in bits:
+        branch = cand[:]
+        branch[best] = bit
+        yield from _bm_solutions(grid[:], branch, [best], rng, geo, hidden_singles, budget)
+def _bm_search(grid, cand, pending, limit, found, rng=None, hidden_singles=True, geo=GEOMETRY, budget=None):
+    """Append up to limit solutions to found; the search stops as soon as it has them."""
+    found.extend(islice(_bm_solutions(grid, cand, pending, rng, geo, hidden_singles, budget), limit - len(found)))
+def _bm_load(cells, geo=GEOMETRY):
+    grid = [0] * geo.cells
+    cand = [geo.all_digits] * geo.cells
+    pending = []
+    for i, d in enumerate(cells):
+        if d:
+            bit = 1 << (d - 1)
+            if not cand[i] & bit:
+                return None  # clashes with a given already placed
+            singles = _bm_place(grid, cand, i, bit, geo)
+            if singles is None:
+                return None
+            pending.extend(singles)
+    return grid, cand, pending
+def _cells_to_grid(cells, box=3):
+    return np.array(cells, dtype=int).reshape(box, box, box, box)
+
+FILL_RESTART_NODES = 2000
+
+class Solver:
+    """Interface of the interchangeable solver backends; make_solver() picks one.
+
+    Puzzles are any 81-, 256- or 625-cell array-like or a Board, 0 for blanks, and
+    solutions come back in generate_puzzle's (box, box, box, box) layout. A backend
+    implements _solutions(cells, geo), a generator of solved cell lists. rng, when
+    given, shuffles the branch order so fill() deals a random grid of box's size.
+    """
+    name = None
+    def __init__(self, rng=None, box=3):
+        self.rng = rng
+        self.geo = geometry(box)
+    def _solutions(self, cells, geo):
+        raise NotImplementedError
+    @staticmethod
+    def _prepare(puzzle):
+        cells = list(puzzle.cells) if isinstance(puzzle, Board) else [int(v) for v in np.asarray(puzzle).ravel()]
+        box = box_of_cells(len(cells))
+        if box is None:
+            raise ValueError(f"a grid of {len(cells)} cells is not a supported puzzle")
+        return cells, geometry(box)
+    def enumerate(self, puzzle, limit=None):
+        """Yield solutions of puzzle, at most limit of them."""
+        cells, geo = self._prepare(puzzle)
+        for solution in islice(self._solutions(cells, geo), limit):
+            yield _cells_to_grid(solution, geo.box)
+    def solve(self, puzzle):
+        """Return the first solution of puzzle, or None if it has none."""
+        return next(self.enumerate(puzzle, 1), None)
+    def count_solutions(self, puzzle, limit=2):
+        """Count solutions of puzzle, stopping as soon as limit is reached."""
+        cells, geo = self._prepare(puzzle)
+        return sum(1 for _ in islice(self._solutions(cells, geo), limit))
+    def fill(self):
+        """A random solved grid of the solver's size."""
+        return _cells_to_grid(next(self._solutions([0] * self.geo.cells, self.geo)), self.geo.box)
+    def has_other_solution(self, cells, i, digit, budget=None):
+        """True if flat cells, solved by digit at blank cell i, has another solution.
+
+        budget is a search-node budget only the bitmask backend honours.
+        """
+        geo = geometry(box_of_cells(len(cells)))
+        return any(solution[i] != digit for solution in islice(self._solutions(list(cells), geo), 2))
+
+class BitmaskSolver(Solver):
+    """Constraint-propagation solver over row/column/box digit bitmasks.
+
+    Always branches on the cell with the fewest candidates and propagates naked
+    and hidden singles, which keeps 16x16 and 25x25 grids tractable.
+    """
+    name = "bitmask"
+    def _solutions(self, cells, geo):
+        state = _bm_load(cells, geo)
+        if state is not None:
+            yield from _bm_solutions(*state, self.rng, geo)
+    def fill(self):
+        rng = self.rng if self.rng is not None else random
+        geo = self.geo
+        while True:
+            grid = [0] * geo.cells
+            cand = [geo.all_digits] * geo.cells
+            # The diagonal boxes share no row or column, so they are dealt straight from shuffled digits
+            for b in range(0, geo.size, geo.box + 1):
+                bits = geo.mask_bits[geo.all_digits][:]
+                rng.shuffle(bits)
+                for i, bit in zip(geo.box_units[b], bits):
+                    _bm_place(grid, cand, i, bit, geo)
+            found = []
+            # Hidden singles almost never fire on a near-empty grid, so filling skips that pass. Big
+            # grids occasionally wander into a dead region, where a fresh deal beats backtracking out.
+            budget = None if geo.box == 3 else [FILL_RESTART_NODES]
+            try:
+                _bm_search(grid, cand, [], 1, found, rng, hidden_singles=False, geo=geo, budget=budget)
+            except _SearchBudgetExceeded:
+                continue
+            return _cells_to_grid(found[0], geo.box)
+    def solve(self, puzzle):
+        cells, geo = self._prepare(puzzle)
+        state = _bm_load(cells, geo)
+        if state is None:
+            return None
+        found = []
+        _bm_search(*state, 1, found, self.rng, geo=geo)
+        return _cells_to_grid(found[0], geo.box) if found else None
+    def count_solutions(self, puzzle, limit=2):
+        cells, geo = self._prepare(puzzle)
+        state = _bm_load(cells, geo)
+        if state is None:
+            return 0
+        found = []
+        _bm_search(*state, limit, found, geo=geo)
+        return len(found)
+    def has_other_solution(self, cells, i, digit, budget=None):
+        return _has_other_solution(cells, i, digit, geometry(box_of_cells(len(cells))), budget)
+
+class BacktrackingSolver(Solver):
+    """The original solver: fill the blanks in reading order, trying every digit that fits.
+
+    No propagation and no cell ordering, so it is only practical on 9x9 grids; kept
+    as the reference the other backends are compared against.
+    """
+    name = "backtrack"
+    def _solutions(self, cells, geo):
+        n = geo.size
+        rows, cols, boxes = [0] * n, [0] * n, [0] * n
+        row_of, col_of, box_of = geo.row_of, geo.col_of, geo.box_of
+        for i, d in enumerate(cells):
+            if d:
+                bit = 1 << (d - 1)
+                if (rows[row_of[i]] | cols[col_of[i]] | boxes[box_of[i]]) & bit:
+                    return  # the clues clash
+                rows[row_of[i]] |= bit
+                cols[col_of[i]] |= bit
+                boxes[box_of[i]] |= bit
+        grid = list(cells)
+        blanks = [i for i, d in enumerate(cells) if not d]
+        digits = list(range(1, n + 1))
+        rng = self.rng
+        def search(k):
+            if k == len(blanks):
+                yield grid[:]
+                return
+            i = blanks[k]
+            r, c, b = row_of[i], col_of[i], box_of[i]
+            used = rows[r] | cols[c] | boxes[b]
+            for d in (digits if rng is None else rng.sample(digits, n)):
+                bit = 1 << (d - 1)
+                if not used & bit:
+                    grid[i] = d
+                    rows[r] |= bit
+                    cols[c] |= bit
+                    boxes[b] |= bit
+                    yield from search(k + 1)
+                    rows[r] ^= bit
+                    cols[c] ^= bit
+                    boxes[b] ^= bit
+            grid[i] = 0
+        yield from search(0)
+
+class DancingLinksSolver(Solver):
+    """Knuth's Algorithm X over a dancing-links exact-cover matrix.
+
+    Columns are the cell, row-digit, column-digit and box-digit constraints the clues
+    leave open; rows are the candidates the clues allow. The links live in flat
+    integer lists rather than node objects, and the search always covers the column
+    with the fewest rows left.
+    """
+    name = "dlx"
+    def _solutions(self, cells, geo):
+        n, count = geo.size, geo.cells
+        row_of, col_of, box_of = geo.row_of, geo.col_of, geo.box_of
+        rows, cols, boxes = [0] * n, [0] * n, [0] * n
+        for i, d in enumerate(cells):
+            if d:
+                bit = 1 << (d - 1)
+                if (rows[row_of[i]] | cols[col_of[i]] | boxes[box_of[i]]) & bit:
+                    return  # the clues clash
+                rows[row_of[i]] |= bit
+                cols[col_of[i]] |= bit
+                boxes[box_of[i]] |= bit
+        # Node 0 is the root and nodes 1..4 * count the column headers; open headers are linked in
+        headers = 4 * count
+        L, R = list(range(-1, headers)), list(range(1, headers + 2))
+        U, D, C = list(range(headers + 1)), list(range(headers + 1)), list(range(headers + 1))
+        S = [0] * (headers + 1)
+        choice = [None] * (headers + 1)
+        last = 0
+        for col in range(1, headers + 1):
+            kind, k = divmod(col - 1, count)
+            unit, d = divmod(k, n)
+            if kind == 0:
+                open_ = not cells[k]
+            else:
+                open_ = not ((rows, cols, boxes)[kind - 1][unit] >> d & 1)
+            if open_:
+                L[col], R[last] = last, col
+                last = col
+        L[0], R[last] = last, 0
+        for i, given in enumerate(cells):
+            if given:
+                continue
+            used = rows[row_of[i]] | cols[col_of[i]] | boxes[box_of[i]]
+            for d in range(n):
+                if used >> d & 1:
+                    continue
+                first = len(L)
+                for col in (1 + i, 1 + count + row_of[i] * n + d, 1 + 2 * count + col_of[i] * n + d,
+                            1 + 3 * count + box_of[i] * n + d):
+                    node = len(L)
+                    L.append(node - 1)
+                    R.append(node + 1)
+                    U.append(U[col])
+                    D.append(col)
+                    D[U[col]] = node
+                    U[col] = node
+                    C.append(col)
+                    S[col] += 1
+                    choice.append((i, d + 1))
+                L[first], R[-1] = len(L) - 1, first
+
+        def cover(c):
+            L[R[c]], R[L[c]] = L[c], R[c]
+            i = D[c]
+            while i != c:
+                j = R[i]
+                while j != i:
+                    U[D[j]], D[U[j]] = U[j], D[j]
+                    S[C[j]] -= 1
+                    j = R[j]
+                i = D[i]
+        def uncover(c):
+            i = U[c]
+            while i != c:
+                j = L[i]
+                while j != i:
+                    S[C[j]] += 1
+                    U[D[j]] = D[U[j]] = j
+                    j = L[j]
+                i = U[i]
+            L[R[c]] = R[L[c]] = c
+
+        grid = list(cells)
+        rng = self.rng
+        def search():
+            if R[0] == 0:
+                yield grid[:]
+                return
+            c, j = R[0], R[R[0]]
+            while j != 0:
+                if S[j] < S[c]:
+                    c = j
+                j = R[j]
+            if not S[c]:
+                return
+            cover(c)
+            options = []
+            r = D[c]
+            while r != c:
+                options.append(r)
+                r = D[r]
+            if rng is not None:
+                rng.shuffle(options)
+            for r in options:
+                i, d = choice[r]
+                grid[i] = d
+                j = R[r]
+                while j != r:
+                    cover(C[j])
+                    j = R[j]
+                yield from search()
+                j = L[r]
+                while j != r:
+                    uncover(C[j])
+                    j = L[j]
+                grid[i] = 0
+            uncover(c)
+        yield from search()
+
+SOLVERS = {cls.name: cls for cls in (BacktrackingSolver, BitmaskSolver, DancingLinksSolver)}
+SOLVER_BACKEND = os.environ.get("PYDOKU_SOLVER", "bitmask")
+
+def make_solver(name=None, rng=None, box=3):
+    """Build the named backend, or the one PYDOKU_SOLVER configures (bitmask by default)."""
+    name = name or SOLVER_BACKEND
+    if name not in SOLVERS:
+        raise ValueError(f"unknown solver {name!r}; choose from {', '.join(SOLVERS)}")
+    return SOLVERS[name](rng=rng, box=box)
+
+def _has_other_solution(cells, i, digit, geo=GEOMETRY, budget=None):
+    """True if cells has a solution with something other than digit at blank cell i.
+
+    This is the early-exit count for a puzzle known to be solvable: its count stops
+    at exactly 1 unless such a second solution exists. budget is a one-item node
+    budget list shared across calls; a search that runs out also answers True, so
+    callers never blank a cell on a guess.
+    """
+    state = _bm_load(cells, geo)
+    if state is None:
         return False
-    if np.count_nonzero(player_flat[row, :] == num) > 1:
-        return True
-    if np.count_nonzero(player_flat[:, col] == num) > 1:
+    grid, cand, pending = state
+    cand[i] &= ~(1 << (digit - 1))
+    if not cand[i]:
+        return False
+    if not cand[i] & (cand[i] - 1):
+        pending.append(i)
+    found = []
+    try:
+        _bm_search(grid, cand, pending, 1, found, geo=geo, budget=budget)
+    except _SearchBudgetExceeded:
         return True
-    br, bc = 3 * (row // 3), 3 * (col // 3)
-    if np.count_nonzero(player_flat[br:br+3, bc:bc+3] == num) > 1:
+    return bool(found)
+def _forced_by_clues(cells, i, bit, used, geo=GEOMETRY):
+    """True if bit's digit at blank cell i is a naked or hidden single of the clues alone.
+
+    Such a cell is deduced straight back, so blanking it cannot add a solution. used
+    holds the row, column and box digit masks of the clues, without cell i.
+    """
+    row_used, col_used, box_used = used
+    row_of, col_of, box_of = geo.row_of, geo.col_of, geo.box_of
+    if row_used[row_of[i]] | col_used[col_of[i]] | box_used[box_of[i]] | bit == geo.all_digits:
         return True
+    for unit in (geo.row_units[row_of[i]], geo.col_units[col_of[i]], geo.box_units[box_of[i]]):
+        for j in unit:
+            if j != i and not cells[j] and not (row_used[row_of[j]] | col_used[col_of[j]] | box_used[box_of[j]]) & bit:
+                break
+        else:
+            return True
     return False
-def generate_puzzle(remove_count=45, seed=None):
-    if seed is not None:
-        random.seed(seed)
-        np.random.seed(seed)
-
-    grid = np.zeros((9,9), dtype=int)
-
-    def is_valid(num, row, col):
-        if num in grid[row, :]: return False
-        if num in grid[:, col]: return False
-        br, bc = 3*(row//3), 3*(col//3)
-        if num in grid[br:br+3, bc:bc+3]: return False
+
+SEARCH_BUDGETS = {4: 3_000, 5: 1_500}  # search nodes per dig on big grids, where full checks get expensive
+
+def dig_unique(solution_cells, remove_count, rng=None, geo=GEOMETRY, solver=None):
+    """Blank up to remove_count cells one at a time, keeping each only if the puzzle stays unique.
+
+    Returns the puzzle cells and the number of uniqueness checks made. Cells the
+    remaining clues force are blanked without a search. Fewer than remove_count cells
+    are blanked when no further removal keeps the solution unique, or on big grids
+    when the dig's SEARCH_BUDGETS node budget runs out first. solver, a Solver,
+    runs the uniqueness checks; the bitmask search does by default.
+    """
+    rng = rng if rng is not None else random
+    cells = list(solution_cells)
+    positions = list(range(geo.cells))
+    rng.shuffle(positions)
+    used = ([0] * geo.size, [0] * geo.size, [0] * geo.size)
+    row_used, col_used, box_used = used
+    row_of, col_of, box_of = geo.row_of, geo.col_of, geo.box_of
+    for i, d in enumerate(cells):
+        bit = 1 << (d - 1)
+        row_used[row_of[i]] |= bit
+        col_used[col_of[i]] |= bit
+        box_used[box_of[i]] |= bit
+    budget = SEARCH_BUDGETS.get(geo.box)
+    budget = None if budget is None else [budget]
+    removed = checks = 0
+    for i in positions:
+        if removed == remove_count:
+            break
+        digit = cells[i]
+        bit = 1 << (digit - 1)
+        r, c, b = row_of[i], col_of[i], box_of[i]
+        row_used[r] ^= bit
+        col_used[c] ^= bit
+        box_used[b] ^= bit
+        cells[i] = 0
+        if not _forced_by_clues(cells, i, bit, used, geo):
+            if budget is not None and budget[0] <= 0:
+                unique = False
+            else:
+                checks += 1
+                if solver is None:
+                    unique = not _has_other_solution(cells, i, digit, geo, budget)
+                else:
+                    unique = not solver.has_other_solution(cells, i, digit, budget)
+            if not unique:
+                cells[i] = digit
+                row_used[r] |= bit
+                col_used[c] |= bit
+                box_used[b] |= bit
+                continue
+        removed += 1
+    return cells, checks
+
+
+# Human-style rating: the ladder is tried from the top after every step, so the hardest
+# rung a puzzle ever needs is its rating.
+TECHNIQUES = ("naked single", "hidden single", "locked candidates", "naked pair", "hidden pair",
+              "naked triple", "hidden triple", "x-wing", "swordfish")
+UNRATED = "trial and error"  # the ladder got stuck; solving needs guessing
+
+def rating_level(technique):
+    return len(TECHNIQUES) if technique == UNRATED else TECHNIQUES.index(technique)
+def _eliminate(cand, cells, bits):
+    changed = False
+    for i in cells:
+        if cand[i] & bits:
+            cand[i] &= ~bits
+            changed = True
+    return changed
+def _digit_boards(cand):
+    """Return one 81-bit cell bitboard per digit, marking where it is still a candidate."""
+    boards = [0] * 9
+    for i in range(81):
+        for k in MASK_DIGIT_INDEXES[cand[i]]:
+            boards[k] |= 1 << i
+    return boards
+def _eliminate_board(cand, board, bit):
+    while board:
+        low = board & -board
+        cand[low.bit_length() - 1] &= ~bit
+        board ^= low
+def _cell_name(i, size=9):
+    r, c = divmod(i, size)
+    return f"r{r + 1}c{c + 1}"
+def _unit_name(u):
+    return f"{('row', 'column', 'box')[u // 9]} {u % 9 + 1}"
+def _board_cells(board):
+    cells = []
+    while board:
+        low = board & -board
+        cells.append(low.bit_length() - 1)
+        board ^= low
+    return cells
+def _digit_list(mask):
+    return ", ".join(str(k + 1) for k in MASK_DIGIT_INDEXES[mask])
+def _line_numbers(lines, mask):
+    return ", ".join(str(j + 1) for j, line in enumerate(lines) if line & mask)
+
+# With found, a list, each technique also appends the step it took as (text, justifying cells,
+# (cell, digit) placed or None, (cells, digits) whose candidates it read), and the singles stop
+# after one placement. find_hint uses this.
+def _rate_naked_singles(grid, cand, found=None):
+    steps = 0
+    for i in range(81):
+        m = cand[i]
+        if m and not m & (m - 1):
+            if found is not None:
+                blockers = {}
+                for p in PEERS[i]:
+                    blockers.setdefault(grid[p], p)
+                blockers.pop(0, None)
+                found.append((f"{_cell_name(i)} can only be {BIT_DIGIT[m]}, every other digit is ruled out "
+                              f"by its row, column and box", sorted(blockers.values()), (i, BIT_DIGIT[m]),
+                              ([i], ALL_DIGITS)))
+                _bm_place(grid, cand, i, m)
+                return 1
+            _bm_place(grid, cand, i, m)
+            steps += 1
+    return steps
+def _rate_hidden_singles(grid, cand, found=None):
+    for u, (unit, getter) in enumerate(UNIT_GETTERS):
+        once = twice = 0
+        for m in getter(cand):
+            twice |= once & m
+            once |= m
+        hidden = once & ~twice
+        if hidden:
+            for i in unit:
+                m = cand[i] & hidden
+                if m:
+                    bit = m & -m
+                    if found is not None:
+                        d = BIT_DIGIT[bit]
+                        # Each other open cell of the unit sees a d, or lost it to an earlier step
+                        blockers = {next((p for p in PEERS[j] if grid[p] == d), None)
+                                    for j in unit if j != i and not grid[j]}
+                        blockers.discard(None)
+                        found.append((f"{d} can only go in {_cell_name(i)} within {_unit_name(u)}",
+                                      sorted(blockers), (i, d), (unit, bit)))
+                    _bm_place(grid, cand, i, bit)
+                    return 1
+    return 0
+def _rate_locked_candidates(grid, cand, found=None):
+    for k, board in enumerate(_digit_boards(cand)):
+        for b, (box, lines) in enumerate(BOX_LINES):
+            inside = board & box
+            for n, line in enumerate(lines):
+                along = board & line
+                # Pointing: the box's candidates all lie on this line
+                if inside & (inside - 1) and not inside & ~line and along & ~box:
+                    if found is not None:
+                        name = _unit_name(3 * (b // 3) + n if n < 3 else 9 + 3 * (b % 3) + n - 3)
+                        found.append((f"within box {b + 1}, {k + 1} is confined to {name}, so the rest of "
+                                      f"{name} cannot hold it", _board_cells(inside), None, (BOX_UNITS[b], 1 << k)))
+                    _eliminate_board(cand, along & ~box, 1 << k)
+                    return 1
+                # Claiming: the line's candidates all lie in this box
+                if along & (along - 1) and not along & ~box and inside & ~line:
+                    if found is not None:
+                        name = _unit_name(3 * (b // 3) + n if n < 3 else 9 + 3 * (b % 3) + n - 3)
+                        found.append((f"within {name}, {k + 1} is confined to box {b + 1}, so the rest of "
+                                      f"the box cannot hold it", _board_cells(along), None, (_board_cells(line), 1 << k)))
+                    _eliminate_board(cand, inside & ~line, 1 << k)
+                    return 1
+    return 0
+def _rate_naked_subset(grid, cand, k, found=None):
+    for u, unit in enumerate(UNITS):
+        cells = [i for i in unit if cand[i] and POPCOUNT[cand[i]] <= k]
+        for combo in combinations(cells, k):
+            union = 0
+            for i in combo:
+                union |= cand[i]
+            if POPCOUNT[union] == k:
+                if _eliminate(cand, [i for i in unit if i not in combo], union):
+                    if found is not None:
+                        found.append((f"{', '.join(map(_cell_name, combo))} share the digits {_digit_list(union)}, "
+                                      f"so the rest of {_unit_name(u)} cannot hold them", list(combo), None,
+                                      (combo, ALL_DIGITS)))
+                    return 1
+    return 0
+def _rate_hidden_subset(grid, cand, k, found=None):
+    boards = _digit_boards(cand)
+    for u, unit in enumerate(UNIT_MASKS):
+        where = [(1 << d, boards[d] & unit) for d in range(9)]
+        where = [(bit, cells) for bit, cells in where if 2 <= cells.bit_count() <= k]
+        for combo in combinations(where, k):
+            union = digits = 0
+            for bit, cells in combo:
+                union |= cells
+                digits |= bit
+            if union.bit_count() == k:
+                extra = 0
+                for bit in MASK_BITS[ALL_DIGITS & ~digits]:
+                    extra |= boards[bit.bit_length() - 1] & union
+                if extra:
+                    if found is not None:
+                        cells = _board_cells(union)
+                        found.append((f"within {_unit_name(u)}, {_digit_list(digits)} can only go in "
+                                      f"{', '.join(map(_cell_name, cells))}, so those cells hold nothing else",
+                                      cells, None, (UNITS[u], digits)))
+                    _eliminate_board(cand, union, ALL_DIGITS & ~digits)
+                    return 1
+    return 0
+def _rate_fish(grid, cand, size, found=None):
+    for k, board in enumerate(_digit_boards(cand)):
+        for base_lines, cover_lines in ((ROW_MASKS, COL_MASKS), (COL_MASKS, ROW_MASKS)):
+            lines = []
+            for base in base_lines:
+                cells = board & base
+                covers = 0
+                for j, cover in enumerate(cover_lines):
+                    if cells & cover:
+                        covers |= 1 << j
+                if 2 <= POPCOUNT[covers] <= size:
+                    lines.append((base, covers))
+            for combo in combinations(lines, size):
+                bases = covers = 0
+                for base, cover in combo:
+                    bases |= base
+                    covers |= cover
+                if POPCOUNT[covers] == size:
+                    target = 0
+                    for j in range(9):
+                        if covers >> j & 1:
+                            target |= cover_lines[j]
+                    target &= board & ~bases
+                    if target:
+                        if found is not None:
+                            base_name, cover_name = ("rows", "columns") if base_lines is ROW_MASKS else ("columns", "rows")
+                            found.append((f"in {base_name} {_line_numbers(base_lines, bases)}, {k + 1} is confined to "
+                                          f"{cover_name} {_digit_list(covers)}, so the rest of those {cover_name} "
+                                          f"cannot hold it", _board_cells(board & bases), None,
+                                          (_board_cells(bases), 1 << k)))
+                        _eliminate_board(cand, target, 1 << k)
+                        return 1
+    return 0
+
+RATING_LADDER = (
+    _rate_naked_singles,
+    _rate_hidden_singles,
+    _rate_locked_candidates,
+    lambda grid, cand, found=None: _rate_naked_subset(grid, cand, 2, found),
+    lambda grid, cand, found=None: _rate_hidden_subset(grid, cand, 2, found),
+    lambda grid, cand, found=None: _rate_naked_subset(grid, cand, 3, found),
+    lambda grid, cand, found=None: _rate_hidden_subset(grid, cand, 3, found),
+    lambda grid, cand, found=None: _rate_fish(grid, cand, 2, found),
+    lambda grid, cand, found=None: _rate_fish(grid, cand, 3, found),
+)
+
+def rate_puzzle(puzzle):
+    """Solve puzzle the way a person would and return (hardest technique, steps).
+
+    A step is one placement or one elimination pattern. Puzzles the ladder cannot
+    finish are rated UNRATED.
+    """
+    state = _bm_load(int(v) for v in np.asarray(puzzle).ravel())
+    if state is None:
+        raise ValueError("puzzle has conflicting clues")
+    grid, cand, _ = state
+    hardest = steps = 0
+    while 0 in grid:
+        for level, technique in enumerate(RATING_LADDER):
+            done = technique(grid, cand)
+            if done:
+                steps += done
+                hardest = max(hardest, level)
+                break
+        else:
+            return UNRATED, steps
+    return TECHNIQUES[hardest], steps
+def rate_puzzles(puzzles, workers=None, chunksize=256):
+    """Rate a stack of puzzles across worker processes, in order."""
+    from concurrent.futures import ProcessPoolExecutor
+    cells = np.asarray(puzzles).reshape(-1, 81).tolist()
+    if workers == 1:
+        return [rate_puzzle(c) for c in cells]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(rate_puzzle, cells, chunksize=chunksize))
+class Hint:
+    """A next step for the player: fill cell with digit, or clear it when digit is 0.
+
+    technique is the hardest rung of the rating ladder the step needed, "mistake" for
+    a wrong entry, or UNRATED when the digit is simply revealed; steps explain it in
+    order and reasons are the cells that justify it.
+    """
+    __slots__ = ("technique", "cell", "digit", "reasons", "steps")
+    def __init__(self, technique, cell, digit, reasons=(), steps=()):
+        self.technique = technique
+        self.cell = cell
+        self.digit = digit
+        self.reasons = list(reasons)
+        self.steps = list(steps)
+    def __repr__(self):
+        return f"Hint({self.technique!r}, {self.cell}, {self.digit})"
+    @property
+    def text(self):
+        return f"{self.technique.capitalize()}: " + "; then ".join(self.steps) + "."
+
+def find_hint(cells, solution):
+    """The easiest next step for a player board of flat cells, or None once it is full.
+
+    Wrong entries are pointed out first. Otherwise the rating ladder runs over the
+    board until it places a digit, and the eliminations it needed on the way become
+    part of the hint. Grids bigger than 9x9 have no ladder and only get naked singles;
+    past that, the most constrained cell is revealed from the solution.
+    """
+    n = len(cells)
+    geo = geometry(box_of_cells(n))
+    size = geo.size
+    for i in range(n):
+        if cells[i] and cells[i] != solution[i]:
+            clashes = [p for p in geo.peers[i] if cells[p] == cells[i]]
+            why = f", it clashes with {', '.join(_cell_name(p, size) for p in clashes)}" if clashes else ""
+            return Hint("mistake", i, 0, clashes,
+                        [f"{_cell_name(i, size)} should not be {SYMBOLS[cells[i] - 1]}{why}"])
+    empties = [i for i in range(n) if not cells[i]]
+    if not empties:
+        return None
+    if n == 81:
+        grid, cand, _ = _bm_load(cells)
+        steps = []  # (level, step as found, candidates eliminated as (cell, bits))
+        while True:
+            before = cand[:]
+            found = []
+            for level, technique in enumerate(RATING_LADDER):
+                if technique(grid, cand, found):
+                    break
+            else:
+                break
+            if found[0][2] is None:
+                steps.append((level, found[0], [(i, m & ~cand[i]) for i, m in enumerate(before) if m != cand[i]]))
+                continue
+            # The ladder also takes eliminations the placement never uses; keep only those that
+            # removed a candidate some later kept step looked at.
+            chain = [(level, found[0])]
+            read = {}
+            for level, step, eliminated in reversed(steps + [(level, found[0], [])]):
+                if step is not found[0]:
+                    if not any(read.get(i, 0) & bits for i, bits in eliminated):
+                        continue
+                    chain.append((level, step))
+                cells_read, digits = step[3]
+                for i in cells_read:
+                    read[i] = read.get(i, 0) | digits
+            chain.reverse()
+            reasons = sorted({p for _, step in chain for p in step[1]})
+            return Hint(TECHNIQUES[max(level for level, _ in chain)], *found[0][2], reasons,
+                        [step[0] for _, step in chain])
+    _, cand, _ = _bm_load(cells, geo)
+    i = min(empties, key=lambda j: geo.popcount[cand[j]])
+    symbol = SYMBOLS[solution[i] - 1]
+    if geo.popcount[cand[i]] == 1:
+        # Bigger grids have no ladder, but still get their naked singles explained
+        blockers = {}
+        for p in geo.peers[i]:
+            blockers.setdefault(cells[p], p)
+        blockers.pop(0, None)
+        return Hint(TECHNIQUES[0], i, solution[i], sorted(blockers.values()),
+                    [f"{_cell_name(i, size)} can only be {symbol}, every other digit is ruled out by its row, "
+                     f"column and box"])
+    return Hint(UNRATED, i, solution[i], (), [f"no technique finds a digit here, but {_cell_name(i, size)} is {symbol}"])
+
+HINT_POLL_MS = 20  # how often the GUI checks back for a hint still being worked out
+
+class HintEngine:
+    """Works out find_hint() for the latest board in a background thread.
+
+    submit() takes a copy of the board and returns at once, so it can run after every
+    move; poll() answers from the cached hint when the worker already reached the board
+    as it stands, without ever waiting, and get() waits for it. Only the newest board
+    is kept, so a burst of moves costs one search. If find_hint raises, poll() and get()
+    raise the same error for that board and the worker carries on.
+    """
+    def __init__(self):
+        self.pending = None  # (key, solution cells)
+        self.key = None      # the board self.hint was worked out for
+        self.hint = None
+        self.error = None    # what find_hint raised for self.key, if it failed
+        self.searches = 0
+        self.cond = threading.Condition()
+        self.thread = None
+    def submit(self, board):
+        key = bytes(board.player.cells)
+        with self.cond:
+            if key == self.key or (self.pending is not None and self.pending[0] == key):
+                return
+            self.pending = (key, bytes(board.solution.cells))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True, name="pydoku-hints")
+                self.thread.start()
+            self.cond.notify_all()
+    def poll(self, board):
+        """(True, hint) if the hint for board as it stands is ready, else (False, None) once it is submitted."""
+        key = bytes(board.player.cells)
+        with self.cond:
+            if self.key == key:
+                return True, self._result()
+        self.submit(board)
+        return False, None
+    def get(self, board, timeout=None):
+        """The hint for board as it stands now; raises TimeoutError if it takes over timeout seconds."""
+        self.submit(board)
+        key = bytes(board.player.cells)
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.key == key, timeout):
+                raise TimeoutError("the hint is still being worked out")
+            return self._result()
+    def _result(self):
+        if self.error is not None:
+            raise self.error
+        return self.hint
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending is not None)
+                (key, solution), self.pending = self.pending, None
+            try:
+                hint, error = find_hint(key, solution), None
+            except Exception as e:
+                hint, error = None, e
+            with self.cond:
+                self.key, self.hint, self.error = key, hint, error
+                self.searches += 1
+                self.cond.notify_all()
+
+def dig_rated(solution_cells, band, rng=None):
+    """Blank cells while the puzzle stays unique and rated no harder than band's upper technique.
+
+    Returns the puzzle cells, the uniqueness checks made and the final rating level,
+    which may still fall short of band's lower technique.
+    """
+    rng = rng if rng is not None else random
+    highest = rating_level(band[1])
+    cells = list(solution_cells)
+    positions = list(range(81))
+    rng.shuffle(positions)
+    checks = level = 0
+    for i in positions:
+        digit = cells[i]
+        cells[i] = 0
+        checks += 1
+        if _has_other_solution(cells, i, digit):
+            cells[i] = digit
+            continue
+        rated = rating_level(rate_puzzle(cells)[0])
+        if rated > highest:
+            cells[i] = digit
+        else:
+            level = rated
+    return cells, checks, level
+
+def scaled_remove_count(remove_count, box=3):
+    """remove_count for a 9x9 grid carried over to box's grid at the same blank fraction."""
+    return round(remove_count * geometry(box).cells / 81)
+
+class RatingBandMissed(ValueError):
+    """No attempt of a rated generate_puzzle reached the band; puzzle and solution are the closest one."""
+    def __init__(self, band, rating, puzzle, solution):
+        super().__init__(f"no puzzle rated {band[0]} to {band[1]} was found; the closest was rated {rating}")
+        self.band = band
+        self.rating = rating
+        self.puzzle = puzzle
+        self.solution = solution
+
+@timed("generate_puzzle")
+def generate_puzzle(remove_count=45, seed=None, unique=True, stats=None, rating=None, attempts=20, box=3,
+                    solver=None):
+    """Generate a (puzzle, solution) pair in the (box, box, box, box) layout.
+
+    box picks the grid: 3 for 9x9, 4 for 16x16, 5 for 25x25. rating, a (lowest,
+    hardest) pair of TECHNIQUES names, targets a rating band instead of
+    remove_count; up to attempts solved grids are tried to reach it, and
+    RatingBandMissed is raised if none does. Rating is only defined for 9x9
+    grids. Grids are always filled by the bitmask backend, whatever PYDOKU_SOLVER
+    names, so a seed means the same puzzle everywhere; solver, when named, only
+    runs the uniqueness checks while digging.
+
+    Each call draws from its own random.Random(seed), never the global generators,
+    so the same arguments give the same puzzle in any thread or process.
+    """
+    if rating is not None and box != 3:
+        raise ValueError("rated generation only supports 9x9 grids")
+    rng = random.Random(seed)
+
+    geo = geometry(box)
+    filler = BitmaskSolver(rng=rng, box=box)
+    solver = make_solver(solver, box=box) if solver is not None else None
+    solution = filler.fill()
+    if rating is not None:
+        lowest = rating_level(rating[0])
+        checks = 0
+        best = None
+        for attempt in range(attempts):
+            if attempt:
+                solution = filler.fill()
+            cells, used, level = dig_rated(solution.ravel().tolist(), rating, rng)
+            checks += used
+            if best is None or level > best[0]:
+                best = level, cells, solution
+            if level >= lowest:
+                break
+        level, cells, solution = best
+        grid = _cells_to_grid(cells).reshape(9, 9)
+    elif unique:
+        cells, checks = dig_unique(solution.ravel().tolist(), remove_count, rng, geo, solver)
+        grid = _cells_to_grid(cells, box).reshape(geo.size, geo.size)
+    else:
+        checks = 0
+        grid = solution.reshape(geo.size, geo.size).copy()
+        positions = [(r,c) for r in range(geo.size) for c in range(geo.size)]
+        rng.shuffle(positions)
+        for r, c in positions[:remove_count]:
+            grid[r, c] = 0
+
+    if stats is not None:
+        stats["uniqueness_checks"] = checks
+        stats["removed"] = int(np.count_nonzero(grid == 0))
+        if rating is not None:
+            stats["rating"] = TECHNIQUES[level] if level < len(TECHNIQUES) else UNRATED
+    if rating is not None and level < lowest:
+        raise RatingBandMissed(rating, TECHNIQUES[level], grid.reshape(3, 3, 3, 3), solution.reshape(3, 3, 3, 3))
+    return grid.reshape(box, box, box, box), solution.reshape(box, box, box, box)
+
+def _random_perms(rng, count, size):
+    return rng.random((count, size)).argsort(axis=1)
+def generate_puzzles(n, remove_count=45, seed=None, per_grid=1000, unique=True):
+    """Generate n puzzles as stacked (n,9,9) puzzle and solution arrays.
+
+    Every block of per_grid puzzles comes from one generate_puzzle call, remixed with
+    validity-preserving transforms: digit relabeling, band/stack and row/column
+    permutations within them, and transposition. Puzzle i depends only on
+    (seed, i // per_grid), so any puzzle can be regenerated from the seed alone.
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**32)
+    puzzles = np.empty((n, 9, 9), dtype=int)
+    solutions = np.empty((n, 9, 9), dtype=int)
+    for block, start in enumerate(range(0, n, per_grid)):
+        rng = np.random.default_rng([seed, block])
+        base_puzzle, base_solution = generate_puzzle(remove_count, seed=int(rng.integers(2**32)), unique=unique)
+        base_puzzle, base_solution = base_puzzle.reshape(9, 9), base_solution.reshape(9, 9)
+        m = min(per_grid, n - start)
+
+        # Draw a whole block's transforms even for a short last block, so the draws never depend on n
+        k = per_grid
+        rows = (3 * _random_perms(rng, k, 3)[:, :, None] + _random_perms(rng, k * 3, 3).reshape(k, 3, 3)).reshape(k, 9)
+        cols = (3 * _random_perms(rng, k, 3)[:, :, None] + _random_perms(rng, k * 3, 3).reshape(k, 3, 3)).reshape(k, 9)
+        transpose = rng.random(k) < 0.5
+        relabel = np.zeros((k, 10), dtype=int)
+        relabel[:, 1:] = _random_perms(rng, k, 9) + 1
+        rows, cols, transpose, relabel = rows[:m], cols[:m], transpose[:m], relabel[:m]
+
+        for base, out in ((base_puzzle, puzzles), (base_solution, solutions)):
+            grids = base[rows[:, :, None], cols[:, None, :]]
+            grids[transpose] = grids[transpose].transpose(0, 2, 1)
+            out[start:start + m] = np.take_along_axis(relabel, grids.reshape(m, 81), axis=1).reshape(m, 9, 9)
+    return puzzles, solutions
+
+def _canon_refine(lines, rows, cols, digits, box):
+    """Split row, column and digit colors until the order is settled or nothing splits.
+
+    A color is a rank among sorted signatures: the old color, the band's (or stack's)
+    sorted colors, and the sorted (other line, digit) colors of the clues on the line.
+    Rows and columns share one ranking, so transposing a puzzle just swaps them.
+    lines holds the (column, digit), (row, digit) and (row, column) clues of each row,
+    column and digit. Returns the colors and _canon_target's tie.
+    """
+    row_cells, col_cells, digit_cells = lines
+    n = box * box
+    distinct = len(set(rows)) + len(set(cols)) + len(set(digits))
+    while True:
+        # Color pairs are packed into ints that sort like the pairs; digit ranks stay below 64
+        bands = [tuple(sorted(rows[k:k + box])) for k in range(0, n, box)]
+        stacks = [tuple(sorted(cols[k:k + box])) for k in range(0, n, box)]
+        row_keys = [(rows[i], bands[i // box], tuple(sorted([cols[c] << 6 | digits[v] for c, v in row_cells[i]])))
+                    for i in range(n)]
+        col_keys = [(cols[j], stacks[j // box], tuple(sorted([rows[r] << 6 | digits[v] for r, v in col_cells[j]])))
+                    for j in range(n)]
+        # A digit's clues pack the sum and product of their row and column colors, which
+        # name the pair without its order, so transposing keeps the digit's color
+        digit_keys = [(digits[v], tuple(sorted([(rows[r] + cols[c] << 44) + rows[r] * cols[c] for r, c in digit_cells[v]])))
+                      for v in range(n + 1)]
+        rank = {key: k for k, key in enumerate(sorted(set(row_keys + col_keys)))}
+        rows = [rank[key] for key in row_keys]
+        cols = [rank[key] for key in col_keys]
+        rank = {key: k for k, key in enumerate(sorted(set(digit_keys)))}
+        digits = [rank[key] for key in digit_keys]
+        # Ranks keep the order of the colors they refine, so a settled order stays settled
+        target = _canon_target(rows, cols, box)
+        if target is None:
+            return rows, cols, digits, None
+        before, distinct = distinct, len(set(rows)) + len(set(cols)) + len(set(digits))
+        if distinct == before:
+            return rows, cols, digits, target
+
+def _canon_target(rows, cols, box):
+    """The first tie left in the order, as (kind, indexes to try individualizing), or None."""
+    n = box * box
+    if len(set(rows)) == n == len(set(cols)):
+        return None
+    for kind, colors in (("band", rows), ("stack", cols)):
+        groups = [tuple(sorted(colors[k:k + box])) for k in range(0, n, box)]
+        if len(set(groups)) < box:
+            tied = min(g for g in groups if groups.count(g) > 1)
+            return kind, [k for k, g in enumerate(groups) if g == tied]
+    for kind, colors in (("row", rows), ("column", cols)):
+        groups = [tuple(sorted(colors[k:k + box])) for k in range(0, n, box)]
+        for k in sorted(range(box), key=groups.__getitem__):
+            line = colors[k * box:(k + 1) * box]
+            if len(set(line)) < box:
+                tied = min(v for v in line if line.count(v) > 1)
+                return kind, [k * box + i for i, v in enumerate(line) if v == tied]
+    return None
+
+def _canon_line_colors(cells, box):
+    """Starting row and column colors for a full grid, where clue counts are all equal.
+
+    Any two rows of a solution map one's digits onto the other's, column by column,
+    and the cycle lengths of that permutation survive relabeling and reordering; a
+    row's color ranks the cycle lengths it has with the other rows, telling apart
+    rows of its own band from the rest. Columns are treated alike and share the
+    ranking, so transposing just swaps the two.
+    """
+    n = box * box
+    rows = [cells[k:k + n] for k in range(0, n * n, n)]
+    cols = [cells[k::n] for k in range(n)]
+    signatures = []
+    for lines in (rows, cols):
+        for i, a in enumerate(lines):
+            signature = []
+            for k, b in enumerate(lines):
+                if k == i:
+                    continue
+                perm = [0] * (n + 1)
+                for x, y in zip(a, b):
+                    perm[x] = y
+                lengths = []
+                for start in a:
+                    if perm[start]:
+                        length, x = 0, start
+                        while perm[x]:
+                            perm[x], x = 0, perm[x]
+                            length += 1
+                        lengths.append(length)
+                lengths.sort()
+                signature.append((i // box == k // box, tuple(lengths)))
+            signature.sort()
+            signatures.append(tuple(signature))
+    rank = {key: k for k, key in enumerate(sorted(set(signatures)))}
+    colors = [rank[key] for key in signatures]
+    return colors[:n], colors[n:]
+
+def _canon_order(colors, box):
+    groups = [tuple(sorted(colors[k:k + box])) for k in range(0, box * box, box)]
+    return sorted(range(box * box), key=lambda i: (groups[i // box], colors[i]))
+
+class _CanonSearch:
+    """Search for the smallest leaf below colors that _canon_refine has settled.
+
+    Two leaves with the same grid give an automorphism of the puzzle, as maps of its
+    rows and columns. Members of a tie that an automorphism fixing the path so far
+    maps onto a member already tried are skipped, and a leaf that matches the first
+    or best leaf abandons the rest of its subtree when the automorphism maps the
+    explored subtree onto it, so symmetric and sparse grids stay cheap.
+    """
+    def __init__(self, cells, lines, box):
+        self.cells = cells
+        self.lines = lines
+        self.box = box
+        self.best = None
+        self.first = self.best_leaf = None  # (code, row order, column order, path)
+        self.automorphisms = []
+        self.path = []
+    def search(self, rows, cols, digits, target):
+        """Explore below a node; returns the depth to back up to, or None."""
+        if target is None:
+            return self._leaf(rows, cols)
+        box = self.box
+        kind, members = target
+        depth = len(self.path)
+        tried = []
+        for m in members:
+            if tried and self._pruned(kind, m, tried):
+                continue
+            tried.append(m)
+            # Individualize m below every rank, keeping a band's or stack's own rows in order
+            r2, c2 = rows[:], cols[:]
+            if kind == "band":
+                for i in range(m * box, (m + 1) * box):
+                    r2[i] -= 1 << 20
+            elif kind == "stack":
+                for j in range(m * box, (m + 1) * box):
+                    c2[j] -= 1 << 20
+            elif kind == "row":
+                r2[m] = -1
+            else:
+                c2[m] = -1
+            self.path.append((kind, m))
+            back = self.search(*_canon_refine(self.lines, r2, c2, digits, box))
+            self.path.pop()
+            if back is not None and back < depth:
+                return back
+        return None
+    def _image(self, automorphism, kind, x):
+        row_map, col_map = automorphism
+        if kind == "row":
+            return row_map[x]
+        if kind == "column":
+            return col_map[x]
+        return (row_map if kind == "band" else col_map)[x * self.box] // self.box
+    def _pruned(self, kind, m, tried):
+        path = self.path
+        fixing = [a for a in self.automorphisms if all(self._image(a, k, x) == x for k, x in path)]
+        orbit, frontier = {m}, [m]
+        while frontier:
+            x = frontier.pop()
+            for a in fixing:
+                y = self._image(a, kind, x)
+                if y not in orbit:
+                    orbit.add(y)
+                    frontier.append(y)
+        return not orbit.isdisjoint(tried)
+    def _leaf(self, rows, cols):
+        # Relabel the digits in order of first appearance
+        box, cells = self.box, self.cells
+        n = box * box
+        row_order, col_order = _canon_order(rows, box), _canon_order(cols, box)
+        label = [0] * (n + 1)
+        labels = 0
+        out = bytearray(n * n)
+        k = 0
+        for r in row_order:
+            base = r * n
+            for c in col_order:
+                v = cells[base + c]
+                if v:
+                    if not label[v]:
+                        labels += 1
+                        label[v] = labels
+                    out[k] = label[v]
+                k += 1
+        leaf = (bytes(out), row_order, col_order, tuple(self.path))
+        if self.first is None:
+            self.first = self.best_leaf = leaf
+            self.best = leaf[0]
+            return None
+        for other in (self.first, self.best_leaf):
+            if leaf[0] == other[0]:
+                return self._automorphism(other, leaf)
+        if leaf[0] < self.best:
+            self.best, self.best_leaf = leaf[0], leaf
+        return None
+    def _automorphism(self, old, new):
+        """Record the automorphism taking leaf old to leaf new; returns the depth to back up to, or None."""
+        n = self.box * self.box
+        row_map, col_map = [0] * n, [0] * n
+        for i in range(n):
+            row_map[old[1][i]] = new[1][i]
+            col_map[old[2][i]] = new[2][i]
+        automorphism = (row_map, col_map)
+        if row_map == list(range(n)) and col_map == row_map:
+            return None  # only relabels the digits
+        self.automorphisms.append(automorphism)
+        old_path, new_path = old[3], new[3]
+        k = next(k for k, (a, b) in enumerate(zip(old_path, new_path)) if a != b)
+        # The subtree new's path branched into is the image of the explored one if the shared
+        # prefix is fixed and old's branch maps onto new's
+        if all(self._image(automorphism, kind, x) == x for kind, x in new_path[:k]) and \
+                self._image(automorphism, *old_path[k]) == new_path[k][1]:
+            return k
+        return None
+
+def canonical_form(puzzle):
+    """The canonical copy of puzzle under the Sudoku symmetries, as bytes of cell digits.
+
+    Puzzles that relabeling the digits, permuting bands, stacks and the rows and
+    columns within them, and transposing can turn into each other get the same form,
+    and the form is one of those copies. Colors refined from the clues fix the order
+    of the rows and columns; only ties left after refinement are branched on, and the
+    smallest relabeled grid among the branches wins. A full grid starts from
+    _canon_line_colors instead of clue counts, which cannot tell its lines apart.
+    One core manages roughly 6,000 to 10,000 generated 9x9 puzzles a second and
+    about 2,000 full 9x9 grids.
+    """
+    if isinstance(puzzle, Board):
+        cells = list(puzzle.cells)
+    elif isinstance(puzzle, (list, bytes, bytearray)):
+        cells = list(puzzle)
+    else:
+        cells = np.asarray(puzzle).ravel().tolist()
+    box = box_of_cells(len(cells))
+    if box is None:
+        raise ValueError(f"a grid of {len(cells)} cells is not a supported puzzle")
+    if not any(cells):
+        return bytes(len(cells))  # every copy of an empty grid is the same
+    geo = geometry(box)
+    n = box * box
+    row_cells = [[] for _ in range(n)]
+    col_cells = [[] for _ in range(n)]
+    digit_cells = [[] for _ in range(n + 1)]
+    row_of, col_of = geo.row_of, geo.col_of
+    for i in [i for i, v in enumerate(cells) if v]:
+        r, c, v = row_of[i], col_of[i], cells[i]
+        row_cells[r].append((c, v))
+        col_cells[c].append((r, v))
+        digit_cells[v].append((r, c))
+    # Refining uniform colors once would only rank the clue counts, so start from the counts,
+    # which a full grid has all equal
+    if all(cells):
+        rows, cols = _canon_line_colors(cells, box)
+    else:
+        rows, cols = [len(x) for x in row_cells], [len(x) for x in col_cells]
+    rows, cols, digits, target = _canon_refine((row_cells, col_cells, digit_cells), rows, cols,
+                                               [len(x) for x in digit_cells], box)
+    # Transposing swaps the row and column colors; take the side whose bands sort first, or both on a tie
+    row_side = sorted(tuple(sorted(rows[k:k + box])) for k in range(0, n, box))
+    col_side = sorted(tuple(sorted(cols[k:k + box])) for k in range(0, n, box))
+    forms = []
+    if row_side <= col_side:
+        search = _CanonSearch(cells, (row_cells, col_cells, digit_cells), box)
+        search.search(rows, cols, digits, target)
+        forms.append(search.best)
+    if col_side <= row_side:
+        transposed = [cells[c * n + r] for r in range(n) for c in range(n)]
+        search = _CanonSearch(transposed, (col_cells, row_cells, [[(c, r) for r, c in x] for x in digit_cells]), box)
+        search.search(cols, rows, digits, _canon_target(cols, rows, box))
+        forms.append(search.best)
+    return min(forms)
+
+def canonical_id(puzzle):
+    """Short hex ID of puzzle's canonical form: the same for every symmetric copy of a puzzle."""
+    import hashlib
+    return hashlib.blake2b(canonical_form(puzzle), digest_size=8).hexdigest()
+
+class PuzzleIndex:
+    """Hash index of canonical puzzle IDs, remembering where each was first seen.
+
+    Symmetric copies share an ID, so finding a duplicate is one dict lookup however
+    the copy was relabeled, shuffled or transposed.
+    """
+    def __init__(self):
+        self.first = {}
+    def __len__(self):
+        return len(self.first)
+    def __contains__(self, puzzle_id):
+        return puzzle_id in self.first
+    def add(self, puzzle_id, where=None):
+        """Index puzzle_id; returns False if it was already there."""
+        if puzzle_id in self.first:
+            return False
+        self.first[puzzle_id] = where
         return True
+    def first_seen(self, puzzle_id):
+        return self.first.get(puzzle_id)
 
-    def solve(pos=0):
-        if pos == 81: return True
-        row, col = divmod(pos, 9)
-        nums = list(range(1,10))
-        random.shuffle(nums)
-        for num in nums:
-            if is_valid(num, row, col):
-                grid[row, col] = num
-                if solve(pos+1): return True
-                grid[row, col] = 0
-        return False
+class PuzzlePool:
+    """Keeps a few ready puzzles per remove_count, topped up by a background process pool.
+
+    take() hands out a ready puzzle (a hit) or falls back to generating one inline
+    (a miss), then queues a refill either way; take_ready() is the same without the
+    fallback. The workers are started from a background thread so constructing the
+    pool never delays the menu, and started is set once that thread is done; where
+    worker processes are unavailable it generates one puzzle per remove_count
+    instead. Given an executor, the pool submits to it rather than starting its own,
+    and leaves shutting it down to its owner. Puzzles warm_up has made are ready
+    from the start, so the first game need not wait for the workers.
+    """
+    def __init__(self, remove_counts, size=2, workers=None, executor=None):
+        self.size = size
+        self.ready = {rc: deque() for rc in remove_counts}
+        for rc, queue in self.ready.items():
+            puzzle = WARM_PUZZLES.pop(rc, None)
+            if puzzle is not None:
+                queue.append(puzzle)
+        self.pending = {rc: 0 for rc in remove_counts}
+        self.hits = 0
+        self.misses = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.executor = None
+        self.shared_executor = executor
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.started = threading.Event()
+        threading.Thread(target=self._start, daemon=True, name="pydoku-pool").start()
+    def _start(self):
+        try:
+            self._start_workers()
+        finally:
+            self.started.set()
+    def _start_workers(self):
+        executor = self.shared_executor
+        if executor is None:
+            importlib.import_module("numpy")  # loaded before the first fork so workers inherit it
+            from concurrent.futures import ProcessPoolExecutor
+            try:
+                executor = ProcessPoolExecutor(max_workers=self.workers)
+            except (OSError, NotImplementedError, ImportError):
+                executor = None
+        with self.lock:
+            if self.closed:
+                if executor is not None and executor is not self.shared_executor:
+                    executor.shutdown(wait=False)
+                return
+            self.executor = executor
+        if executor is not None:
+            for rc in self.ready:
+                self.top_up(rc)
+            return
+        for rc in list(self.ready):
+            puzzle = generate_puzzle(remove_count=rc)
+            with self.lock:
+                if self.closed:
+                    return
+                self.ready[rc].append(puzzle)
+    def top_up(self, remove_count):
+        futures = []
+        with self.lock:
+            while not self.closed and self.executor is not None and len(self.ready[remove_count]) + self.pending[remove_count] < self.size:
+                try:
+                    futures.append(self.executor.submit(generate_puzzle, remove_count))
+                except RuntimeError:  # executor shut down or broken
+                    break
+                self.pending[remove_count] += 1
+        # Outside the lock: a future that has already finished runs _on_done right away
+        for future in futures:
+            future.add_done_callback(lambda f, rc=remove_count: self._on_done(rc, f))
+    def _on_done(self, remove_count, future):
+        with self.lock:
+            self.pending[remove_count] -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            self.ready[remove_count].append(future.result())
+    def take_ready(self, remove_count):
+        """A ready puzzle, or None on a miss."""
+        with self.lock:
+            queue = self.ready.get(remove_count)
+            puzzle = queue.popleft() if queue else None
+            if puzzle is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if remove_count in self.ready:
+            self.top_up(remove_count)
+        return puzzle
+    def take(self, remove_count):
+        puzzle = self.take_ready(remove_count)
+        return puzzle if puzzle is not None else generate_puzzle(remove_count=remove_count)
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "ready": {rc: len(q) for rc, q in self.ready.items()}}
+    def shutdown(self):
+        with self.lock:
+            self.closed = True
+            executor = self.executor
+        if executor is not None and executor is not self.shared_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def start_puzzle_pool(remove_counts):
+    """Start a PuzzlePool, or return None where no background thread can be started."""
+    try:
+        return PuzzlePool(remove_counts)
+    except RuntimeError:
+        return None
+
+PUZZLE_CACHE_SIZE = int(os.environ.get("PYDOKU_PUZZLE_CACHE", "64"))
+
+class PuzzleCache:
+    """Bounded LRU cache of seeded puzzles, keyed by (seed, remove_count, box).
+
+    A seed always generates the same puzzle, so replaying a seed or the daily
+    puzzle only pays for generation once; the least recently used entry is evicted
+    past maxsize. get() hands out copies, so callers may edit what they receive.
+    """
+    def __init__(self, maxsize=PUZZLE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+    def get(self, seed, remove_count, box=3):
+        key = (seed, remove_count, box)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            # Generated outside the lock; two threads racing on one key build the same puzzle
+            entry = generate_puzzle(remove_count, seed=seed, box=box)
+            with self.lock:
+                self.entries[key] = entry
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return entry[0].copy(), entry[1].copy()
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self.entries), "maxsize": self.maxsize}
+
+PUZZLE_CACHE = PuzzleCache()
+
+def daily_seed(day=None):
+    """The seed of a day's puzzle, e.g. 20240131, from the local date by default."""
+    return int((day or datetime.now()).strftime("%Y%m%d"))
+
+# Move journal layout: header, the clues bit-packed like a saved game's values when JOURNAL_CLUES
+# is set, then one record per move. A record holds the move kind in its low 3 bits, then the
+# cell, then the digit, little-endian in as few bytes as the grid needs: 2 on 9x9 and 16x16, 3 on
+# 25x25. Undo and redo records carry no cell; replay takes them off its own undo history.
+JOURNAL_MAGIC = b"PYDJ"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct("<4sBBBBIH")  # magic, version, box, flags, multiplier, seed, remove_count
+JOURNAL_SEEDED, JOURNAL_CLUES = 1, 2
+MOVE_SET, MOVE_NOTE, MOVE_CLEAR_NOTES, MOVE_HINT, MOVE_UNDO, MOVE_REDO = range(6)
+
+class MoveJournal:
+    """Append-only log of a game's moves, which also keeps its score, mistakes and undo history.
+
+    Every move goes through place(), toggle_note(), clear_notes(), hint(), undo() or
+    redo(), which apply it to board, score it and append a packed record; undo and
+    redo are O(1) and recorded too. replay() runs the records against the puzzle
+    through the same methods, so it recomputes the score of a submitted game exactly.
+    board must still hold just the clues unless clues are given.
+    """
+    def __init__(self, board, multiplier=1, seed=None, remove_count=0, clues=None):
+        self.board = board
+        self.geometry = geo = board.geometry
+        self.clues = Board.of(clues).copy() if clues is not None else board.player.copy()
+        self.multiplier = multiplier
+        self.seed = seed
+        self.remove_count = remove_count
+        self.cell_bits = (geo.cells - 1).bit_length()
+        self.record_bytes = (3 + self.cell_bits + geo.size.bit_length() + 7) // 8
+        self.records = bytearray()
+        self.undo_stack = []  # (kind, cell, digit, what the move replaced)
+        self.redo_stack = []
+        self.hinted = set()
+        self.score = 0
+        self.mistakes = 0
+    def __len__(self):
+        return len(self.records) // self.record_bytes
+    def _append(self, kind, i=0, digit=0):
+        self.records += (kind | i << 3 | digit << (3 + self.cell_bits)).to_bytes(self.record_bytes, "little")
+    def _record(self, kind, i, digit, replaced):
+        self._append(kind, i, digit)
+        self.undo_stack.append((kind, i, digit, replaced))
+        self.redo_stack.clear()
+    def _set(self, i, num):
+        # A new conflict counts a mistake and clearing a conflicting cell takes one back
+        board = self.board
+        r, c = divmod(i, self.geometry.size)
+        old_conflict = board.has_conflict(r, c)
+        board.set(r, c, num)
+        new_conflict = board.has_conflict(r, c)
+        if num and new_conflict and not old_conflict:
+            self.mistakes += 1
+        elif not num and old_conflict and not new_conflict:
+            self.mistakes = max(0, self.mistakes - 1)
+    def place(self, i, num):
+        """Write num (0 clears) into non-clue cell i; returns the points scored."""
+        board = self.board
+        r, c = divmod(i, self.geometry.size)
+        replaced = board.player.cells[i]
+        candidates = board.candidate_count(r, c)
+        is_correct = num == board.solution.cells[i]
+        self._set(i, num)
+        points = 0
+        if num and is_correct and i not in self.hinted:
+            points = 100 * (self.geometry.size - candidates + 1) * self.multiplier
+            self.score += points
+        self._record(MOVE_SET, i, num, replaced)
+        return points
+    def toggle_note(self, i, num):
+        self.board.toggle_note(*divmod(i, self.geometry.size), num)
+        self._record(MOVE_NOTE, i, num, None)
+    def clear_notes(self, i):
+        r, c = divmod(i, self.geometry.size)
+        replaced = self.board.notes[i]
+        self.board.clear_notes(r, c)
+        self._record(MOVE_CLEAR_NOTES, i, 0, replaced)
+    def hint(self, i):
+        """Fill empty cell i from the solution. Hints score nothing and cannot be undone."""
+        self.board.set(*divmod(i, self.geometry.size), self.board.solution.cells[i])
+        self.hinted.add(i)
+        self._append(MOVE_HINT, i)
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+    def _apply(self, kind, i, value):
+        # value is the digit to write or toggle, or for MOVE_CLEAR_NOTES the marks to leave
+        if kind == MOVE_SET:
+            self._set(i, value)
+        elif kind == MOVE_NOTE:
+            self.board.toggle_note(*divmod(i, self.geometry.size), value)
+        else:
+            self.board.set_notes(*divmod(i, self.geometry.size), value)
+    def undo(self):
+        """Take back the last move, scoring nothing; returns its cell, or None if there is none."""
+        if not self.undo_stack:
+            return None
+        move = kind, i, digit, replaced = self.undo_stack.pop()
+        self._apply(kind, i, digit if kind == MOVE_NOTE else replaced)
+        self._append(MOVE_UNDO)
+        self.redo_stack.append(move)
+        return i
+    def redo(self):
+        """Make the last undone move again, scoring nothing; returns its cell, or None."""
+        if not self.redo_stack:
+            return None
+        move = kind, i, digit, replaced = self.redo_stack.pop()
+        self._apply(kind, i, digit)
+        self._append(MOVE_REDO)
+        self.undo_stack.append(move)
+        return i
+    def to_bytes(self, with_clues=True):
+        """The journal in its binary form; with_clues=False leaves out clues a seed cannot regenerate."""
+        geo = self.geometry
+        embed = with_clues and self.seed is None
+        flags = (JOURNAL_SEEDED if self.seed is not None else 0) | (JOURNAL_CLUES if embed else 0)
+        parts = [JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, geo.box, flags, self.multiplier,
+                                     self.seed or 0, self.remove_count)]
+        if embed:
+            parts.append(_pack_bits(list(self.clues.cells), geo.size.bit_length()))
+        parts.append(bytes(self.records))
+        return b"".join(parts)
+    @classmethod
+    def from_bytes(cls, data, clues=None, solution=None, solutions=None):
+        """Replay a to_bytes() journal; raises ValueError if it is malformed or breaks the rules.
+
+        The puzzle comes from the embedded clues, from clues (checked against the seed
+        through PUZZLE_CACHE when the journal has one) or from the seed; solution saves solving it again when the caller already has it, and
+        solutions, a dict of solutions by clue bytes, does so across many journals.
+        """
+        flags, multiplier, seed, remove_count, clues, solution, pos = cls._read_puzzle(data, clues, solution)
+        box = clues.geometry.box
+        if solution is None and solutions is not None:
+            solution = solutions.get(bytes(clues.cells))
+        if solution is None:
+            solution = BitmaskSolver(box=box).solve(clues)
+            if solution is None:
+                raise ValueError("journal's puzzle has no solution")
+            if solutions is not None:
+                solutions[bytes(clues.cells)] = solution
+        return cls.replay(clues, solution, data[pos:], multiplier, seed if flags & JOURNAL_SEEDED else None,
+                          remove_count)
+    @staticmethod
+    def _read_puzzle(data, clues=None, solution=None):
+        """Header fields, clues, solution (or the one given) and records offset of a journal."""
+        if len(data) < JOURNAL_HEADER.size:
+            raise ValueError("journal is truncated")
+        magic, version, box, flags, multiplier, seed, remove_count = JOURNAL_HEADER.unpack_from(data)
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION or box not in BOX_SIZES:
+            raise ValueError("not a pydoku move journal")
+        geo = geometry(box)
+        pos = JOURNAL_HEADER.size
+        if flags & JOURNAL_CLUES:
+            width = geo.size.bit_length()
+            end = pos + (geo.cells * width + 7) // 8
+            if end > len(data):
+                raise ValueError("journal is truncated")
+            clues = Board(_unpack_bits(data[pos:end], width, geo.cells), box)
+            pos = end
+        elif flags & JOURNAL_SEEDED:
+            seeded, seeded_solution = PUZZLE_CACHE.get(seed, remove_count, box)
+            if clues is None:
+                clues, solution = seeded, seeded_solution
+            elif Board.of(clues) != Board.from_array(seeded):
+                raise ValueError("journal's seed does not give its puzzle")
+        elif clues is None:
+            raise ValueError("journal needs its puzzle's clues")
+        clues = Board.of(clues)
+        if clues.geometry is not geo or max(clues.cells) > geo.size:
+            raise ValueError("journal does not match its puzzle")
+        return flags, multiplier, seed, remove_count, clues, solution, pos
+    @classmethod
+    def puzzle_of(cls, data):
+        """The clues of a journal's puzzle, without replaying it; raises ValueError like from_bytes."""
+        return cls._read_puzzle(data)[4]
+    @classmethod
+    def replay(cls, clues, solution, records, multiplier=1, seed=None, remove_count=0):
+        """Re-run packed records from the clues; the returned journal holds the final board and score."""
+        clues = Board.of(clues)
+        board = BoardState(clues.copy(), solution, track_candidates=False)
+        journal = cls(board, multiplier, seed, remove_count, clues)
+        geo = journal.geometry
+        size, cells, record_bytes = geo.size, geo.cells, journal.record_bytes
+        if len(records) % record_bytes:
+            raise ValueError("journal is truncated")
+        clue_cells, values = clues.cells, board.player.cells
+        cell_mask = (1 << journal.cell_bits) - 1
+        digit_shift = 3 + journal.cell_bits
+        codes = (struct.iter_unpack("<H", records) if record_bytes == 2
+                 else ((int.from_bytes(records[k:k + record_bytes], "little"),)
+                       for k in range(0, len(records), record_bytes)))
+        for code, in codes:
+            kind, i, digit = code & 7, code >> 3 & cell_mask, code >> digit_shift
+            if kind > MOVE_REDO:
+                raise ValueError(f"journal has an unknown move kind {kind}")
+            if kind >= MOVE_UNDO:
+                if (journal.undo() if kind == MOVE_UNDO else journal.redo()) is None:
+                    raise ValueError("journal undoes or redoes a move that is not there")
+                continue
+            if i >= cells or digit > size or clue_cells[i]:
+                raise ValueError(f"journal move at cell {i} is not allowed")
+            if kind == MOVE_SET:
+                journal.place(i, digit)
+            elif values[i] or (kind == MOVE_NOTE and not digit):
+                raise ValueError(f"journal move at cell {i} is not allowed")
+            elif kind == MOVE_NOTE:
+                journal.toggle_note(i, digit)
+            elif kind == MOVE_CLEAR_NOTES:
+                journal.clear_notes(i)
+            else:
+                journal.hint(i)
+        return journal
+
+class GameClock:
+    """Play time in seconds that stands still while the game is paused."""
+    def __init__(self, elapsed=0.0, paused=False):
+        self.offset = elapsed
+        self.started = None if paused else time.monotonic()
+    @property
+    def paused(self):
+        return self.started is None
+    def pause(self):
+        if self.started is not None:
+            self.offset += time.monotonic() - self.started
+            self.started = None
+    def resume(self):
+        if self.started is None:
+            self.started = time.monotonic()
+    def elapsed(self):
+        return self.offset + (time.monotonic() - self.started if self.started is not None else 0.0)
+
+# Saved game layout: header, difficulty name, then bit-packed sections (bit k of byte k // 8 first):
+# a clue flag per cell, every cell's value, a pencil-mark flag per cell, the marks of flagged cells,
+# a hinted flag per cell when SAVE_HINTED is set, and when SAVE_JOURNAL is set a 4-byte length
+# and the game's MoveJournal without its clues. Values take just enough bits for the grid's
+# digits, marks one bit per digit. The solution is not stored; it is solved again from the clues.
+SAVE_PATH = os.environ.get("PYDOKU_SAVE", "pydoku.save")
+SAVE_MAGIC = b"PYDS"
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct("<4sBBBBIHIH")  # magic, version, box, flags, name length, score, mistakes, ms, cursor
+SAVE_PAUSED, SAVE_AUTO_NOTES, SAVE_NOTES_MODE, SAVE_HINTED, SAVE_JOURNAL = 1, 2, 4, 8, 16
+AUTOSAVE_DELAY = 0.5  # seconds without a change before the autosave is written
+
+def _pack_bits(values, width):
+    packed = 0
+    for value in reversed(values):
+        packed = packed << width | value
+    return packed.to_bytes((len(values) * width + 7) // 8, "little")
+
+def _unpack_bits(data, width, count):
+    packed = int.from_bytes(data, "little")
+    mask = (1 << width) - 1
+    return [packed >> (k * width) & mask for k in range(count)]
+
+class GameSnapshot:
+    """A game in progress in the compact binary form saved games use.
+
+    A 9x9 game packs into about 100 bytes: the clues, every cell's value, pencil
+    marks as digit bitmasks, hinted cells, score, mistakes, play time, the cursor
+    and the mode switches. The move journal, when there is one, adds two bytes a
+    move so undo history and the audit trail survive a resume.
+    """
+    def __init__(self, difficulty, clues, values, notes=None, hinted=(), score=0, mistakes=0, elapsed=0.0,
+                 paused=False, auto_notes=False, notes_mode=False, selected=(0, 0), journal=None):
+        self.difficulty = difficulty
+        self.clues = Board.of(clues)
+        self.values = Board.of(values)
+        self.notes = list(notes) if notes is not None else [0] * self.clues.geometry.cells
+        self.hinted = set(hinted)
+        self.score = score
+        self.mistakes = mistakes
+        self.elapsed = elapsed
+        self.paused = paused
+        self.auto_notes = auto_notes
+        self.notes_mode = notes_mode
+        self.selected = selected
+        self.journal = journal  # MoveJournal.to_bytes(with_clues=False) output
+    @classmethod
+    def of_game(cls, difficulty, original, board, journal=None, **counters):
+        """Snapshot a BoardState, its clue Board and MoveJournal; counters are the keyword fields above."""
+        if journal is not None:
+            counters.update(score=journal.score, mistakes=journal.mistakes, hinted=journal.hinted,
+                            journal=journal.to_bytes(with_clues=False))
+        return cls(difficulty, original.copy(), board.player.copy(), board.notes, auto_notes=board.auto_notes,
+                   **counters)
+    def to_bytes(self):
+        geo = self.clues.geometry
+        cells, width = geo.cells, geo.size.bit_length()
+        flags = ((SAVE_PAUSED if self.paused else 0) | (SAVE_AUTO_NOTES if self.auto_notes else 0)
+                 | (SAVE_NOTES_MODE if self.notes_mode else 0) | (SAVE_HINTED if self.hinted else 0)
+                 | (SAVE_JOURNAL if self.journal is not None else 0))
+        name = self.difficulty.encode()
+        r, c = self.selected
+        parts = [SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, geo.box, flags, len(name), self.score,
+                                  min(self.mistakes, 0xFFFF), round(self.elapsed * 1000), r * geo.size + c),
+                 name,
+                 _pack_bits([1 if d else 0 for d in self.clues.cells], 1),
+                 _pack_bits(list(self.values.cells), width),
+                 _pack_bits([1 if mask else 0 for mask in self.notes], 1),
+                 _pack_bits([mask for mask in self.notes if mask], geo.size)]
+        if self.hinted:
+            parts.append(_pack_bits([1 if i in self.hinted else 0 for i in range(cells)], 1))
+        if self.journal is not None:
+            parts += [struct.pack("<I", len(self.journal)), self.journal]
+        return b"".join(parts)
+    @classmethod
+    def from_bytes(cls, data):
+        """Parse to_bytes() output; raises ValueError for anything else."""
+        if len(data) < SAVE_HEADER.size:
+            raise ValueError("saved game is truncated")
+        magic, version, box, flags, name_len, score, mistakes, ms, cursor = SAVE_HEADER.unpack_from(data)
+        if magic != SAVE_MAGIC or version != SAVE_VERSION or box not in BOX_SIZES:
+            raise ValueError("not a pydoku saved game")
+        geo = geometry(box)
+        cells, width = geo.cells, geo.size.bit_length()
+        pos = SAVE_HEADER.size
+        def take(nbytes):
+            nonlocal pos
+            if pos + nbytes > len(data):
+                raise ValueError("saved game is truncated")
+            pos += nbytes
+            return data[pos - nbytes:pos]
+        flag_bytes = (cells + 7) // 8
+        difficulty = take(name_len).decode()
+        is_clue = _unpack_bits(take(flag_bytes), 1, cells)
+        values = _unpack_bits(take((cells * width + 7) // 8), width, cells)
+        noted = _unpack_bits(take(flag_bytes), 1, cells)
+        marks = iter(_unpack_bits(take((sum(noted) * geo.size + 7) // 8), geo.size, sum(noted)))
+        notes = [next(marks) if flag else 0 for flag in noted]
+        hinted = ()
+        if flags & SAVE_HINTED:
+            hinted = [i for i, flag in enumerate(_unpack_bits(take(flag_bytes), 1, cells)) if flag]
+        journal = None
+        if flags & SAVE_JOURNAL:
+            journal = take(struct.unpack("<I", take(4))[0])
+        if pos != len(data) or max(values) > geo.size or cursor >= cells:
+            raise ValueError("saved game is corrupt")
+        clues = Board([v if clue else 0 for v, clue in zip(values, is_clue)], box)
+        return cls(difficulty, clues, Board(values, box), notes, hinted, score, mistakes, ms / 1000,
+                   paused=bool(flags & SAVE_PAUSED), auto_notes=bool(flags & SAVE_AUTO_NOTES),
+                   notes_mode=bool(flags & SAVE_NOTES_MODE), selected=divmod(cursor, geo.size), journal=journal)
+    def restore(self, multiplier=1):
+        """Rebuild the saved (BoardState, MoveJournal), solving the clues again for the solution.
+
+        multiplier scores the rest of the game when the save has no journal of its own.
+        """
+        solution = BitmaskSolver(box=self.clues.geometry.box).solve(self.clues)
+        if solution is None:
+            raise ValueError("saved game has no solution")
+        if self.journal is not None:
+            journal = MoveJournal.from_bytes(self.journal, self.clues, solution)
+            if journal.board.player != self.values:
+                raise ValueError("saved game does not match its journal")
+            # The replay board skips candidate tracking, so play continues on a full one
+            board = journal.board = BoardState(self.values.copy(), solution)
+        else:
+            board = BoardState(self.values.copy(), solution)
+            journal = MoveJournal(board, multiplier, clues=self.clues)
+            journal.hinted, journal.score, journal.mistakes = set(self.hinted), self.score, self.mistakes
+        board.auto_notes = self.auto_notes
+        board.notes[:] = self.notes
+        return board, journal
+
+def load_saved_game(path=SAVE_PATH):
+    """The GameSnapshot saved at path, or None if there is no readable save."""
+    try:
+        with open(path, "rb") as f:
+            return GameSnapshot.from_bytes(f.read())
+    except (OSError, ValueError):
+        return None
+
+class Autosaver:
+    """Writes game snapshots from a background thread, debounced and atomically.
+
+    save() only hands the bytes over, so the caller never waits on the disk. The
+    writer waits until delay seconds pass without a newer snapshot, writes it to a
+    temporary file and renames that over path, so a crash mid-write leaves the
+    previous save intact. flush() writes anything pending immediately.
+    """
+    def __init__(self, path=SAVE_PATH, delay=AUTOSAVE_DELAY):
+        self.path = path
+        self.delay = delay
+        self.pending = None  # (sequence number, bytes)
+        self.due = 0.0
+        self.sequence = 0
+        self.written = 0  # sequence number on disk; older snapshots are never written over it
+        self.writes = 0
+        self.error = None
+        self.cond = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.thread = None
+    def save(self, data):
+        with self.cond:
+            self.sequence += 1
+            self.pending = (self.sequence, data)
+            self.due = time.monotonic() + self.delay
+            if self.thread is None:
+                import atexit
+                atexit.register(self.flush)
+                self.thread = threading.Thread(target=self._run, daemon=True, name="pydoku-autosave")
+                self.thread.start()
+            self.cond.notify()
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.pending is None:
+                    self.cond.wait()
+                wait = self.due - time.monotonic()
+                if wait > 0:
+                    self.cond.wait(wait)
+                    continue
+                pending, self.pending = self.pending, None
+            self._write(*pending)
+    def _write(self, sequence, data):
+        with self.write_lock:
+            if sequence <= self.written:
+                return
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except OSError as e:
+                self.error = e
+                return
+            self.written = sequence
+            self.writes += 1
+    def flush(self):
+        with self.cond:
+            pending, self.pending = self.pending, None
+        if pending is not None:
+            self._write(*pending)
+    def discard(self):
+        """Drop any pending snapshot and delete the save, e.g. once the game is won."""
+        with self.cond:
+            self.pending = None
+            self.sequence += 1
+            sequence = self.sequence
+        with self.write_lock:
+            self.written = sequence
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+# Puzzle bank layout: header, one index entry per difficulty section, then fixed-size records.
+# A record is the puzzle then its solution, two cells per byte (high nibble first, last byte padded).
+BANK_MAGIC = b"PYDKBANK"
+BANK_VERSION = 1
+BANK_HEADER = struct.Struct("<8sHH")     # magic, version, section count
+BANK_SECTION = struct.Struct("<16sHQQ")  # name, remove_count, first record, record count
+BANK_RECORD_SIZE = 82
+BANK_PATH = os.environ.get("PYDOKU_BANK", "puzzles.bank")
+
+def pack_cells(grids):
+    """Pack (n,81) digit grids into (n,41) uint8 rows, two cells per byte."""
+    cells = np.zeros((len(grids), 82), dtype=np.uint8)
+    cells[:, :81] = np.asarray(grids).reshape(len(grids), 81)
+    return (cells[:, 0::2] << 4) | cells[:, 1::2]
+def unpack_cells(packed):
+    cells = np.empty(packed.shape[:-1] + (82,), dtype=np.uint8)
+    cells[..., 0::2] = packed >> 4
+    cells[..., 1::2] = packed & 0x0F
+    return cells[..., :81]
+
+class PuzzleBank:
+    """Read-only, memory-mapped view of a puzzle bank file.
+
+    Puzzles are numbered from 0 across all sections; reading one touches only its
+    82-byte record.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, section_count = BANK_HEADER.unpack_from(self.data, 0)
+        except (ValueError, struct.error):
+            self.file.close()
+            raise ValueError(f"{path} is not a puzzle bank")
+        if magic != BANK_MAGIC or version != BANK_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {BANK_VERSION} puzzle bank")
+        self.sections = {}
+        for k in range(section_count):
+            name, remove_count, first, count = BANK_SECTION.unpack_from(self.data, BANK_HEADER.size + k * BANK_SECTION.size)
+            self.sections[name.rstrip(b"\0").decode()] = (remove_count, first, count)
+        self.records_offset = BANK_HEADER.size + section_count * BANK_SECTION.size
+        self.total = sum(count for _, _, count in self.sections.values())
+    def __len__(self):
+        return self.total
+    def count(self, difficulty):
+        section = self.sections.get(difficulty.lower())
+        return section[2] if section else 0
+    def difficulty_of(self, index):
+        for name, (_, first, count) in self.sections.items():
+            if first <= index < first + count:
+                return name
+        raise IndexError(f"puzzle {index} is not in the bank")
+    def get(self, index):
+        """Return (difficulty, puzzle, solution) for puzzle number index."""
+        name = self.difficulty_of(index)
+        record = np.frombuffer(self.data, dtype=np.uint8, count=BANK_RECORD_SIZE,
+                               offset=self.records_offset + index * BANK_RECORD_SIZE)
+        cells = unpack_cells(record.reshape(2, 41)).astype(int)
+        return name, cells[0].reshape(3, 3, 3, 3), cells[1].reshape(3, 3, 3, 3)
+    def draw(self, difficulty, rng=None):
+        """Return (index, puzzle, solution) for a random puzzle of the given difficulty."""
+        _, first, count = self.sections[difficulty.lower()]
+        index = first + (rng or random).randrange(count)
+        _, puzzle, solution = self.get(index)
+        return index, puzzle, solution
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+def open_puzzle_bank(path=BANK_PATH):
+    """Open the puzzle bank at path, or return None if there is no usable one."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return PuzzleBank(path)
+    except (OSError, ValueError):
+        return None
+def _bank_chunk(remove_count, n, seed, per_grid, dedup=False):
+    """Generate n packed bank records; with dedup, also their canonical puzzle IDs."""
+    puzzles, solutions = generate_puzzles(n, remove_count, seed=seed, per_grid=per_grid)
+    records = np.hstack([pack_cells(puzzles), pack_cells(solutions)])
+    return records.tobytes(), [canonical_id(p) for p in puzzles] if dedup else None
+def build_bank(path, difficulties, count, seed=None, per_grid=1, chunk=500, workers=None, dedup=True):
+    """Write a bank of count puzzles for each (name, remove_count) in difficulties.
+
+    Chunks of puzzles are generated in worker processes and streamed straight to disk.
+    per_grid=1 makes every puzzle a fresh generate_puzzle call; larger values remix each
+    generated grid into that many puzzles, which is much faster. With dedup, a puzzle
+    that is a symmetric copy of one already in the bank, in any section, is dropped and
+    replaced; remixes are such copies, so dedup wants per_grid=1.
+    Returns the number of duplicates dropped.
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    sections = list(difficulties.items())
+    index = PuzzleIndex()
+    dropped = 0
+    from concurrent.futures import ProcessPoolExecutor
+    with open(path, "wb") as f, ProcessPoolExecutor(max_workers=workers) as executor:
+        window = 2 * (workers or os.cpu_count() or 1)
+        f.write(BANK_HEADER.pack(BANK_MAGIC, BANK_VERSION, len(sections)))
+        for k, (name, remove_count) in enumerate(sections):
+            f.write(BANK_SECTION.pack(name.lower().encode()[:16], remove_count, k * count, count))
+        for k, (name, remove_count) in enumerate(sections):
+            # Chunks stay in flight until the section is full, so duplicates cost a few more chunks, not a pass
+            written = pending = j = 0
+            in_flight = deque()
+            while written < count:
+                while written + pending < count and len(in_flight) < window:
+                    size = min(chunk, count - written - pending)
+                    chunk_seed = int(np.random.SeedSequence([seed, k, j]).generate_state(1)[0])
+                    in_flight.append((size, executor.submit(_bank_chunk, remove_count, size, chunk_seed, per_grid, dedup)))
+                    pending += size
+                    j += 1
+                size, future = in_flight.popleft()
+                pending -= size
+                records, ids = future.result()
+                if ids is not None:
+                    keep = []
+                    for i, puzzle_id in enumerate(ids):
+                        if written + len(keep) == count:
+                            break
+                        if index.add(puzzle_id, (name, written + len(keep))):
+                            keep.append(records[i * BANK_RECORD_SIZE:(i + 1) * BANK_RECORD_SIZE])
+                        else:
+                            dropped += 1
+                    records = b"".join(keep)
+                f.write(records)
+                written += len(records) // BANK_RECORD_SIZE
+            for _, future in in_flight:
+                future.cancel()
+    return dropped
+def build_bank_command(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog="pydoku.py build-bank", description="Fill a puzzle bank file.")
+    parser.add_argument("path", nargs="?", default=BANK_PATH)
+    parser.add_argument("--count", type=int, default=1000, help="puzzles per difficulty")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--per-grid", type=int, default=1, help="puzzles remixed from each generated grid")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="keep puzzles that are symmetric copies of others in the bank")
+    opts = parser.parse_args(args)
+    if opts.per_grid > 1 and not opts.keep_duplicates:
+        parser.error("--per-grid remixes are symmetric copies of each other; add --keep-duplicates to keep them")
+    difficulties = {d["name"]: d["remove_count"] for d in SudokuCLI().difficulties.values()}
+    start = time.time()
+    dropped = build_bank(opts.path, difficulties, opts.count, seed=opts.seed, per_grid=opts.per_grid,
+                         workers=opts.workers, dedup=not opts.keep_duplicates)
+    total = opts.count * len(difficulties)
+    print(f"Wrote {total} puzzles to {opts.path} in {time.time() - start:.1f}s"
+          + (f" ({dropped} duplicates dropped)" if dropped else ""))
+    return 0
+
+LEADERBOARD_DB = os.environ.get("PYDOKU_LEADERBOARD", "leaderboards.db")
+LEADERBOARD_TEXT = "leaderboards.txt"
+LEADERBOARD_PAGE = 50
+
+def difficulty_key(name, box=3):
+    """Leaderboard difficulty for name on box's grid; 9x9 keeps the bare names older entries use."""
+    return name if box == 3 else f"{name} {box * box}x{box * box}"
+
+class Leaderboard:
+    """SQLite-backed leaderboard, indexed for paged top-K queries per difficulty and per player.
+
+    SQLite's file locking (in WAL mode, with a busy timeout) serialises writers, so
+    several processes can record scores at once. A new database imports the old
+    pipe-delimited leaderboards.txt if there is one.
+    """
+    @timed("leaderboard_open")
+    def __init__(self, path=LEADERBOARD_DB, legacy_path=LEADERBOARD_TEXT):
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+                self.conn.execute("""CREATE TABLE IF NOT EXISTS scores (
+                    id INTEGER PRIMARY KEY, nickname TEXT NOT NULL, score INTEGER NOT NULL,
+                    time TEXT NOT NULL, date TEXT NOT NULL, difficulty TEXT NOT NULL)""")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS scores_by_difficulty ON scores (difficulty, score DESC)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS scores_by_player ON scores (nickname, score DESC)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC)")
+                if legacy_path and os.path.exists(legacy_path):
+                    self._insert(self.read_text(legacy_path))
+                self.conn.execute("PRAGMA user_version = 1")
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] == 1:
+                # The move journal behind a score, so audit can replay it; older rows have none
+                self.conn.execute("ALTER TABLE scores ADD COLUMN journal BLOB")
+                self.conn.execute("PRAGMA user_version = 2")
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] == 2:
+                # The canonical ID of the puzzle played, so scores on symmetric copies rank together
+                self.conn.execute("ALTER TABLE scores ADD COLUMN puzzle_id TEXT")
+                self.conn.execute("CREATE INDEX scores_by_puzzle ON scores (puzzle_id, score DESC)")
+                self._backfill_puzzle_ids()
+                self.conn.execute("PRAGMA user_version = 3")
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            self.conn.close()
+            raise
+    def _backfill_puzzle_ids(self):
+        """Fill puzzle_id from the journals of older rows; rows without a readable one stay NULL."""
+        ids = {}
+        updates = []
+        for entry_id, data in self.conn.execute("SELECT id, journal FROM scores WHERE journal IS NOT NULL").fetchall():
+            try:
+                clues = bytes(MoveJournal.puzzle_of(data).cells)
+            except ValueError:
+                continue
+            if clues not in ids:
+                ids[clues] = canonical_id(Board(clues, box_of_cells(len(clues))))
+            updates.append((ids[clues], entry_id))
+        self.conn.executemany("UPDATE scores SET puzzle_id = ? WHERE id = ?", updates)
+    @staticmethod
+    def read_text(path):
+        with open(path) as f:
+            for line in f:
+                parts = line.strip().split("|")
+                if len(parts) == 5 and parts[1].lstrip("-").isdigit():
+                    nick, score, t, date, diff = parts
+                    yield nick, int(score), t, date, diff
+    def _insert(self, entries):
+        self.conn.executemany("INSERT INTO scores (nickname, score, time, date, difficulty) VALUES (?, ?, ?, ?, ?)", entries)
+    def import_text(self, path=LEADERBOARD_TEXT):
+        """Import a pipe-delimited leaderboard file in one transaction; returns the rows added."""
+        before = self.count()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._insert(self.read_text(path))
+        return self.count() - before
+    @timed("leaderboard_add")
+    def add(self, nickname, score, timestr, date, difficulty, journal=None, puzzle_id=None):
+        """Record a score; journal is the game's MoveJournal.to_bytes(), kept for audit, and
+        puzzle_id the puzzle's canonical_id()."""
+        self.add_many([(nickname, score, timestr, date, difficulty, journal, puzzle_id)])
+    def add_many(self, entries):
+        """Record (nickname, score, time, date, difficulty, journal, puzzle_id) rows in one transaction."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany("INSERT INTO scores (nickname, score, time, date, difficulty, journal, puzzle_id) "
+                                  "VALUES (?, ?, ?, ?, ?, ?, ?)", entries)
+    def journals(self):
+        """Yield (id, nickname, score, journal) for every entry recorded with a journal."""
+        yield from self.conn.execute("SELECT id, nickname, score, journal FROM scores WHERE journal IS NOT NULL")
+    def _where(self, difficulty, player, puzzle_id=None):
+        clauses, params = [], []
+        if difficulty is not None:
+            clauses.append("difficulty = ?")
+            params.append(difficulty)
+        if player is not None:
+            clauses.append("nickname = ?")
+            params.append(player)
+        if puzzle_id is not None:
+            clauses.append("puzzle_id = ?")
+            params.append(puzzle_id)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+    @timed("leaderboard_top")
+    def top(self, difficulty=None, player=None, limit=LEADERBOARD_PAGE, offset=0, puzzle_id=None):
+        """Return (score, nickname, time, date, difficulty) rows, best first."""
+        where, params = self._where(difficulty, player, puzzle_id)
+        return self.conn.execute("SELECT score, nickname, time, date, difficulty FROM scores" + where +
+                                 " ORDER BY score DESC LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+    def count(self, difficulty=None, player=None, puzzle_id=None):
+        where, params = self._where(difficulty, player, puzzle_id)
+        return self.conn.execute("SELECT COUNT(*) FROM scores" + where, params).fetchone()[0]
+    def puzzles(self, limit=LEADERBOARD_PAGE):
+        """Return (puzzle_id, plays, best score) for the most played puzzles."""
+        return self.conn.execute("SELECT puzzle_id, COUNT(*), MAX(score) FROM scores WHERE puzzle_id IS NOT NULL "
+                                 "GROUP BY puzzle_id ORDER BY COUNT(*) DESC, MAX(score) DESC LIMIT ?",
+                                 [limit]).fetchall()
+    def close(self):
+        self.conn.close()
+
+def import_leaderboard_command(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog="pydoku.py import-leaderboard",
+                                     description="Import a pipe-delimited leaderboard file into the SQLite leaderboard.")
+    parser.add_argument("path", nargs="?", default=LEADERBOARD_TEXT)
+    parser.add_argument("--db", default=LEADERBOARD_DB)
+    opts = parser.parse_args(args)
+    leaderboard = Leaderboard(opts.db, legacy_path=None)
+    try:
+        print(f"Imported {leaderboard.import_text(opts.path)} entries into {opts.db}")
+    finally:
+        leaderboard.close()
+    return 0
+
+_AUDIT_SOLUTIONS = {}  # per process, so a worker solves each distinct puzzle once
+
+def _audit_chunk(entries):
+    """Replay (id, nickname, score, journal) entries; returns (count, failures)."""
+    failures = []
+    for entry_id, nickname, score, data in entries:
+        try:
+            journal = MoveJournal.from_bytes(data, solutions=_AUDIT_SOLUTIONS)
+        except ValueError as e:
+            failures.append((entry_id, nickname, score, str(e)))
+            continue
+        if not journal.board.solved():
+            failures.append((entry_id, nickname, score, "the moves do not solve the puzzle"))
+        elif journal.score != score:
+            failures.append((entry_id, nickname, score, f"the moves score {journal.score}"))
+    return len(entries), failures
+
+def audit_command(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog="pydoku.py audit",
+                                     description="Replay the move journal behind each leaderboard score and "
+                                                 "report scores the moves do not earn.")
+    parser.add_argument("--db", default=LEADERBOARD_DB)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=2000, help="entries per worker task")
+    opts = parser.parse_args(args)
+    leaderboard = Leaderboard(opts.db, legacy_path=None)
+    audited = 0
+    failures = []
+    def emit(result):
+        nonlocal audited
+        audited += result[0]
+        failures.extend(result[1])
+    start = time.perf_counter()
+    try:
+        _map_chunks(_audit_chunk, leaderboard.journals(), opts.chunk, opts.workers, emit)
+        unjournaled = leaderboard.count() - audited
+    finally:
+        leaderboard.close()
+    elapsed = time.perf_counter() - start
+    for entry_id, nickname, score, reason in failures:
+        print(f"entry {entry_id} ({nickname}, {score}): {reason}")
+    print(f"{audited} journaled entries audited in {elapsed:.2f}s ({audited / elapsed if elapsed else 0:.0f}/s), "
+          f"{len(failures)} failed; {unjournaled} entries have no journal")
+    return 1 if failures else 0
+
+def _map_chunks(fn, items, chunk, workers, emit, *args):
+    """Call emit(fn(batch, *args)) for each batch of up to chunk items, in input order.
+
+    With more than one worker the batches run in a process pool, with a bounded window
+    of batches in flight, so memory stays flat however many items there are.
+    """
+    items = iter(items)
+    batches = iter(lambda: list(islice(items, chunk)), [])
+    if workers <= 1:
+        for batch in batches:
+            emit(fn(batch, *args))
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for batch in batches:
+            in_flight.append(executor.submit(fn, batch, *args))
+            if len(in_flight) >= 2 * workers:
+                emit(in_flight.popleft().result())
+        while in_flight:
+            emit(in_flight.popleft().result())
+
+def _puzzle_lines(files):
+    """Non-blank, non-comment lines of files, or of stdin without any."""
+    import fileinput
+    for line in fileinput.input(files or ["-"]):
+        if line.strip() and not line.startswith("#"):
+            yield line
+
+def parse_puzzle_line(line):
+    """Parse one puzzle in the 81-character format ('.' or '0' for blanks) into cell digits.
+
+    256- and 625-character lines are 16x16 and 25x25 puzzles, with letters from A for
+    the digits past 9. Anything after the first whitespace-separated field is ignored;
+    returns None for lines that are not a puzzle.
+    """
+    fields = line.split()
+    box = box_of_cells(len(fields[0])) if fields else None
+    if box is None or box < 3:
+        return None
+    geo = geometry(box)
+    cells = []
+    for ch in fields[0]:
+        if ch in ".0":
+            cells.append(0)
+        else:
+            digit = geo.digit(ch)
+            if digit is None:
+                return None
+            cells.append(digit)
+    return cells
+def _solve_chunk(lines, solver_name=None):
+    """Solve a chunk of puzzle lines with the named backend; returns (output lines, outcome counts)."""
+    solvers = {}
+    out = []
+    counts = {"unique": 0, "multiple": 0, "unsolvable": 0, "invalid": 0}
+    for line in lines:
+        cells = parse_puzzle_line(line)
+        if cells is None:
+            counts["invalid"] += 1
+            out.append(f"{line.strip()} invalid")
+            continue
+        geo = geometry(box_of_cells(len(cells)))
+        if (solver_name or SOLVER_BACKEND) == "bitmask":
+            found = []
+            state = _bm_load(cells, geo)
+            if state is not None:
+                _bm_search(*state, 2, found, geo=geo)
+        else:
+            if geo.box not in solvers:
+                solvers[geo.box] = make_solver(solver_name, box=geo.box)
+            found = list(islice(solvers[geo.box]._solutions(cells, geo), 2))
+        if not found:
+            counts["unsolvable"] += 1
+            out.append(f"{line.split()[0]} unsolvable")
+            continue
+        solution = "".join(SYMBOLS[d - 1] for d in found[0])
+        if len(found) > 1:
+            counts["multiple"] += 1
+            out.append(f"{solution} multiple")
+        else:
+            counts["unique"] += 1
+            out.append(solution)
+    return out, counts
 
-    solve()
-    solution = grid.copy()
+def solve_command(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog="pydoku.py solve",
+                                     description="Solve 81-character puzzles (or 256/625 for 16x16 and 25x25), "
+                                                 "one per line, from files or stdin.")
+    parser.add_argument("files", nargs="*", help="puzzle files ('-' or none for stdin)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=1000, help="puzzles per worker task")
+    parser.add_argument("--solver", choices=sorted(SOLVERS), help="solver backend (default: PYDOKU_SOLVER or bitmask)")
+    opts = parser.parse_args(args)
 
-    positions = [(r,c) for r in range(9) for c in range(9)]
-    random.shuffle(positions)
-    for r, c in positions[:remove_count]:
-        grid[r, c] = 0
+    totals = {"unique": 0, "multiple": 0, "unsolvable": 0, "invalid": 0}
+    out = sys.stdout
+    def emit(result):
+        lines, counts = result
+        if lines:
+            out.write("\n".join(lines) + "\n")
+        for key, n in counts.items():
+            totals[key] += n
 
-    return grid.reshape(3,3,3,3), solution.reshape(3,3,3,3)
+    start = time.perf_counter()
+    _map_chunks(_solve_chunk, _puzzle_lines(opts.files), opts.chunk, opts.workers, emit, opts.solver)
+    out.flush()
+    elapsed = time.perf_counter() - start
+    total = sum(totals.values())
+    print(f"{total} puzzles in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f}/s): "
+          f"{totals['unique']} unique, {totals['multiple']} multiple solutions, "
+          f"{totals['unsolvable']} unsolvable, {totals['invalid']} invalid", file=sys.stderr)
+    return 0 if not (totals["unsolvable"] or totals["invalid"]) else 1
+
+def _dedup_chunk(lines):
+    """Canonical IDs of a chunk of puzzle lines, None for lines that are not a puzzle."""
+    ids = []
+    for line in lines:
+        cells = parse_puzzle_line(line)
+        ids.append(None if cells is None else canonical_id(Board(cells, box_of_cells(len(cells)))))
+    return lines, ids
+
+def dedup_command(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog="pydoku.py dedup",
+                                     description="Drop puzzles that are symmetric copies (relabeled, permuted or "
+                                                 "transposed) of an earlier one, reading puzzle lines from files or stdin.")
+    parser.add_argument("files", nargs="*", help="puzzle files ('-' or none for stdin)")
+    parser.add_argument("--ids", action="store_true", help="write 'id puzzle' lines, with each puzzle's canonical ID")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=2000, help="puzzles per worker task")
+    opts = parser.parse_args(args)
+
+    index = PuzzleIndex()
+    total = invalid = 0
+    out = sys.stdout
+    def emit(result):
+        nonlocal total, invalid
+        kept = []
+        for line, puzzle_id in zip(*result):
+            total += 1
+            puzzle = line.split()[0]
+            if puzzle_id is None:
+                invalid += 1
+            elif index.add(puzzle_id, total):
+                kept.append(f"{puzzle_id} {puzzle}" if opts.ids else puzzle)
+        if kept:
+            out.write("\n".join(kept) + "\n")
+
+    start = time.perf_counter()
+    # Results come back in input order, so the first copy of each puzzle is the one kept
+    _map_chunks(_dedup_chunk, _puzzle_lines(opts.files), opts.chunk, opts.workers, emit)
+    out.flush()
+    elapsed = time.perf_counter() - start
+    print(f"{total} puzzles in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f}/s): "
+          f"{len(index)} distinct, {total - invalid - len(index)} duplicates, {invalid} invalid", file=sys.stderr)
+    return 0 if not invalid else 1
+
+# Published "hardest" 9x9 puzzles, a fixed worst case next to the generated ones
+HARD_PUZZLES = {
+    "inkala-2012": "800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+    "ai-escargot": "100007090030020008009600500005300900010080002600004000300000010040000007007000300",
+}
+
+def compare_solvers_command(args):
+    import argparse
+    import fileinput
+    parser = argparse.ArgumentParser(prog="pydoku.py compare-solvers",
+                                     description="Solve the same puzzles with each backend and compare time and answers.")
+    parser.add_argument("files", nargs="*", help="puzzle files; without any, generated puzzles plus HARD_PUZZLES")
+    parser.add_argument("--solvers", default=",".join(SOLVERS), help="comma-separated backends (default: all)")
+    parser.add_argument("--count", type=int, default=20, help="puzzles to generate when no files are given")
+    parser.add_argument("--size", type=int, choices=[b * b for b in BOX_SIZES], default=9,
+                        help="grid size of generated puzzles")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--time-limit", type=float, default=60.0,
+                        help="seconds per backend; the rest of its puzzles are skipped once spent")
+    opts = parser.parse_args(args)
+    names = [name.strip() for name in opts.solvers.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SOLVERS]
+    if unknown:
+        parser.error(f"unknown solver {', '.join(unknown)}; choose from {', '.join(SOLVERS)}")
+
+    if opts.files:
+        puzzles = [(line.split()[0], cells) for line in fileinput.input(opts.files)
+                   if (cells := parse_puzzle_line(line)) is not None]
+    else:
+        box = math.isqrt(opts.size)
+        remove_count = scaled_remove_count(SudokuCLI().difficulties[4]["remove_count"], box)
+        puzzles = []
+        for k in range(opts.count):
+            puzzle, _ = generate_puzzle(remove_count, seed=opts.seed + k, box=box, solver="bitmask")
+            puzzles.append((f"seed {opts.seed + k}", puzzle.ravel().tolist()))
+        if box == 3:
+            puzzles += [(name, [int(ch) for ch in line]) for name, line in HARD_PUZZLES.items()]
+    if not puzzles:
+        print("compare-solvers: no puzzles to solve", file=sys.stderr)
+        return 1
+
+    answers = {}
+    print(f"{len(puzzles)} puzzles")
+    print(f"{'solver':<10} {'solved':>8} {'total s':>9} {'mean ms':>9} {'median ms':>10} {'max ms':>9}  slowest")
+    for name in names:
+        times = []
+        spent = 0.0
+        for label, cells in puzzles:
+            if spent > opts.time_limit:
+                break
+            solver = make_solver(name, box=box_of_cells(len(cells)))
+            start = time.perf_counter()
+            found = list(islice(solver._solutions(cells, geometry(box_of_cells(len(cells)))), 2))
+            elapsed = time.perf_counter() - start
+            spent += elapsed
+            times.append((elapsed, label))
+            # Which two solutions a backend meets first depends on its search order, so only
+            # the count and, for a unique puzzle, its solution are compared
+            answers.setdefault(label, {})[name] = len(found), tuple(found[0]) if len(found) == 1 else None
+        if not times:
+            continue
+        ms = sorted(t * 1e3 for t, _ in times)
+        slowest = max(times)[1]
+        print(f"{name:<10} {len(times):>4}/{len(puzzles):<3} {spent:>9.3f} {sum(ms) / len(ms):>9.2f} "
+              f"{ms[len(ms) // 2]:>10.2f} {ms[-1]:>9.2f}  {slowest}")
+
+    disagreements = [label for label, found in answers.items() if len(set(found.values())) > 1]
+    outcomes = ("no solution", "one solution", "several solutions")
+    for label in disagreements:
+        print(f"disagreement on {label}: " + ", ".join(f"{name} found {outcomes[count]}"
+                                                      for name, (count, _) in answers[label].items()), file=sys.stderr)
+    print("all backends agree" if not disagreements else f"{len(disagreements)} puzzles with differing answers")
+    return 1 if disagreements else 0
+
+class _StubCanvas:
+    """Canvas stand-in so the GUI renderer can be benchmarked headless."""
+    def __init__(self):
+        self.items = 0
+    def _create(self, *args, **kwargs):
+        self.items += 1
+        return self.items
+    create_line = create_rectangle = create_text = _create
+    def itemconfig(self, item, **kwargs):
+        pass
+    def coords(self, item, *args):
+        pass
+
+def _bench(fn, number, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    times.sort()
+    return {"per_op_s": times[len(times) // 2], "min_s": times[0], "number": number, "repeat": repeat}
+def run_benchmarks(seed=1234, leaderboard_sizes=(10_000, 100_000, 1_000_000), scale=1.0, repeat=5):
+    """Time the hot paths with fixed seeds and return {name: timing} results."""
+    import tempfile
+    from types import SimpleNamespace
+    results = {}
+    n = lambda count: max(1, int(count * scale))
+
+    rng = random.Random(seed)
+    solver = BitmaskSolver(rng=rng)
+    results["grid_fill"] = _bench(solver.fill, n(200), repeat)
+    cli = SudokuCLI()
+    for settings in cli.difficulties.values():
+        seeds = iter(range(seed, seed + 10**9))
+        results[f"generate_{settings['name']}"] = _bench(
+            lambda: generate_puzzle(settings["remove_count"], seed=next(seeds)), n(20), repeat)
+    for box in (4, 5):
+        seeds = iter(range(seed, seed + 10**9))
+        results[f"generate_expert_{box * box}x{box * box}"] = _bench(
+            lambda: generate_puzzle(scaled_remove_count(50, box), seed=next(seeds), box=box), 1, max(1, repeat // 2))
+
+    # Full boards with a few wrong digits, so conflict checks see both outcomes
+    boards = []
+    for k in range(20):
+        puzzle, solution = generate_puzzle(40, seed=seed + k)
+        player = solution.reshape(9, 9).copy()
+        for _ in range(5):
+            player[rng.randrange(9), rng.randrange(9)] = rng.randrange(1, 10)
+        boards.append((puzzle, player, solution))
+    states = [BoardState(player.copy(), solution) for _, player, solution in boards]
+    results["conflict_check_full_board"] = _bench(
+        lambda: [state.has_conflict(r, c) for state in states for r in range(9) for c in range(9)], n(50), repeat)
+    results["candidates_build"] = _bench(
+        lambda: [BoardState(player.copy(), solution) for _, player, solution in boards], n(20), repeat)
+    moves = [(rng.randrange(9), rng.randrange(9), rng.randrange(10)) for _ in range(1000)]
+    results["candidates_update"] = _bench(lambda: [states[0].set(r, c, v) for r, c, v in moves], n(20), repeat)
+
+    puzzle, player, solution = boards[0]
+    state = BoardState(player.copy(), solution)
+    results["cli_frame_build"] = _bench(
+        lambda: cli.block_grid_frame(puzzle, state.player, solution, cursor=(4, 4), difficulty_name="expert", board=state),
+        n(500), repeat)
+
+    colors = ("HIGHLIGHT_ALIGN", "HIGHLIGHT_HINT", "GRID_THICK", "GRID_THIN", "CLUE_COLOR", "PENCIL_COLOR",
+              "HIGHLIGHT_ANSWER", "INCORRECT_COLOR", "CORRECT_COLOR")
+    theme = SimpleNamespace(**{name: f"#{k:06x}" for k, name in enumerate(colors)})
+    renderer = CanvasRenderer(_StubCanvas(), 60, theme)
+    original = Board.from_array(puzzle)
+    keys = cycle(moves)
+    def keypress():
+        r, c, v = next(keys)
+        state.set(r, c, v)
+        renderer.draw_numbers(state, original, v)
+        renderer.highlight_selected((r, c), theme.HIGHLIGHT_ANSWER)
+        renderer.highlight_directionals((r, c))
+    results["gui_keypress_redraw"] = _bench(keypress, n(2000), repeat)
+
+    # Hints on the openings of rated puzzles, where the ladder has the most to look through
+    openings = [(Board.from_array(puzzle).cells, Board.from_array(solution).cells)
+                for puzzle, solution in (generate_puzzle(55, seed=seed + k) for k in range(20))]
+    results["logical_hint"] = _bench(lambda: [find_hint(cells, solution) for cells, solution in openings], n(20), repeat)
+
+    # A finished game with some notes, wrong guesses and undos, audited from its seed as a score would be
+    puzzle, solution = PUZZLE_CACHE.get(seed, 50)
+    game = MoveJournal(BoardState(puzzle, solution), 3, seed, 50)
+    blanks = [i for i, d in enumerate(Board.from_array(puzzle).cells) if not d]
+    rng.shuffle(blanks)
+    for i in blanks:
+        if rng.random() < 0.2:
+            game.toggle_note(i, rng.randrange(1, 10))
+        if rng.random() < 0.15:
+            game.place(i, rng.randrange(1, 10))
+            game.undo()
+        game.place(i, game.board.solution.cells[i])
+    data = game.to_bytes()
+    results["journal_replay"] = _bench(lambda: MoveJournal.from_bytes(data), n(500), repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in leaderboard_sizes:
+            path = os.path.join(tmp, f"leaderboard_{size}.db")
+            board = Leaderboard(path, legacy_path=None)
+            names = [f"player{k}" for k in range(1000)]
+            diffs = ["Easy", "Hard", "Expert", "Torture"]
+            with board.conn:
+                board.conn.execute("BEGIN")
+                board._insert((names[k % 1000], rng.randrange(100_000), "05:00", "2026-01-01 00:00", diffs[k % 4])
+                              for k in range(size))
+            board.close()
+            def open_and_query():
+                lb = Leaderboard(path, legacy_path=None)
+                lb.top()
+                lb.top("Expert")
+                lb.close()
+            results[f"leaderboard_open_{size}"] = _bench(open_and_query, n(20), repeat)
+    return results
+def compare_benchmarks(results, baseline, threshold=0.15, overrides=None):
+    """Return (name, baseline s, current s, ratio, regressed) rows for benchmarks in both runs."""
+    rows = []
+    for name, timing in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["per_op_s"], timing["per_op_s"]
+        ratio = new / old if old else float("inf")
+        limit = (overrides or {}).get(name, threshold)
+        rows.append((name, old, new, ratio, ratio > 1 + limit))
+    return rows
+def bench_command(args):
+    import argparse
+    import json
+    import platform
+    parser = argparse.ArgumentParser(prog="pydoku.py bench", description="Run the reproducible benchmark suite.")
+    parser.add_argument("--output", help="write JSON results here (default stdout)")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown fraction before failing")
+    parser.add_argument("--threshold-for", action="append", default=[], metavar="NAME=FRACTION",
+                        help="per-benchmark threshold override")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--quick", action="store_true", help="fewer iterations and only the 10k leaderboard")
+    opts = parser.parse_args(args)
+
+    sizes = (10_000,) if opts.quick else (10_000, 100_000, 1_000_000)
+    results = run_benchmarks(opts.seed, sizes, scale=0.2 if opts.quick else 1.0, repeat=3 if opts.quick else 5)
+    report = {"meta": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+                       "seed": opts.seed, "date": datetime.now().isoformat(timespec="seconds")},
+              "results": results}
+    for name, timing in results.items():
+        print(f"{name:<32}{timing['per_op_s'] * 1e3:>12.4f} ms", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if opts.output:
+        with open(opts.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if not opts.baseline:
+        return 0
+    with open(opts.baseline) as f:
+        baseline = json.load(f)["results"]
+    overrides = {}
+    for item in opts.threshold_for:
+        name, _, fraction = item.partition("=")
+        overrides[name] = float(fraction)
+    regressions = 0
+    print(f"\n{'benchmark':<32}{'baseline':>12}{'current':>12}{'ratio':>8}", file=sys.stderr)
+    for name, old, new, ratio, regressed in compare_benchmarks(results, baseline, opts.threshold, overrides):
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<32}{old * 1e3:>10.4f}ms{new * 1e3:>10.4f}ms{ratio:>8.2f}{flag}", file=sys.stderr)
+    return 1 if regressions else 0
+
+def _time_to_menu():
+    """Launch a fresh interpreter on this file and time it until the first menu prompt."""
+    import subprocess
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__)], stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output = b""
+    while not output.endswith(b"> "):
+        chunk = proc.stdout.read1(4096)
+        if not chunk:
+            break
+        output += chunk
+    elapsed = time.perf_counter() - start
+    proc.communicate(b"q\n")
+    return elapsed if output.endswith(b"> ") else None
+
+def startup_check_command(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog="pydoku.py startup-check",
+                                     description="Fail if cold start to the first menu exceeds a time budget.")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_MS, help="median budget in milliseconds")
+    parser.add_argument("--runs", type=int, default=5)
+    opts = parser.parse_args(args)
+
+    timings = []
+    for _ in range(opts.runs):
+        elapsed = _time_to_menu()
+        if elapsed is None:
+            print("startup-check: the menu prompt never appeared", file=sys.stderr)
+            return 2
+        timings.append(elapsed * 1e3)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print(f"launch to menu: median {median:.1f} ms, best {timings[0]:.1f} ms, worst {timings[-1]:.1f} ms "
+          f"(budget {opts.budget:.0f} ms)")
+    if median > opts.budget:
+        print("startup-check: over budget", file=sys.stderr)
+        return 1
+    return 0
+
+# Multiplayer races over TCP, one JSON object per line, each with an "op". A client sends
+#   join  {nick, room?, difficulty?, players?, seed?}  join the named room, or the next open one
+#   move  {cell, digit, id?}                            digit 0 clears; id is echoed in the reply
+#   stats {}
+# and the server answers with joined, lobby, start, moved, progress, finished, left, over,
+# stats and error messages, described where RaceServer sends them.
+RACE_HOST = os.environ.get("PYDOKU_RACE_HOST", "127.0.0.1")
+RACE_PORT = int(os.environ.get("PYDOKU_RACE_PORT", "8765"))
+RACE_TICK = 0.1  # seconds between batched progress broadcasts
+RACE_MAX_PLAYERS = 16
+RACE_MAX_BACKLOG = 1 << 20  # bytes a client may leave unread before it is dropped
+RACE_DIFFICULTIES = {"easy": (25, 1), "hard": (40, 2), "expert": (50, 3), "torture": (65, 4)}  # remove count, multiplier
+
+def _race_encode(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+def _race_write(writer, data):
+    if writer.is_closing():
+        return
+    writer.write(data)
+    if writer.transport.get_write_buffer_size() > RACE_MAX_BACKLOG:
+        writer.close()  # too slow to keep up; its reader sees the connection drop
+
+def _cancel_on_sigterm():
+    """Make SIGTERM cancel the current task, so a server gets to stop its worker processes on the way out."""
+    import signal
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:  # no signal handlers on Windows event loops
+        pass
+
+class RacePlayer:
+    __slots__ = ("nick", "writer", "room", "journal", "place", "seconds")
+    def __init__(self, nick, writer, room):
+        self.nick = nick
+        self.writer = writer
+        self.room = room
+        self.journal = None  # set when the race starts
+        self.place = 0
+        self.seconds = None
+
+class RaceRoom:
+    """One race: its players and, once it is full, the puzzle they all get."""
+    __slots__ = ("name", "difficulty", "size", "seed", "open_key", "players", "state", "clues", "puzzle_id",
+                 "blanks", "start_time", "finishers")
+    def __init__(self, name, difficulty, size, seed, open_key=None):
+        self.name = name
+        self.difficulty = difficulty
+        self.size = size
+        self.seed = seed
+        self.open_key = open_key  # matchmaking key while the room waits for players
+        self.players = []
+        self.state = "waiting"  # then "starting", "racing" and "over"
+        self.clues = None
+        self.puzzle_id = None
+        self.blanks = 0
+        self.start_time = 0.0
+        self.finishers = 0
+
+class RaceServer:
+    """Hosts any number of races in one asyncio loop.
+
+    Every player in a room gets the same seeded puzzle. Their moves go through their own
+    MoveJournal on a headless BoardState, so the server checks and scores each move
+    incrementally, with the same conflict rules as the frontends. Progress is not sent
+    per move: rooms that changed are marked, and each tick sends one progress message
+    per marked room. Puzzles are generated in worker processes. Results are written to
+    the leaderboard in batches from a thread that owns the connection.
+    """
+    def __init__(self, leaderboard_path=LEADERBOARD_DB, tick=RACE_TICK, workers=None):
+        from concurrent.futures import ThreadPoolExecutor
+        self.leaderboard_path = leaderboard_path
+        self.tick = tick
+        self.workers = workers
+        self.rooms = {}
+        self.open_rooms = {}  # (difficulty, size, seed) -> room filling up, for joins that name none
+        self.room_ids = count(1)
+        self.dirty = set()
+        self.results = []  # leaderboard rows waiting for the next batch
+        self.puzzles = OrderedDict()  # (seed, remove count) -> future of generate_puzzle's result
+        self.moves = 0
+        self.finished = 0
+        self.move_times = TimingHistogram()
+        self.generator = None
+        self.recorder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pydoku-race-results")
+        self.leaderboard = None  # opened and used on the recorder thread only
+        self.server = None
+        self.tasks = set()
+        self.clients = {}  # writer -> the task serving that connection
+    async def start(self, host=RACE_HOST, port=RACE_PORT):
+        """Listen on host:port (0 picks a free port) and return the bound (host, port)."""
+        self.server = await asyncio.start_server(self._serve_client, host, port, backlog=4096)
+        self._spawn(self._tick())
+        return self.server.sockets[0].getsockname()[:2]
+    async def close(self):
+        self.server.close()
+        for task in list(self.tasks):
+            task.cancel()
+        # Hang up on everyone and let their handlers finish, rather than cancelling them mid-read
+        clients = list(self.clients.items())
+        for writer, _ in clients:
+            writer.close()
+        await asyncio.gather(*(task for _, task in clients), return_exceptions=True)
+        self._flush_results()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.recorder, self._close_leaderboard)
+        self.recorder.shutdown()
+        if self.generator is not None:
+            self.generator.shutdown(cancel_futures=True)
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _serve_client(self, reader, writer):
+        self.clients[writer] = asyncio.current_task()
+        player = None
+        try:
+            async for line in reader:
+                try:
+                    message = json.loads(line)
+                    op = message["op"]
+                    if op == "move" and player is not None:
+                        self._move(player, message)
+                    elif op == "join" and (player is None or player.room.state == "over"):
+                        player = self._join(message, writer)
+                    elif op == "stats":
+                        _race_write(writer, _race_encode(self.stats()))
+                    else:
+                        raise ValueError(f"{op!r} is not allowed now")
+                except (ValueError, KeyError, TypeError) as e:
+                    # error {message}: the request was refused and changed nothing
+                    _race_write(writer, _race_encode({"op": "error", "message": str(e)}))
+        except (ConnectionError, ValueError):
+            pass  # dropped, or a line longer than the reader's limit
+        finally:
+            del self.clients[writer]
+            if player is not None:
+                self._leave(player)
+            writer.close()
+
+    def _join(self, message, writer):
+        nick = message["nick"]
+        if not isinstance(nick, str) or not 1 <= len(nick) <= 8 or not nick.isprintable():
+            raise ValueError("nick must be 1 to 8 printable characters")
+        difficulty = message.get("difficulty", "hard")
+        if difficulty not in RACE_DIFFICULTIES:
+            raise ValueError(f"difficulty must be one of {', '.join(RACE_DIFFICULTIES)}")
+        size = message.get("players", 2)
+        if type(size) is not int or not 1 <= size <= RACE_MAX_PLAYERS:
+            raise ValueError(f"players must be 1 to {RACE_MAX_PLAYERS}")
+        seed = message.get("seed")
+        if seed is not None and (type(seed) is not int or not 0 <= seed < 2 ** 32):
+            raise ValueError("seed must be an unsigned 32-bit integer")
+        name = message.get("room")
+        if name is None:
+            open_key = (difficulty, size, seed)
+            room = self.open_rooms.get(open_key)
+            if room is None:
+                room = self._new_room(f"race-{next(self.room_ids)}", difficulty, size, seed, open_key)
+                self.open_rooms[open_key] = room
+        else:
+            if not isinstance(name, str) or not 1 <= len(name) <= 64:
+                raise ValueError("room must be a name of up to 64 characters")
+            room = self.rooms.get(name) or self._new_room(name, difficulty, size, seed)
+        if room.state != "waiting":
+            raise ValueError(f"room {room.name} has already started")
+        if any(p.nick == nick for p in room.players):
+            raise ValueError(f"{nick} is already in room {room.name}")
+        player = RacePlayer(nick, writer, room)
+        room.players.append(player)
+        # joined {room, difficulty, size}, then lobby {players} to the whole room while it fills
+        _race_write(writer, _race_encode({"op": "joined", "room": room.name, "difficulty": room.difficulty,
+                                          "size": room.size}))
+        self._broadcast(room, {"op": "lobby", "players": [p.nick for p in room.players]})
+        if len(room.players) == room.size:
+            room.state = "starting"
+            self.open_rooms.pop(room.open_key, None)
+            self._spawn(self._start(room))
+        return player
+    def _new_room(self, name, difficulty, size, seed, open_key=None):
+        if seed is None:
+            seed = random.getrandbits(32)
+        room = self.rooms[name] = RaceRoom(name, difficulty, size, seed, open_key)
+        return room
+    async def _puzzle(self, seed, remove_count):
+        """generate_puzzle(remove_count, seed) from the worker processes, shared by rooms with one seed."""
+        key = (seed, remove_count)
+        future = self.puzzles.get(key)
+        if future is None:
+            if self.generator is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self.generator = ProcessPoolExecutor(max_workers=self.workers)
+            future = self.puzzles[key] = asyncio.get_running_loop().run_in_executor(
+                self.generator, generate_puzzle, remove_count, seed)
+            if len(self.puzzles) > PUZZLE_CACHE_SIZE:
+                self.puzzles.popitem(last=False)
+        else:
+            self.puzzles.move_to_end(key)
+        try:
+            return await future
+        except Exception:
+            self.puzzles.pop(key, None)
+            raise
+    async def _start(self, room):
+        remove_count, multiplier = RACE_DIFFICULTIES[room.difficulty]
+        puzzle, solution = await self._puzzle(room.seed, remove_count)
+        if not room.players:
+            return  # everyone left while it was generated
+        clues, solution = Board.from_array(puzzle), Board.from_array(solution)
+        room.clues = clues
+        room.puzzle_id = canonical_id(clues)
+        room.blanks = clues.cells.count(0)
+        for player in room.players:
+            board = BoardState(clues.copy(), solution, track_candidates=False)
+            player.journal = MoveJournal(board, multiplier, room.seed, remove_count, clues)
+        room.state = "racing"
+        room.start_time = time.monotonic()
+        # start {seed, difficulty, clues, players}: clues as an 81-character string, 0 for blanks
+        self._broadcast(room, {"op": "start", "seed": room.seed, "difficulty": room.difficulty,
+                               "clues": clues.to_string(), "players": [p.nick for p in room.players]})
+
+    def _move(self, player, message):
+        started = time.perf_counter()
+        room = player.room
+        if room.state != "racing" or player.place:
+            raise ValueError("not racing")
+        cell, digit = message["cell"], message["digit"]
+        geo = room.clues.geometry
+        if type(cell) is not int or type(digit) is not int or not 0 <= cell < geo.cells or not 0 <= digit <= geo.size:
+            raise ValueError(f"a move is a cell from 0 to {geo.cells - 1} and a digit from 0 to {geo.size}")
+        if room.clues.cells[cell]:
+            raise ValueError(f"cell {cell} is a clue")
+        journal = player.journal
+        journal.place(cell, digit)
+        board = journal.board
+        self.moves += 1
+        # moved {cell, digit, conflict, score, mistakes, id}: only to the mover
+        _race_write(player.writer, _race_encode({
+            "op": "moved", "cell": cell, "digit": digit, "conflict": board.has_conflict(*divmod(cell, geo.size)),
+            "score": journal.score, "mistakes": journal.mistakes, "id": message.get("id")}))
+        self.dirty.add(room)
+        if board.solved():
+            self._finish(player)
+        self.move_times.add(time.perf_counter() - started)
+    def _finish(self, player):
+        room = player.room
+        room.finishers += 1
+        player.place = room.finishers
+        player.seconds = time.monotonic() - room.start_time
+        journal = player.journal
+        self.finished += 1
+        # finished {nick, place, seconds, score}
+        self._broadcast(room, {"op": "finished", "nick": player.nick, "place": player.place,
+                               "seconds": round(player.seconds, 1), "score": journal.score})
+        m, s = divmod(int(player.seconds), 60)
+        self.results.append((player.nick, journal.score, f"{m:02d}:{s:02d}", datetime.now().strftime("%Y-%m-%d %H:%M"),
+                             f"{room.difficulty.capitalize()} Race", journal.to_bytes(), room.puzzle_id))
+        if all(p.place for p in room.players):
+            self._close_room(room)
+    def _leave(self, player):
+        room = player.room
+        if room.state == "over" or player not in room.players:
+            return
+        room.players.remove(player)
+        if not room.players:
+            self._close_room(room)
+        elif room.state == "waiting":
+            self._broadcast(room, {"op": "lobby", "players": [p.nick for p in room.players]})
+        else:
+            # left {nick}: a player dropped out of a race under way
+            self._broadcast(room, {"op": "left", "nick": player.nick})
+            self.dirty.add(room)
+            if room.state == "racing" and all(p.place for p in room.players):
+                self._close_room(room)
+    def _close_room(self, room):
+        if room.players and room.state == "racing":
+            # over {standings: [[nick, place, seconds, score], ...]}, finishers first
+            standings = sorted(room.players, key=lambda p: p.place or RACE_MAX_PLAYERS + 1)
+            self._broadcast(room, {"op": "over", "standings": [
+                [p.nick, p.place, round(p.seconds, 1) if p.seconds is not None else None, p.journal.score]
+                for p in standings]})
+        room.state = "over"
+        self.rooms.pop(room.name, None)
+        if self.open_rooms.get(room.open_key) is room:
+            del self.open_rooms[room.open_key]
+        self.dirty.discard(room)
+
+    def _broadcast(self, room, message):
+        data = _race_encode(message)
+        for player in room.players:
+            _race_write(player.writer, data)
+    def _progress(self, room):
+        # progress {players: [[nick, cells filled correctly, blanks, mistakes, place], ...]}
+        clues = 81 - room.blanks
+        return {"op": "progress", "players": [
+            [p.nick, sum(p.journal.board.correct) - clues, room.blanks, p.journal.mistakes, p.place]
+            for p in room.players]}
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            dirty, self.dirty = self.dirty, set()
+            for room in dirty:
+                if room.state == "racing":
+                    self._broadcast(room, self._progress(room))
+            self._flush_results()
+    def _flush_results(self):
+        if self.results:
+            rows, self.results = self.results, []
+            self.recorder.submit(self._record, rows)
+    def _record(self, rows):
+        if self.leaderboard is None:
+            self.leaderboard = Leaderboard(self.leaderboard_path, legacy_path=None)
+        self.leaderboard.add_many(rows)
+    def _close_leaderboard(self):
+        if self.leaderboard is not None:
+            self.leaderboard.close()
+            self.leaderboard = None
+    def stats(self):
+        # stats {rooms, players, moves, finished, cpu_s, move_ms}; cpu_s is this process's CPU time
+        return {"op": "stats", "rooms": len(self.rooms), "players": sum(len(r.players) for r in self.rooms.values()),
+                "moves": self.moves, "finished": self.finished, "cpu_s": time.process_time(),
+                "move_ms": self.move_times.summary()}
+
+def race_server_command(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog="pydoku.py race-server", description="Host multiplayer Sudoku races over TCP.")
+    parser.add_argument("--host", default=RACE_HOST)
+    parser.add_argument("--port", type=int, default=RACE_PORT, help="0 picks a free port")
+    parser.add_argument("--db", default=LEADERBOARD_DB, help="leaderboard that race results go into")
+    parser.add_argument("--tick", type=float, default=RACE_TICK, help="seconds between progress broadcasts")
+    parser.add_argument("--workers", type=int, default=None, help="puzzle generation processes")
+    opts = parser.parse_args(args)
+    server = RaceServer(opts.db, opts.tick, opts.workers)
+    async def serve():
+        _cancel_on_sigterm()
+        host, port = await server.start(opts.host, opts.port)
+        print(f"race server listening on {host}:{port}", flush=True)
+        try:
+            await server.server.serve_forever()
+        finally:
+            await server.close()
+    try:
+        asyncio.run(serve())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+def _race_address(address):
+    host, _, port = address.rpartition(":")
+    return host or RACE_HOST, int(port)
+
+async def _race_cli(host, port, join):
+    reader, writer = await asyncio.open_connection(host, port)
+    _race_write(writer, _race_encode(join))
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+    def read_stdin():
+        # A daemon thread, so a pending input() never holds up exit
+        try:
+            for line in sys.stdin:
+                loop.call_soon_threadsafe(lines.put_nowait, line)
+            loop.call_soon_threadsafe(lines.put_nowait, None)
+        except RuntimeError:
+            pass  # the loop closed first
+    threading.Thread(target=read_stdin, daemon=True, name="pydoku-race-input").start()
+    cli = SudokuCLI()
+    race = {}
+    def show():
+        board = race["board"]
+        cli.print_block_grid(race["clues"], board.player, board.solution, difficulty_name=race["title"], board=board)
+        print(f"Score: {race['score']} | Mistakes: {race['mistakes']}")
+        if race.get("progress"):
+            print("  ".join(f"{nick} {filled}/{blanks}" + (f" #{place}" if place else "")
+                            for nick, filled, blanks, _, place in race["progress"]))
+        print("Move with <row><col><digit>, e.g. 357 puts a 7 at row 3, column 5 (digit 0 clears) | q to leave")
+
+    async def receive():
+        async for line in reader:
+            message = json.loads(line)
+            op = message["op"]
+            if op == "joined":
+                print(f"Joined room {message['room']} ({message['difficulty']}, {message['size']} players)")
+            elif op == "lobby" and "board" not in race:
+                print(f"Waiting for players: {', '.join(message['players'])}")
+            elif op == "start":
+                cells = parse_puzzle_line(message["clues"])
+                clues = Board(cells, box_of_cells(len(cells)))
+                # Only to colour conflicts the way the menu game does
+                solution = BitmaskSolver(box=clues.geometry.box).solve(clues)
+                race.update(clues=clues, board=BoardState(clues.copy(), solution, track_candidates=False),
+                            title=f"{message['difficulty']} race", score=0, mistakes=0)
+                print(f"\nGo! Racing {', '.join(message['players'])} on seed {message['seed']}")
+                show()
+            elif op == "moved":
+                board = race["board"]
+                board.set(*divmod(message["cell"], board.geometry.size), message["digit"])
+                race.update(score=message["score"], mistakes=message["mistakes"])
+                show()
+            elif op == "progress":
+                race["progress"] = message["players"]
+            elif op == "finished":
+                print(f"{message['nick']} finished #{message['place']} in {message['seconds']}s "
+                      f"with {message['score']} points")
+            elif op == "left":
+                print(f"{message['nick']} left the race")
+            elif op == "over":
+                print("\nRace over:")
+                for nick, place, seconds, score in message["standings"]:
+                    print(f"  {'#' + str(place) if place else 'DNF':>4} {nick:<8} "
+                          f"{'' if seconds is None else f'{seconds}s':>8} {score:>7}")
+                return
+            elif op == "error":
+                print(f"Server: {message['message']}")
+                if "board" not in race:
+                    return
+        print("Disconnected from the race server.")
+    async def play():
+        while True:
+            line = await lines.get()
+            if line is None or line.strip().lower() == "q":
+                return
+            move = line.replace(" ", "").strip()
+            # Rows, columns and digits past 9 are the letters the board shows
+            geo = race["board"].geometry if "board" in race else None
+            r, c, digit = (geo.digit(ch) for ch in move) if geo is not None and len(move) == 3 else (None,) * 3
+            if move[2:] == "0":
+                digit = 0
+            if r is None or c is None or digit is None:
+                print("Move with three characters: row, column, then the digit (0 clears)")
+                continue
+            _race_write(writer, _race_encode({"op": "move", "cell": (r - 1) * geo.size + c - 1, "digit": digit}))
+
+    tasks = [loop.create_task(receive()), loop.create_task(play())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+    return 0
+
+def join_command(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog="pydoku.py join", description="Join a race on a pydoku race server.")
+    parser.add_argument("address", nargs="?", default=f"{RACE_HOST}:{RACE_PORT}", help="HOST:PORT")
+    parser.add_argument("--nick", help="up to 8 characters; asked for if not given")
+    parser.add_argument("--room", help="race with whoever joins this room; by default, the next open room")
+    parser.add_argument("--difficulty", choices=list(RACE_DIFFICULTIES), default="hard")
+    parser.add_argument("--players", type=int, default=2, help="players the race waits for")
+    parser.add_argument("--seed", type=int, help="puzzle seed, e.g. to race a friend on a known puzzle")
+    opts = parser.parse_args(args)
+    nick = opts.nick or input("Nickname (max 8 chars): ").strip()[:8]
+    join = {"op": "join", "nick": nick, "difficulty": opts.difficulty, "players": opts.players}
+    if opts.room is not None:
+        join["room"] = opts.room
+    if opts.seed is not None:
+        join["seed"] = opts.seed
+    try:
+        return asyncio.run(_race_cli(*_race_address(opts.address), join))
+    except ConnectionError as e:
+        print(f"Could not reach the race server at {opts.address}: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 0
+
+async def _race_bot(host, port, room, nick, opts, latency, solutions, rng):
+    """Play races in load-test room number room back to back until cancelled, timing every move's reply."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for round_ in count():
+            seed = opts.seed + (room + round_) % opts.seeds
+            _race_write(writer, _race_encode({"op": "join", "nick": nick, "room": f"load-{room}.{round_}", "seed": seed,
+                                              "difficulty": opts.difficulty, "players": opts.players}))
+            async for line in reader:
+                message = json.loads(line)
+                if message["op"] == "start":
+                    break
+                if message["op"] == "error":
+                    raise RuntimeError(message["message"])
+            else:
+                return
+            cells = parse_puzzle_line(message["clues"])
+            solution = solutions.get(seed)
+            if solution is None:
+                solution = solutions[seed] = Board.from_array(BitmaskSolver().solve(cells)).cells
+            blanks = [i for i, d in enumerate(cells) if not d]
+            rng.shuffle(blanks)
+            moves = []
+            for i in blanks:
+                if rng.random() < opts.error_rate:
+                    moves.append((i, solution[i] % 9 + 1))  # a wrong digit, put right by the next move
+                moves.append((i, solution[i]))
+            for move_id, (i, digit) in enumerate(moves):
+                await asyncio.sleep(opts.move_interval * rng.uniform(0.5, 1.5))
+                sent = time.perf_counter()
+                _race_write(writer, _race_encode({"op": "move", "cell": i, "digit": digit, "id": move_id}))
+                async for line in reader:
+                    # Only replies are decoded; the bot skips progress lines, which are most of the traffic
+                    if line.startswith(b'{"op":"moved"') and json.loads(line)["id"] == move_id:
+                        latency.add(time.perf_counter() - sent)
+                        break
+                    if line.startswith(b'{"op":"error"'):
+                        raise RuntimeError(json.loads(line)["message"])
+                else:
+                    return
+            async for line in reader:
+                if line.startswith(b'{"op":"over"'):
+                    break
+            else:
+                return
+    finally:
+        writer.close()
+
+async def _race_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    _race_write(writer, _race_encode({"op": "stats"}))
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+async def _race_load(host, port, opts):
+    latency = TimingHistogram()
+    solutions = {}
+    bots = []
+    rng = random.Random(opts.seed)
+    print(f"{'rooms':>6} {'players':>8} {'moves/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'server p99 ms':>13} "
+          f"{'server CPU':>10} {'rooms/core':>10}")
+    rows = []
+    for rooms in opts.rooms:
+        # Connect in small batches so the listen backlog never overflows
+        start = len(bots) // opts.players
+        for k in range(start, rooms):
+            bots.extend(asyncio.get_running_loop().create_task(
+                _race_bot(host, port, k, f"bot{p}", opts, latency, solutions, random.Random(rng.random())))
+                for p in range(opts.players))
+            if k % 50 == 49:
+                await asyncio.sleep(0.05)
+        await asyncio.sleep(opts.warmup)
+        failed = [task for task in bots if task.done()]
+        if failed:
+            raise RuntimeError(f"{len(failed)} bots stopped: {failed[0].exception()!r}")
+        latency.__init__()
+        before, wall = await _race_stats(host, port), time.perf_counter()
+        await asyncio.sleep(opts.stage_time)
+        after, wall = await _race_stats(host, port), time.perf_counter() - wall
+        moves = (after["moves"] - before["moves"]) / wall
+        cpu = (after["cpu_s"] - before["cpu_s"]) / wall
+        offered = rooms * opts.players * (1 + opts.error_rate) / opts.move_interval
+        summary = latency.summary()
+        # Scaling CPU share up to a whole core only holds while the bots still get their moves in
+        kept_up = moves >= 0.85 * offered
+        row = {"rooms": rooms, "players": rooms * opts.players, "moves_per_s": moves, "offered_moves_per_s": offered,
+               "p50_ms": summary["p50_ms"], "p99_ms": summary["p99_ms"],
+               "server_p99_ms": after["move_ms"]["p99_ms"], "server_cpu": cpu,
+               "rooms_per_core": rooms / cpu if cpu and kept_up else None}
+        rows.append(row)
+        per_core = f"{row['rooms_per_core']:.0f}" if kept_up else "saturated"
+        print(f"{rooms:>6} {row['players']:>8} {moves:>8.0f} {row['p50_ms']:>7.2f} {row['p99_ms']:>7.2f} "
+              f"{row['server_p99_ms']:>13.3f} {cpu:>10.0%} {per_core:>10}", flush=True)
+    for task in bots:
+        task.cancel()
+    await asyncio.gather(*bots, return_exceptions=True)
+    return rows
+
+def race_loadtest_command(args):
+    import argparse
+    import subprocess
+    import tempfile
+    parser = argparse.ArgumentParser(prog="pydoku.py race-loadtest",
+                                     description="Fill a race server with bot races in stages and report move "
+                                                 "latency and how many rooms one server core sustains.")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="load this server instead of starting one")
+    parser.add_argument("--rooms", default="50,200,500,1000", help="comma-separated room counts, one stage each")
+    parser.add_argument("--players", type=int, default=2, help="bots per room")
+    parser.add_argument("--move-interval", type=float, default=1.0, help="mean seconds between a bot's moves")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="share of moves that are wrong first")
+    parser.add_argument("--difficulty", choices=list(RACE_DIFFICULTIES), default="hard")
+    parser.add_argument("--seeds", type=int, default=8, help="distinct puzzles the rooms cycle through")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds to settle after adding rooms")
+    parser.add_argument("--stage-time", type=float, default=10.0, help="seconds measured per stage")
+    parser.add_argument("--output", help="write the stages as JSON here")
+    opts = parser.parse_args(args)
+    opts.rooms = [int(n) for n in opts.rooms.split(",")]
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if opts.connect:
+            host, port = _race_address(opts.connect)
+        else:
+            # A separate process, so the server's CPU use is its own
+            server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "race-server", "--port", "0",
+                                       "--db", os.path.join(tmp, "race.db")], stdout=subprocess.PIPE, text=True)
+            host, port = _race_address(server.stdout.readline().split()[-1])
+        try:
+            rows = asyncio.run(_race_load(host, port, opts))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+    if opts.output:
+        with open(opts.output, "w") as f:
+            json.dump({"options": vars(opts), "stages": rows}, f, indent=2)
+    return 0
+
+SERVE_HOST = os.environ.get("PYDOKU_SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.environ.get("PYDOKU_SERVE_PORT", "8766"))
+SERVE_READY = 32  # ready puzzles kept per difficulty
+SERVE_MAX_COUNT = 100_000  # puzzles per generate request
+SERVE_MAX_BODY = 64 << 20
+SERVE_CHUNK = {"generate": 64, "check": 256}  # items per worker task
+SERVE_DIFFICULTIES = {name: remove_count for name, (remove_count, _) in RACE_DIFFICULTIES.items()}
+
+def _serve_encode(message):
+    return json.dumps(message, separators=(",", ":")).encode()
+def _serve_puzzle(puzzle, solution, seed=None):
+    return _serve_encode({"puzzle": Board.from_array(puzzle).to_string(),
+                          "solution": Board.from_array(solution).to_string(), "seed": seed})
+def _serve_generate(remove_count, box, seeds):
+    """Worker task: one puzzle per seed, encoded."""
+    return [_serve_puzzle(*generate_puzzle(remove_count, seed=seed, box=box), seed) for seed in seeds]
+def _serve_check(op, puzzles):
+    """Worker task: the solve, validate or rate result of each puzzle string, encoded."""
+    out = []
+    for text in puzzles:
+        result = {"puzzle": text}
+        cells = parse_puzzle_line(text)
+        if cells is None:
+            result["error"] = "not a 9x9, 16x16 or 25x25 puzzle"
+        elif op == "rate":
+            try:
+                if len(cells) != 81:
+                    raise ValueError("only 9x9 puzzles are rated")
+                technique, steps = rate_puzzle(cells)
+                result.update(technique=technique, level=rating_level(technique), steps=steps)
+            except ValueError as e:
+                result["error"] = str(e)
+        else:
+            geo = geometry(box_of_cells(len(cells)))
+            found = []
+            state = _bm_load(cells, geo)
+            if state is not None:
+                _bm_search(*state, 2, found, geo=geo)
+            result["status"] = "unique" if len(found) == 1 else "multiple" if found else "unsolvable"
+            if op == "solve":
+                result["solution"] = "".join(geo.symbol(d) for d in found[0]) if found else None
+            else:
+                peers = geo.peers
+                result["valid"] = len(found) == 1
+                result["conflicts"] = [i for i, d in enumerate(cells) if d and any(cells[p] == d for p in peers[i])]
+        out.append(_serve_encode(result))
+    return out
+
+class _HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class PuzzleServer:
+    """Stateless HTTP front end to the generator, solver and rater, in one asyncio loop.
+
+    GET /generate, GET or POST /solve, /validate and /rate, and GET /health and /stats.
+    All the CPU work runs on a process pool that is started before the server listens,
+    and unseeded 9x9 puzzles come first from a PuzzlePool ready queue per difficulty,
+    filled before listening and topped up in the background. Batches are cut into
+    worker tasks and streamed back with chunked encoding as the tasks finish, in order,
+    either as one JSON document or as NDJSON, one object per line.
+    """
+    def __init__(self, workers=None, ready=SERVE_READY):
+        self.workers = workers or os.cpu_count() or 1
+        self.ready = ready
+        self.executor = None
+        self.pool = None
+        self.server = None
+        self.clients = {}  # writer -> the task serving that connection
+        self.seeds = random.Random()
+        self.latency = {}  # path -> TimingHistogram of whole requests
+        self.items = 0
+        self.routes = {"/generate": (self._generate, ("GET",)), "/solve": (self._check, ("GET", "POST")),
+                       "/validate": (self._check, ("GET", "POST")), "/rate": (self._check, ("GET", "POST")),
+                       "/health": (self._health, ("GET",)), "/stats": (self._stats, ("GET",))}
+    async def start(self, host=SERVE_HOST, port=SERVE_PORT):
+        """Start and warm the workers, then listen on host:port (0 picks a free port); returns the bound address."""
+        importlib.import_module("numpy")  # loaded before the first fork so workers inherit it
+        from concurrent.futures import ProcessPoolExecutor
+        loop = asyncio.get_running_loop()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        await asyncio.gather(*(loop.run_in_executor(self.executor, int) for _ in range(self.workers)))
+        if self.ready:
+            # The ready queues fill on the same workers as the requests
+            self.pool = PuzzlePool(SERVE_DIFFICULTIES.values(), self.ready, executor=self.executor)
+            await loop.run_in_executor(None, self.pool.started.wait)
+            deadline = time.monotonic() + 30
+            while (self.pool.executor is not None and time.monotonic() < deadline
+                   and min(self.pool.stats()["ready"].values()) < self.ready):
+                await asyncio.sleep(0.05)
+        self.server = await asyncio.start_server(self._serve_client, host, port, backlog=4096)
+        return self.server.sockets[0].getsockname()[:2]
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+        clients = list(self.clients.items())
+        for writer, _ in clients:
+            writer.close()
+        await asyncio.gather(*(task for _, task in clients), return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def _serve_client(self, reader, writer):
+        self.clients[writer] = asyncio.current_task()
+        try:
+            while await self._handle(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # the client hung up
+        finally:
+            del self.clients[writer]
+            writer.close()
+    async def _handle(self, reader, writer):
+        """Read and answer one request; returns whether the connection stays open."""
+        from urllib.parse import parse_qs
+        try:
+            line = await reader.readline()
+        except ValueError:
+            line = b"-"  # longer than the reader's limit
+        if not line:
+            return False
+        started = time.perf_counter()
+        keep_alive = chunked = False
+        try:
+            try:
+                method, target, version = line.decode("latin-1").split()
+            except ValueError:
+                raise _HTTPError(400, "malformed request line") from None
+            headers = {}
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    raise _HTTPError(431, "header line too long") from None
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                if len(headers) == 100:
+                    raise _HTTPError(431, "too many headers")
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if "transfer-encoding" in headers:
+                raise _HTTPError(501, "send request bodies with a Content-Length")
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                raise _HTTPError(400, "bad Content-Length") from None
+            if not 0 <= length <= SERVE_MAX_BODY:
+                raise _HTTPError(413, f"request bodies are limited to {SERVE_MAX_BODY} bytes")
+            body = await reader.readexactly(length) if length else b""
+            # The request is fully read, so errors from here on leave the connection usable
+            keep_alive = chunked = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            path, _, query = target.partition("?")
+            route = self.routes.get(path)
+            if route is None:
+                raise _HTTPError(404, f"no such endpoint {path!r}")
+            handler, methods = route
+            if method not in methods:
+                raise _HTTPError(405, f"{path} takes {' or '.join(methods)}")
+            content_type, response = await handler(path, parse_qs(query), headers, body)
+        except _HTTPError as e:
+            await self._send(writer, e.status, "application/json", _serve_encode({"error": str(e)}), keep_alive)
+            return keep_alive
+        except Exception as e:  # a worker failed; the server itself carries on
+            await self._send(writer, 500, "application/json", _serve_encode({"error": repr(e)}), keep_alive)
+            return keep_alive
+        if not await self._send(writer, 200, content_type, response, keep_alive, chunked):
+            return False
+        self.latency.setdefault(path, TimingHistogram()).add(time.perf_counter() - started)
+        return keep_alive
+    async def _send(self, writer, status, content_type, body, keep_alive, chunked=False):
+        """Write a response; body is bytes or an async iterator of parts. Returns False if it broke off."""
+        from contextlib import aclosing
+        from http import HTTPStatus
+        head = f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: {content_type}\r\n"
+        if not keep_alive:
+            head += "Connection: close\r\n"
+        if isinstance(body, bytes):
+            writer.write(f"{head}Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            return True
+        # Streamed: chunked for HTTP/1.1, otherwise delimited by closing the connection
+        writer.write(f"{head}Transfer-Encoding: chunked\r\n\r\n".encode() if chunked else f"{head}\r\n".encode())
+        try:
+            async with aclosing(body):
+                async for part in body:
+                    if part:
+                        writer.write(b"%x\r\n%s\r\n" % (len(part), part) if chunked else part)
+                        await writer.drain()
+        except ConnectionError:
+            raise
+        except Exception:
+            return False  # a worker failed mid-stream; dropping the connection marks the body incomplete
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return True
+
+    @staticmethod
+    def _param(params, name, default=None, low=None, high=None):
+        """The last value of query parameter name, as an int within [low, high] when bounds are given."""
+        values = params.get(name)
+        if not values:
+            return default
+        if low is None:
+            return values[-1]
+        try:
+            value = int(values[-1])
+        except ValueError:
+            value = None
+        if value is None or not low <= value <= high:
+            raise _HTTPError(400, f"{name} must be an integer from {low} to {high}")
+        return value
+    async def _items(self, key, first, calls, params, headers):
+        """Frame first and the results of calls as a JSON document under key or as NDJSON.
+
+        A response that needs at most one worker task is sent whole; longer ones are
+        streamed as their tasks finish.
+        """
+        ndjson = self._param(params, "format") == "ndjson" or "application/x-ndjson" in headers.get("accept", "")
+        content_type = "application/x-ndjson" if ndjson else "application/json"
+        body = self._stream(key, first, calls, ndjson)
+        if len(calls) > 1:
+            return content_type, body
+        return content_type, b"".join([part async for part in body])
+    async def _stream(self, key, first, calls, ndjson):
+        loop = asyncio.get_running_loop()
+        in_flight = deque()
+        started = False
+        def frame(items):
+            nonlocal started
+            self.items += len(items)
+            if not items:
+                return b""
+            if ndjson:
+                return b"\n".join(items) + b"\n"
+            part = (b"," if started else b"") + b",".join(items)
+            started = True
+            return part
+        if not ndjson:
+            yield b'{"%s":[' % key.encode()
+        yield frame(first)
+        try:
+            # A bounded window of tasks in flight keeps memory flat however big the batch
+            for call in calls:
+                in_flight.append(loop.run_in_executor(self.executor, *call))
+                if len(in_flight) >= 2 * self.workers:
+                    yield frame(await in_flight.popleft())
+            while in_flight:
+                yield frame(await in_flight.popleft())
+        finally:
+            for future in in_flight:
+                future.cancel()
+        if not ndjson:
+            yield b"]}"
+    def _split(self, kind, items):
+        """items cut into worker tasks: at most SERVE_CHUNK[kind] each, and spread over every worker."""
+        size = max(1, min(SERVE_CHUNK[kind], -(-len(items) // self.workers)))
+        return [items[k:k + size] for k in range(0, len(items), size)]
+
+    async def _generate(self, path, params, headers, body):
+        difficulty = self._param(params, "difficulty", "hard")
+        if difficulty not in SERVE_DIFFICULTIES:
+            raise _HTTPError(400, f"difficulty must be one of {', '.join(SERVE_DIFFICULTIES)}")
+        size = self._param(params, "size", 9, 9, 25)
+        box = box_of_cells(size * size)
+        if box is None:
+            raise _HTTPError(400, "size must be 9, 16 or 25")
+        n = self._param(params, "count", 1, 1, SERVE_MAX_COUNT)
+        seed = self._param(params, "seed", None, 0, 2 ** 32 - 1)
+        remove_count = scaled_remove_count(SERVE_DIFFICULTIES[difficulty], box)
+        ready = []
+        if seed is None:
+            while box == 3 and self.pool is not None and len(ready) < n:
+                puzzle = self.pool.take_ready(remove_count)
+                if puzzle is None:
+                    break
+                ready.append(_serve_puzzle(*puzzle))
+            # The rest get fresh random seeds, so each one can be regenerated
+            seeds = [self.seeds.getrandbits(32) for _ in range(n - len(ready))]
+        else:
+            seeds = [(seed + k) % 2 ** 32 for k in range(n)]
+        calls = [(_serve_generate, remove_count, box, chunk) for chunk in self._split("generate", seeds)]
+        return await self._items("puzzles", ready, calls, params, headers)
+    async def _check(self, path, params, headers, body):
+        puzzles = list(params.get("puzzle", ()))
+        if body and headers.get("content-type", "").startswith("application/json"):
+            try:
+                data = json.loads(body)
+                given = data["puzzles"] if "puzzles" in data else [data["puzzle"]]
+                if not all(isinstance(p, str) for p in given):
+                    raise TypeError
+            except (ValueError, KeyError, TypeError):
+                raise _HTTPError(400, 'a JSON body is {"puzzle": "..."} or {"puzzles": ["...", ...]}') from None
+            puzzles += given
+        elif body:
+            puzzles += [line.split()[0] for line in body.decode("latin-1").splitlines()
+                        if line.strip() and not line.startswith("#")]
+        if not puzzles:
+            raise _HTTPError(400, "give puzzles as ?puzzle=..., one per line in the body, or as JSON")
+        calls = [(_serve_check, path[1:], chunk) for chunk in self._split("check", puzzles)]
+        return await self._items("results", [], calls, params, headers)
+    async def _health(self, path, params, headers, body):
+        return "application/json", b'{"ok":true}'
+    async def _stats(self, path, params, headers, body):
+        return "application/json", _serve_encode(self.stats())
+    def stats(self):
+        # cpu_s is this process's CPU time; the workers' is not included
+        pool = self.pool.stats() if self.pool is not None else {"hits": 0, "misses": 0, "ready": {}}
+        names = {remove_count: name for name, remove_count in SERVE_DIFFICULTIES.items()}
+        return {"requests": {path: h.summary() for path, h in self.latency.items()}, "items": self.items,
+                "hits": pool["hits"], "misses": pool["misses"],
+                "ready": {names[rc]: n for rc, n in pool["ready"].items()}, "workers": self.workers,
+                "cpu_s": time.process_time()}
+
+def serve_command(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog="pydoku.py serve",
+                                     description="Serve puzzle generation, solving, validation and rating over HTTP.")
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT, help="0 picks a free port")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--ready", type=int, default=SERVE_READY, help="ready puzzles kept per difficulty, 0 for none")
+    opts = parser.parse_args(args)
+    server = PuzzleServer(opts.workers, opts.ready)
+    async def serve():
+        _cancel_on_sigterm()
+        try:
+            host, port = await server.start(opts.host, opts.port)
+            print(f"puzzle server listening on http://{host}:{port}", flush=True)
+            await server.server.serve_forever()
+        finally:
+            await server.close()
+    try:
+        asyncio.run(serve())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+async def _http_request(reader, writer, method, target, body=None):
+    """One HTTP/1.1 exchange on a kept-alive connection; returns (status, body)."""
+    head = f"{method} {target} HTTP/1.1\r\nHost: pydoku\r\n"
+    if body is not None:
+        head += f"Content-Length: {len(body)}\r\n"
+    writer.write(head.encode() + b"\r\n" + (body or b""))
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") != "chunked":
+        return status, await reader.readexactly(int(headers.get("content-length", 0)))
+    parts = []
+    while True:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        if not size:
+            await reader.readexactly(2)
+            return status, b"".join(parts)
+        parts.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+SERVE_SCENARIOS = ("generate", "seeded", "batch", "solve", "validate", "rate", "solve-batch")
+
+async def _serve_client_load(host, port, request, rng, deadline, latency, totals):
+    """Send request(rng) back to back on one connection until deadline; totals counts ok, errors and items."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            method, target, body, items = request(rng)
+            sent = time.perf_counter()
+            status, _ = await _http_request(reader, writer, method, target, body)
+            latency.add(time.perf_counter() - sent)
+            if status == 200:
+                totals[0] += 1
+                totals[2] += items
+            else:
+                totals[1] += 1
+    finally:
+        writer.close()
+
+async def _serve_load(host, port, opts):
+    async def call(target):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            status, body = await _http_request(reader, writer, "GET", target)
+        finally:
+            writer.close()
+        if status != 200:
+            raise RuntimeError(f"GET {target}: {status} {body.decode()}")
+        return json.loads(body)
+    corpus = [p["puzzle"].encode() for p in (await call(f"/generate?difficulty={opts.difficulty}&count=256"
+                                                         f"&seed={opts.seed}"))["puzzles"]]
+    d, batch = opts.difficulty, opts.batch
+    requests = {
+        "generate": lambda rng: ("GET", f"/generate?difficulty={d}", None, 1),
+        "seeded": lambda rng: ("GET", f"/generate?difficulty={d}&seed={rng.getrandbits(32)}", None, 1),
+        "batch": lambda rng: ("GET", f"/generate?difficulty={d}&count={batch}&format=ndjson", None, batch),
+        "solve": lambda rng: ("POST", "/solve", rng.choice(corpus), 1),
+        "validate": lambda rng: ("POST", "/validate", rng.choice(corpus), 1),
+        "rate": lambda rng: ("POST", "/rate", rng.choice(corpus), 1),
+        "solve-batch": lambda rng: ("POST", "/solve?format=ndjson", b"\n".join(rng.choices(corpus, k=batch)), batch),
+    }
+    rng = random.Random(opts.seed)
+    print(f"{'scenario':<12} {'clients':>7} {'req/s':>8} {'items/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6} "
+          f"{'ready hit':>9} {'server CPU':>10}")
+    rows = []
+    for scenario in opts.scenarios:
+        for clients in opts.concurrency:
+            await asyncio.sleep(opts.settle)  # lets the ready queues refill between stages
+            latency, totals = TimingHistogram(), [0, 0, 0]
+            before, wall = await call("/stats"), time.perf_counter()
+            await asyncio.gather(*(_serve_client_load(host, port, requests[scenario], random.Random(rng.random()),
+                                                      wall + opts.duration, latency, totals) for _ in range(clients)))
+            after, wall = await call("/stats"), time.perf_counter() - wall
+            # Only single unseeded requests are served from the ready queues alone
+            taken = (after["hits"] - before["hits"]) + (after["misses"] - before["misses"]) if scenario == "generate" else 0
+            summary = latency.summary()
+            row = {"scenario": scenario, "clients": clients, "requests_per_s": totals[0] / wall,
+                   "items_per_s": totals[2] / wall, "p50_ms": summary["p50_ms"], "p99_ms": summary["p99_ms"],
+                   "errors": totals[1], "ready_hit_rate": (after["hits"] - before["hits"]) / taken if taken else None,
+                   "server_cpu": (after["cpu_s"] - before["cpu_s"]) / wall}
+            rows.append(row)
+            hit = "" if row["ready_hit_rate"] is None else f"{row['ready_hit_rate']:.0%}"
+            print(f"{scenario:<12} {clients:>7} {row['requests_per_s']:>8.1f} {row['items_per_s']:>8.0f} "
+                  f"{row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['errors']:>6} {hit:>9} {row['server_cpu']:>10.0%}",
+                  flush=True)
+    return rows
+
+def serve_loadtest_command(args):
+    import argparse
+    import subprocess
+    parser = argparse.ArgumentParser(prog="pydoku.py serve-loadtest",
+                                     description="Drive a puzzle server with concurrent keep-alive clients and report "
+                                                 "throughput and latency per endpoint.")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="load this server instead of starting one")
+    parser.add_argument("--scenarios", default=",".join(SERVE_SCENARIOS),
+                        help=f"comma-separated, from {', '.join(SERVE_SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client counts, one stage each")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds measured per stage")
+    parser.add_argument("--settle", type=float, default=1.0, help="idle seconds before each stage")
+    parser.add_argument("--batch", type=int, default=1000, help="puzzles per batch request")
+    parser.add_argument("--difficulty", choices=list(SERVE_DIFFICULTIES), default="hard")
+    parser.add_argument("--workers", type=int, help="worker processes for the server this starts")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write the stages as JSON here")
+    opts = parser.parse_args(args)
+    opts.scenarios = opts.scenarios.split(",")
+    unknown = set(opts.scenarios) - set(SERVE_SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    opts.concurrency = [int(n) for n in opts.concurrency.split(",")]
+    server = None
+    if opts.connect:
+        host, port = _race_address(opts.connect)
+    else:
+        # A separate process, so the load generator does not share the server's event loop
+        command = [sys.executable, os.path.abspath(__file__), "serve", "--port", "0"]
+        if opts.workers:
+            command += ["--workers", str(opts.workers)]
+        server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        host, port = _race_address(server.stdout.readline().split()[-1].removeprefix("http://"))
+    try:
+        rows = asyncio.run(_serve_load(host, port, opts))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    if opts.output:
+        with open(opts.output, "w") as f:
+            json.dump({"options": vars(opts), "stages": rows}, f, indent=2)
+    return 0
+
+COMMANDS = {"build-bank": build_bank_command, "import-leaderboard": import_leaderboard_command, "solve": solve_command,
+            "dedup": dedup_command, "audit": audit_command, "race-server": race_server_command, "join": join_command,
+            "race-loadtest": race_loadtest_command, "serve": serve_command, "serve-loadtest": serve_loadtest_command,
+            "bench": bench_command, "startup-check": startup_check_command, "compare-solvers": compare_solvers_command}
+
+_GRID_RULES = {}
+
+def grid_rules(box=3):
+    """The CLI board's top, thin, thick and bottom border lines for box's grid."""
+    rules = _GRID_RULES.get(box)
+    if rules is None:
+        def rule(left, cell, thin, thick, right):
+            return left + thick.join(thin.join([cell * 3] * box) for _ in range(box)) + right
+        rules = _GRID_RULES[box] = (rule("╔", "═", "╤", "╦", "╗"), rule("╟", "─", "┼", "╫", "╢"),
+                                    rule("╠", "═", "╪", "╬", "╣"), rule("╚", "═", "╧", "╩", "╝"))
+    return rules
 
 class SudokuCLI:
     def __init__(self):
@@ -70,6 +4160,10 @@ class SudokuCLI:
             3: {"name": "expert", "remove_count": 50},
             4: {"name": "torture", "remove_count": 65}
         }
+        self.box = 3
+        self.pool = None
+        self.bank = None
+        self.autosaver = Autosaver()
 
     # Cross-platform single key press reading
     def getch(self):
@@ -96,6 +4190,13 @@ class SudokuCLI:
         print("start hard/2 - Begin a game in hard mode")
         print("start expert/3 - Begin a game in expert mode")
         print("start torture/4 - Begin a game in torture mode")
+        print("puzzle <n>/#<n> - Play puzzle number <n> from the puzzle bank")
+        print("seed <n> [difficulty] - Play the puzzle generated from seed <n>, 0 to 4294967295 (expert by default)")
+        print("daily [difficulty] - Play today's puzzle")
+        if os.path.exists(SAVE_PATH):
+            print("resume - Continue the saved game")
+        size = self.box * self.box
+        print(f"size 9/16/25 - Board size for new games (now {size}x{size})")
     def parse_input(self, prompt):
         prompt = prompt.strip().lower()
         if prompt in {'quit', 'exit', 'q', 'e'}:
@@ -112,40 +4213,112 @@ class SudokuCLI:
             return 4
         else:
             return -2
-    def print_block_grid(self, original_puzzle, player_grid, solution, cursor=None, difficulty_name="GRID"):
-        puzzle_flat = original_puzzle.reshape(9, 9)
-        player_flat = player_grid.reshape(9, 9)
-        print(f" --{difficulty_name.upper()}-- ")
-        print("╔═══╤═══╤═══╦═══╤═══╤═══╦═══╤═══╤═══╗")
-        for i in range(9):
-            line = "║"
-            for j in range(9):
-                is_clue = puzzle_flat[i, j] != 0
-                val = player_flat[i, j]
-                content = "   " if val == 0 else f" {val} "
+    def parse_size(self, prompt):
+        """Box size from a 'size 16' or '16x16' command, or None if prompt is not one."""
+        prompt = prompt.strip().lower()
+        if prompt.startswith("size "):
+            prompt = prompt[5:].strip()
+        size = prompt.partition("x")[0]
+        for box in BOX_SIZES:
+            if size == str(box * box) and prompt in (size, f"{size}x{size}"):
+                return box
+        return None
+    def parse_seed(self, prompt):
+        """(seed, settings) from a 'seed <n> [difficulty]' or 'daily [difficulty]' command, or None."""
+        words = prompt.strip().lower().split()
+        if words[:1] == ["daily"]:
+            seed, rest = daily_seed(), words[1:]
+        elif words[:1] == ["seed"] and len(words) > 1 and words[1].isdigit() and int(words[1]) < 2 ** 32:
+            # Journals and autosaves store the seed in 32 bits, like race seeds
+            seed, rest = int(words[1]), words[2:]
+        else:
+            return None
+        name = rest[0] if rest else "expert"
+        settings = next((d for d in self.difficulties.values() if d['name'] == name), None)
+        if len(rest) > 1 or settings is None:
+            return None
+        return seed, settings
+    def parse_puzzle_number(self, prompt):
+        prompt = prompt.strip().lower()
+        for prefix in ('puzzle ', '#'):
+            if prompt.startswith(prefix) and prompt[len(prefix):].strip().isdigit():
+                return int(prompt[len(prefix):])
+        return None
+    @timed("print_block_grid")
+    def block_grid_frame(self, original_puzzle, player_grid, solution, cursor=None, difficulty_name="GRID", board=None):
+        """Build the grid as lines of (text, visible width) segments, one segment per cell or border."""
+        clues = Board.of(original_puzzle).cells
+        values = Board.of(player_grid).cells
+        if board is None:
+            board = BoardState(player_grid, solution)
+        geo = board.geometry
+        n, box = geo.size, geo.box
+        top, thin, thick, bottom = grid_rules(box)
+        width = len(top)
+        frame = [[(f" --{difficulty_name.upper()}-- ", len(difficulty_name) + 6)], [(top, width)]]
+        for i in range(n):
+            line = [("║", 1)]
+            for j in range(n):
+                is_clue = clues[i * n + j] != 0
+                val = values[i * n + j]
+                content = "   " if val == 0 else f" {SYMBOLS[val - 1]} "
                 is_cursor = cursor == (i, j)
                 if is_cursor:
                     cell = f"{YELLOW_BG}{BOLD}{content}{RESET}"
                 elif is_clue:
                     cell = f"{BLUE}{content}{RESET}"
-                elif val != 0 and cell_has_conflict(player_flat, i, j):
+                elif val != 0 and board.has_conflict(i, j):
                     cell = f"{RED}{content}{RESET}"
                 else:
                     cell = content
-                line += cell
-                line += "║" if j % 3 == 2 else "│"
-            print(line)
-            if i in (2, 5):
-                print("╠═══╪═══╪═══╬═══╪═══╪═══╬═══╪═══╪═══╣")
-            elif i == 8:
-                print("╚═══╧═══╧═══╩═══╧═══╧═══╩═══╧═══╧═══╝")
+                line.append((cell, 3))
+                line.append(("║" if j % box == box - 1 else "│", 1))
+            frame.append(line)
+            if i == n - 1:
+                frame.append([(bottom, width)])
+            elif i % box == box - 1:
+                frame.append([(thick, width)])
             else:
-                print("╟───┼───┼───╫───┼───┼───╫───┼───┼───╢")
+                frame.append([(thin, width)])
+        return frame
+    def print_block_grid(self, original_puzzle, player_grid, solution, cursor=None, difficulty_name="GRID", board=None):
+        for line in self.block_grid_frame(original_puzzle, player_grid, solution, cursor, difficulty_name, board):
+            print("".join(text for text, _ in line))
     def run(self):
+        self.pool = start_puzzle_pool([d["remove_count"] for d in self.difficulties.values()])
+        self.bank = open_puzzle_bank()
+        try:
+            self.menu_loop()
+        finally:
+            if self.bank is not None:
+                self.bank.close()
+                self.bank = None
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+    def menu_loop(self):
         while True:
             self.print_menu()
             try:
                 user_input = input("> ").strip().lower()
+                box = self.parse_size(user_input)
+                if box is not None:
+                    self.box = box
+                    continue
+                number = self.parse_puzzle_number(user_input)
+                if number is not None:
+                    self.play_bank_puzzle(number)
+                    continue
+                if user_input == "resume":
+                    self.resume_game()
+                    continue
+                seeded = self.parse_seed(user_input)
+                if seeded is not None:
+                    seed, settings = seeded
+                    remove_count = scaled_remove_count(settings['remove_count'], self.box)
+                    self.play_game(settings, PUZZLE_CACHE.get(seed, remove_count, self.box), seed=seed,
+                                   remove_count=remove_count)
+                    continue
                 prompt = self.parse_input(user_input)
                 if prompt == 0:
                     continue
@@ -164,34 +4337,105 @@ class SudokuCLI:
             except (KeyboardInterrupt, EOFError):
                 print("\nGoodbye!")
                 break
-    def play_game(self, settings):
+    def next_puzzle(self, settings):
+        if self.box != 3:
+            # The bank and the pool only hold 9x9 puzzles
+            print(f"\nGenerating {settings['name'].capitalize()} puzzle...\n")
+            return generate_puzzle(remove_count=scaled_remove_count(settings['remove_count'], self.box), box=self.box)
+        if self.bank is not None and self.bank.count(settings['name']):
+            _, original_puzzle, solution = self.bank.draw(settings['name'])
+            return original_puzzle, solution
         print(f"\nGenerating {settings['name'].capitalize()} puzzle...\n")
-        original_puzzle, solution = generate_puzzle(remove_count=settings['remove_count'])
-        player_grid = original_puzzle.copy()
+        if self.pool is not None:
+            return self.pool.take(settings['remove_count'])
+        return generate_puzzle(remove_count=settings['remove_count'])
+    def play_bank_puzzle(self, number):
+        if self.bank is None or not 1 <= number <= len(self.bank):
+            count = len(self.bank) if self.bank is not None else 0
+            print(f"No puzzle #{number} - the puzzle bank holds {count} puzzles.")
+            input("Press Enter to continue...")
+            return
+        name, original_puzzle, solution = self.bank.get(number - 1)
+        settings = next((d for d in self.difficulties.values() if d['name'] == name),
+                        {"name": name, "remove_count": self.bank.sections[name][0]})
+        self.play_game(settings, (original_puzzle, solution))
+    def resume_game(self):
+        snapshot = load_saved_game()
+        if snapshot is None:
+            print("No saved game to resume.")
+            input("Press Enter to continue...")
+            return
+        settings = next((d for d in self.difficulties.values() if d['name'] == snapshot.difficulty),
+                        {"name": snapshot.difficulty, "remove_count": None})
+        try:
+            restored = snapshot.restore()
+        except ValueError as error:
+            print(f"The saved game could not be restored: {error}")
+            input("Press Enter to continue...")
+            return
+        self.play_game(settings, snapshot=snapshot, restored=restored)
+    def play_game(self, settings, puzzle=None, snapshot=None, seed=None, remove_count=0, restored=None):
+        """Play a puzzle, a saved game, or the next puzzle for settings; seed and
+        remove_count, when the puzzle came from a seed, go into the move journal.
+        restored is the snapshot's (board, journal) when the caller has already restored it."""
+        if snapshot is not None:
+            original = snapshot.clues
+            board, journal = restored if restored is not None else snapshot.restore()
+            cursor_row, cursor_col = snapshot.selected
+            clock_started = snapshot.elapsed
+        else:
+            original_puzzle, solution = puzzle if puzzle is not None else self.next_puzzle(settings)
+            original = Board.from_array(original_puzzle)
+            board = BoardState(original.copy(), solution)
+            journal = MoveJournal(board, seed=seed, remove_count=remove_count)
+            cursor_row, cursor_col = 0, 0
+            clock_started = 0.0
+        geo = board.geometry
         difficulty_name = settings['name'].capitalize()
+        if geo.box != 3:
+            difficulty_name += f" {geo.size}x{geo.size}"
 
-        cursor_row, cursor_col = 0, 0
         raw_mode = sys.stdin.isatty()
-        status = None
 
         print("\033[2J\033[H", end="")
+        digits = f"1-{SYMBOLS[geo.size - 1]}" if geo.size > 9 else "1-9"
         if raw_mode:
-            print("Arrow keys to move | 1-9 to place | 0 to clear | q to quit to menu")
+            print(f"Arrow keys to move | {digits} to place | 0 to clear | u/r to undo/redo | q to quit to menu")
         else:
-            print("j = left | l = right | i = up | k = down")
-            print("1-9 to place | 0 to clear | q to quit to menu")
+            print("j = left | l = right | i = up | k = down | u = undo | r = redo")
+            numbers = digits if geo.size == 9 else f"1-{geo.size} or {digits}"
+            print(f"{numbers} to place | 0 to clear | q to quit to menu")
         print("Invalid entries will appear in red.\n")
         input("Press Enter to start...")
 
+        clock = GameClock(clock_started)
+        def autosave(cursor):
+            self.autosaver.save(GameSnapshot.of_game(settings['name'], original, board, journal,
+                                                     elapsed=clock.elapsed(), selected=cursor).to_bytes())
+        try:
+            self.game_loop(original, journal, difficulty_name, raw_mode, (cursor_row, cursor_col), autosave)
+        finally:
+            if board.solved():
+                self.autosaver.discard()
+            else:
+                self.autosaver.flush()
+    def game_loop(self, original, journal, difficulty_name, raw_mode, cursor, autosave):
+        """Play keys until the board is solved or the player quits; autosave(cursor) runs after every key."""
+        board = journal.board
+        geo = board.geometry
+        cursor_row, cursor_col = cursor
+        status = None
+        renderer = TerminalRenderer()
+        key_started = None
         while True:
-            print("\033[2J\033[H", end="")
-            self.print_block_grid(original_puzzle, player_grid, solution,
-                             cursor=(cursor_row, cursor_col), difficulty_name=difficulty_name)
-
-            if not raw_mode and status is not None:
-                print(f"\n{status}")
+            frame = self.block_grid_frame(original, board.player, board.solution,
+                                          cursor=(cursor_row, cursor_col), difficulty_name=difficulty_name, board=board)
+            renderer.render(frame, f"\n{status}\n" if not raw_mode and status is not None else "")
+            if key_started is not None:
+                INSTRUMENTATION.record("cli_key", time.perf_counter() - key_started)
+            autosave((cursor_row, cursor_col))
 
-            if np.array_equal(player_grid.reshape(9,9), solution.reshape(9,9)):
+            if board.solved():
                 print("\n" + "="*40)
                 print("       🎉 CONGRATULATIONS! 🎉")
                 print("       You have solved the puzzle!")
@@ -205,14 +4449,19 @@ class SudokuCLI:
 
             if raw_mode:
                 key = self.getch()
+                key_started = time.perf_counter() if INSTRUMENTATION.enabled else None
                 if not key:
                     continue
                 if key == 'q':
-                    return
-                elif key in '0123456789':
-                    num = int(key)
-                    if original_puzzle.reshape(9,9)[cursor_row, cursor_col] == 0:
-                        player_grid.reshape(9,9)[cursor_row, cursor_col] = num
+                    break
+                elif key in ('u', 'r'):
+                    i = journal.undo() if key == 'u' else journal.redo()
+                    if i is not None:
+                        cursor_row, cursor_col = divmod(i, geo.size)
+                elif key == '0' or geo.digit(key) is not None:
+                    num = 0 if key == '0' else geo.digit(key)
+                    if original[cursor_row, cursor_col] == 0:
+                        journal.place(cursor_row * geo.size + cursor_col, num)
                 elif key in {'\x1b', '\033'}:
                     try:
                         seq1 = self.getch()
@@ -221,9 +4470,9 @@ class SudokuCLI:
                         if arrow in {'\x1b[A', '\033[A'}:
                             cursor_row = max(0, cursor_row - 1)
                         elif arrow in {'\x1b[B', '\033[B'}:
-                            cursor_row = min(8, cursor_row + 1)
+                            cursor_row = min(geo.size - 1, cursor_row + 1)
                         elif arrow in {'\x1b[C', '\033[C'}:
-                            cursor_col = min(8, cursor_col + 1)
+                            cursor_col = min(geo.size - 1, cursor_col + 1)
                         elif arrow in {'\x1b[D', '\033[D'}:
                             cursor_col = max(0, cursor_col - 1)
                     except:
@@ -232,28 +4481,188 @@ class SudokuCLI:
                 try:
                     cmd = input("\n> ").strip().lower()
                 except (KeyboardInterrupt, EOFError):
-                    return
+                    break
+                key_started = time.perf_counter() if INSTRUMENTATION.enabled else None
 
                 status = None
                 if not cmd:
                     status = "\033[1;33mEmpty input - please enter a command.\033[0m"
                     continue
                 if cmd == 'q':
-                    return
+                    break
+                elif cmd in ('u', 'r'):
+                    i = journal.undo() if cmd == 'u' else journal.redo()
+                    if i is None:
+                        status = f"\033[1;33mNothing to {'undo' if cmd == 'u' else 'redo'}.\033[0m"
+                    else:
+                        cursor_row, cursor_col = divmod(i, geo.size)
                 elif cmd == 'j':
                     cursor_col = max(0, cursor_col - 1)
                 elif cmd == 'l':
-                    cursor_col = min(8, cursor_col + 1)
+                    cursor_col = min(geo.size - 1, cursor_col + 1)
                 elif cmd == 'i':
                     cursor_row = max(0, cursor_row - 1)
                 elif cmd == 'k':
-                    cursor_row = min(8, cursor_row + 1)
-                elif cmd in '0123456789':
-                    num = int(cmd)
-                    if original_puzzle.reshape(9,9)[cursor_row, cursor_col] == 0:
-                        player_grid.reshape(9,9)[cursor_row, cursor_col] = num
+                    cursor_row = min(geo.size - 1, cursor_row + 1)
+                elif (cmd.isdigit() and int(cmd) <= geo.size) or geo.digit(cmd) is not None:
+                    num = int(cmd) if cmd.isdigit() else geo.digit(cmd)
+                    if original[cursor_row, cursor_col] == 0:
+                        journal.place(cursor_row * geo.size + cursor_col, num)
                 else:
                     status = f"\033[1;31mUnknown command: {cmd}\033[0m"
+        autosave((cursor_row, cursor_col))  # keeps the time spent before quitting
+
+class CanvasRenderer:
+    """Retained-mode board drawing on a Tk canvas.
+
+    Every item is created once: one digit per cell, a fixed pool of nine pencil marks per
+    cell and the highlight rectangles. Redraws only reconfigure the cells the board
+    reports as changed, so a keypress costs the same on an empty or a full board.
+    theme supplies the SudokuGUI color constants; box sets the grid size.
+    """
+    def __init__(self, canvas, cell_size, theme, box=3):
+        self.canvas = canvas
+        self.cell_size = cell_size
+        self.theme = theme
+        self.geometry = geo = geometry(box)
+        n = geo.size
+        size = n * cell_size
+        # Creation order is the stacking order: alignment bands, grid, digits, marks, cursor
+        self.directional_items = [canvas.create_rectangle(0, 0, 0, 0, fill=theme.HIGHLIGHT_ALIGN, width=4,
+                                                          tags="highlight_directionals") for _ in range(3)]
+        self.hint_items = [canvas.create_rectangle(c * cell_size + 2, r * cell_size + 2, (c + 1) * cell_size - 2,
+                                                   (r + 1) * cell_size - 2, fill=theme.HIGHLIGHT_HINT, width=0,
+                                                   state="hidden", tags="highlight_hint")
+                           for r in range(n) for c in range(n)]
+        for i in range(n + 1):
+            width = 5 if i % box == 0 else 1
+            fill_color = theme.GRID_THICK if i % box == 0 else theme.GRID_THIN
+            canvas.create_line(i * cell_size, 0, i * cell_size, size, fill=fill_color, width=width, tags="grid")
+            canvas.create_line(0, i * cell_size, size, i * cell_size, fill=fill_color, width=width, tags="grid")
+        # Fonts and pencil-mark spacing scale from the 60-pixel cells of the 9x9 board
+        digit_font = ("Arial", max(8, cell_size * 32 // 60), "bold")
+        note_font = ("Arial", max(5, cell_size * 36 // (60 * box)))
+        step = cell_size * 48 / (60 * box)
+        self.digit_items = []
+        self.note_items = []
+        for i in range(geo.cells):
+            r, c = divmod(i, n)
+            x, y = c * cell_size, r * cell_size
+            self.digit_items.append(canvas.create_text(x + cell_size // 2, y + cell_size // 2, text="", tags="numbers",
+                                                       fill=theme.CLUE_COLOR, font=digit_font))
+            self.note_items.append([canvas.create_text(x + cell_size / 5 + step * (k % box),
+                                                       y + cell_size * 4 / 15 + step * (k // box),
+                                                       text=SYMBOLS[k], tags="numbers", fill=theme.PENCIL_COLOR,
+                                                       font=note_font, state="hidden") for k in range(n)])
+        self.selected_item = canvas.create_rectangle(0, 0, 0, 0, outline=theme.HIGHLIGHT_ANSWER, width=4, tags="highlight")
+        self.drawn_cells = [("", theme.CLUE_COLOR)] * geo.cells
+        self.drawn_notes = [0] * geo.cells
+        self.drawn_selected_num = 0
+        self.drawn_outline = theme.HIGHLIGHT_ANSWER
+        self.drawn_hint = set()
+    def draw_numbers(self, board, original, selected_num):
+        dirty = board.take_changes()
+        selected_num = int(selected_num)
+        if selected_num != self.drawn_selected_num:
+            # Like digits are emphasised, so both the old and new digit's cells repaint
+            cells = board.player.cells
+            for num in (self.drawn_selected_num, selected_num):
+                if num:
+                    dirty.update(i for i in range(len(cells)) if cells[i] == num)
+            self.drawn_selected_num = selected_num
+        for i in dirty:
+            self.draw_cell(board, original, selected_num, i)
+    def draw_cell(self, board, original, selected_num, i):
+        theme = self.theme
+        r, c = divmod(i, self.geometry.size)
+        val = board.player.cells[i]
+        if val != 0:
+            color = theme.CLUE_COLOR if original.cells[i] != 0 else \
+                (theme.INCORRECT_COLOR if board.has_conflict(r, c) else theme.CLUE_COLOR)
+            if val == selected_num and selected_num != 0 and val == board.solution.cells[i]:
+                color = theme.CORRECT_COLOR
+            cell = (SYMBOLS[val - 1], color)
+        else:
+            cell = ("", theme.CLUE_COLOR)
+        if cell != self.drawn_cells[i]:
+            self.canvas.itemconfig(self.digit_items[i], text=cell[0], fill=cell[1])
+            self.drawn_cells[i] = cell
+        notes = 0 if val else board.notes[i]
+        flipped = notes ^ self.drawn_notes[i]
+        if flipped:
+            for k in self.geometry.mask_digit_indexes[flipped]:
+                self.canvas.itemconfig(self.note_items[i][k], state="normal" if notes >> k & 1 else "hidden")
+            self.drawn_notes[i] = notes
+    def highlight_selected(self, selected, outline_color):
+        r, c = selected
+        cs = self.cell_size
+        self.canvas.coords(self.selected_item, c * cs + 4, r * cs + 4, (c + 1) * cs - 4, (r + 1) * cs - 4)
+        if outline_color != self.drawn_outline:
+            self.canvas.itemconfig(self.selected_item, outline=outline_color)
+            self.drawn_outline = outline_color
+    def highlight_hint(self, cells):
+        """Shade cells, the ones a hint rests on, and unshade the last hint's."""
+        cells = set(cells)
+        for i in cells ^ self.drawn_hint:
+            self.canvas.itemconfig(self.hint_items[i], state="normal" if i in cells else "hidden")
+        self.drawn_hint = cells
+    def highlight_directionals(self, selected):
+        r, c = selected
+        cs = self.cell_size
+        box, size = self.geometry.box, self.geometry.size * cs
+        block_top, block_left = box * cs * (r // box), box * cs * (c // box)
+        row_item, col_item, block_item = self.directional_items
+        self.canvas.coords(row_item, 0, r * cs + 4, size, (r + 1) * cs - 4)
+        self.canvas.coords(col_item, c * cs + 4, 0, (c + 1) * cs - 4, size)
+        self.canvas.coords(block_item, block_left, block_top, block_left + box * cs, block_top + box * cs)
+
+class TerminalRenderer:
+    """Double-buffered terminal output for the CLI board.
+
+    Keeps the last frame drawn and rewrites only the segments that changed, using
+    cursor-positioning escapes, in one write and flush per frame. The whole screen is
+    redrawn for the first frame, after a resize, or on every frame when the output is
+    not a terminal or the frame does not fit it, since wrapped or scrolled lines no
+    longer sit where the row-addressed updates expect.
+    """
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.last = None
+        self.size = None
+    def terminal_size(self):
+        try:
+            if self.stream.isatty():
+                return os.get_terminal_size(self.stream.fileno())
+        except (AttributeError, OSError, ValueError):
+            pass
+        return None
+    def invalidate(self):
+        self.last = None
+    @timed("cli_render")
+    def render(self, frame, footer=""):
+        size = self.terminal_size()
+        fits = size is not None and len(frame) + footer.count("\n") < size.lines and \
+            max(sum(width for _, width in line) for line in frame) <= size.columns
+        if not fits or size != self.size or self.last is None or len(frame) != len(self.last):
+            out = ["\033[2J\033[H", "\n".join("".join(text for text, _ in line) for line in frame), "\n", footer]
+        else:
+            out = []
+            for row, (line, old) in enumerate(zip(frame, self.last), 1):
+                if line == old:
+                    continue
+                if [width for _, width in line] != [width for _, width in old]:
+                    out.append(f"\033[{row};1H\033[2K" + "".join(text for text, _ in line))
+                    continue
+                col = 1
+                for (text, width), (old_text, _) in zip(line, old):
+                    if text != old_text:
+                        out.append(f"\033[{row};{col}H{text}")
+                    col += width
+            out.append(f"\033[{len(frame) + 1};1H\033[J{footer}")
+        self.stream.write("".join(out))
+        self.stream.flush()
+        self.last = frame
+        self.size = size
 
 def launch_cli():
     app = SudokuCLI()
@@ -284,6 +4693,7 @@ def launch_gui():
         HIGHLIGHT_ANSWER = "#e67e22"  # Darker orange for answer mode
         HIGHLIGHT_NOTES = "#4a90e2"  # Blue for notes mode
         HIGHLIGHT_ALIGN = "#2c3e50"  # Subtle dark blue-gray for highlights (replaced obnoxious green)
+        HIGHLIGHT_HINT = "#4a3b12"  # Dim amber behind the cells a hint rests on
         PENCIL_COLOR = "#808080"  # Lighter gray for notes
         REMAINING_COLOR = "#1b3de3" # Darker blue for the remaining numbers
         BUTTON_BG = "#333333"  # Dark gray buttons
@@ -300,6 +4710,17 @@ def launch_gui():
             self.difficulties = ["Easy", "Hard", "Expert", "Torture"]
             self.remove_counts = {"Easy": 25, "Hard": 40, "Expert": 50, "Torture": 65}
             self.multipliers = {"Easy": 1, "Hard": 2, "Expert": 3, "Torture": 4}
+            self.auto_notes = False
+            self.box = 3
+            self.leaderboard = None
+            self.pool = start_puzzle_pool(self.remove_counts.values())
+            self.bank = open_puzzle_bank()
+            self.autosaver = Autosaver()
+            self.hints = HintEngine()
+            self.hint_waiting = False
+            self.shown_hint = None
+            self.generating = None  # future of a big-grid puzzle being made for start_game
+            self.in_game = False
 
             # Menu frame (initial screen)
             self.menu_frame = tk.Frame(self, bg=self.DARK_BG)
@@ -308,11 +4729,26 @@ def launch_gui():
             tk.Label(self.menu_frame, text="PYDOKU", font=("Arial", 82, "bold"), bg=self.DARK_BG, fg=self.HIGHLIGHT_NOTES).pack(pady=50)
             tk.Label(self.menu_frame, text="Select Difficulty", font=("Arial", 24), bg=self.DARK_BG, fg=self.TEXT_GRAY).pack(pady=20)
 
+            size_frame = tk.Frame(self.menu_frame, bg=self.DARK_BG)
+            size_frame.pack(pady=(0, 10))
+            self.size_buttons = {}
+            for box in BOX_SIZES:
+                self.size_buttons[box] = tk.Button(size_frame, text=f"{box * box}x{box * box}", font=("Arial", 14), width=6,
+                                                   bg=self.MID_BG, fg=self.BUTTON_FG, command=lambda b=box: self.select_size(b))
+                self.size_buttons[box].pack(side="left", padx=5)
+            self.select_size(self.box)
+
             for diff in self.difficulties:
                 btn = tk.Button(self.menu_frame, text=diff, font=("Arial", 18), width=15, height=2, bg=self.MID_BG,
                                 fg=self.BUTTON_FG, command=lambda d=diff: self.start_game(d))
                 btn.pack(pady=10)
 
+            tk.Button(self.menu_frame, text="Resume Game", font=("Arial", 16), width=20, bg=self.MID_BG,
+                      fg=self.BUTTON_FG, command=self.resume_game).pack(pady=(30, 0))
+
+            tk.Button(self.menu_frame, text="Play Puzzle #", font=("Arial", 16), width=20, bg=self.MID_BG,
+                      fg=self.BUTTON_FG, command=self.start_bank_puzzle).pack(pady=(30, 0))
+
             tk.Button(self.menu_frame, text="View Leaderboards", font=("Arial", 16), width=20, bg=self.MID_BG,
                       fg=self.BUTTON_FG, command=self.show_leaderboard).pack(pady=30)
 
@@ -322,9 +4758,26 @@ def launch_gui():
             # Game frame (hidden initially)
             self.game_frame = tk.Frame(self, bg=self.DARK_BG)
             self.build_game_ui()
+        def select_size(self, box):
+            self.box = box
+            for b, button in self.size_buttons.items():
+                button.config(bg=self.HIGHLIGHT_ALIGN if b == box else self.MID_BG)
         def stop_ui(self):
+            self.release_resources()
             self.menu_frame.destroy()
             self.destroy()
+        def release_resources(self):
+            self.autosave()
+            self.autosaver.flush()
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+            if self.bank is not None:
+                self.bank.close()
+                self.bank = None
+            if self.leaderboard is not None:
+                self.leaderboard.close()
+                self.leaderboard = None
         def build_game_ui(self):
             main_frame = tk.Frame(self.game_frame, bg=self.DARK_BG)
             main_frame.pack(padx=20, pady=20)
@@ -334,12 +4787,9 @@ def launch_gui():
             left_frame.pack(side="left", padx=(0, 40), pady=20)
 
             tk.Label(left_frame, text="Remaining", font=("Arial", 14, "bold"), bg=self.MID_BG, fg=self.TEXT_GRAY).pack(pady=(0, 10))
+            self.remaining_frame = tk.Frame(left_frame, bg=self.MID_BG)
+            self.remaining_frame.pack()
             self.number_labels = {}
-            for num in range(1, 10):
-                lbl = tk.Label(left_frame, text=str(num), font=("Arial", 48, "bold"),
-                               fg=self.REMAINING_COLOR, width=2, bg=self.MID_BG)
-                lbl.pack(pady=6)
-                self.number_labels[num] = lbl
 
             # Right side
             right_frame = tk.Frame(main_frame, bg=self.DARK_BG)
@@ -359,6 +4809,11 @@ def launch_gui():
                                          fg=self.BUTTON_FG, command=self.give_hint)
             self.hint_button.pack(side="right", padx=10)
 
+            tk.Button(control_frame, text="Redo (R)", font=("Arial", 12, "bold"), bg=self.BUTTON_BG, fg=self.BUTTON_FG,
+                      command=self.redo).pack(side="right", padx=10)
+            tk.Button(control_frame, text="Undo (U)", font=("Arial", 12, "bold"), bg=self.BUTTON_BG, fg=self.BUTTON_FG,
+                      command=self.undo).pack(side="right", padx=10)
+
             self.pause_button = tk.Button(control_frame, text="Pause", font=("Arial", 12, "bold"), bg=self.BUTTON_BG,
                                          fg=self.BUTTON_FG, command=self.toggle_pause)
             self.pause_button.pack(side="right", padx=10)
@@ -367,19 +4822,23 @@ def launch_gui():
                                          fg=self.BUTTON_FG, command=self.toggle_notes)
             self.notes_button.pack(side="right", padx=10)
 
+            self.auto_notes_button = tk.Button(control_frame, text="Auto Notes (A)", font=("Arial", 12), bg=self.BUTTON_BG,
+                                               fg=self.BUTTON_FG, command=self.toggle_auto_notes)
+            self.auto_notes_button.pack(side="right", padx=10)
+
             tk.Button(control_frame, text="Leaderboards", font=("Arial", 12, "bold"), bg=self.BUTTON_BG, fg=self.BUTTON_FG,
                       command=self.show_leaderboard).pack(side="right", padx=10)
 
             tk.Button(control_frame, text="Main Menu", font=("Arial", 12, "bold"), bg=self.BUTTON_BG, fg=self.BUTTON_FG,
                       command=self.back_to_menu).pack(side="right", padx=10)
 
-            # Canvas with border
-            self.cell_size = 60
+            # Canvas with border; layout_board sizes it for the grid being played
             canvas_frame = tk.Frame(right_frame, bg=self.MID_BG, bd=2, relief="raised")
             canvas_frame.pack(pady=20)
-            self.canvas = tk.Canvas(canvas_frame, width=9*self.cell_size, height=9*self.cell_size,
-                                    bg=self.CANVAS_BG, highlightthickness=0)
+            self.canvas = tk.Canvas(canvas_frame, bg=self.CANVAS_BG, highlightthickness=0)
             self.canvas.pack()
+            self.renderer = None
+            self.layout_board(3)
 
             # Paused label (hidden initially)
             self.paused_label = tk.Label(canvas_frame, text="PAUSED", font=("Arial", 48, "bold"),
@@ -392,25 +4851,117 @@ def launch_gui():
             self.score_label.pack(side="left", padx=30)
             self.mistakes_label = tk.Label(bottom_frame, text="Mistakes: 0", font=("Arial", 16), bg=self.DARK_BG, fg=self.TEXT_GRAY)
             self.mistakes_label.pack(side="left", padx=30)
+            self.hint_label = tk.Label(right_frame, text="", font=("Arial", 12), bg=self.DARK_BG, fg=self.TEXT_GRAY,
+                                       wraplength=540, justify="left")
+            self.hint_label.pack(pady=(0, 10))
 
             self.canvas.bind("<Button-1>", self.on_cell_click)
             self.bind_all("<Key>", self.on_key_press)
-        def get_candidates(self, board, r, c):
-            """Return set of possible numbers for empty cell (r,c) on current board."""
-            if board[r, c] != 0:
-                return set()
-            possible = set(range(1, 10))
-            possible -= set(board[r, :])
-            possible -= set(board[:, c])
-            br, bc = 3 * (r // 3), 3 * (c // 3)
-            possible -= set(board[br:br + 3, bc:bc + 3].flatten())
-            return possible
-        def start_game(self, diff_name):
+        def layout_board(self, box):
+            """Rebuild the canvas items and the remaining-digit column for box's grid."""
+            n = box * box
+            self.cell_size = 60 if box == 3 else 720 // n
+            self.canvas.delete("all")
+            self.canvas.config(width=n * self.cell_size, height=n * self.cell_size)
+            self.renderer = CanvasRenderer(self.canvas, self.cell_size, self, box)
+            for lbl in self.number_labels.values():
+                lbl.destroy()
+            self.number_labels = {}
+            rows = 9 if box == 3 else 13  # keeps the column about as tall as the 9x9 one
+            font_size = 48 if box == 3 else 20
+            for num in range(1, n + 1):
+                lbl = tk.Label(self.remaining_frame, text=SYMBOLS[num - 1], font=("Arial", font_size, "bold"),
+                               fg=self.REMAINING_COLOR, width=2, bg=self.MID_BG)
+                lbl.grid(row=(num - 1) % rows, column=(num - 1) // rows, pady=6 if box == 3 else 2)
+                self.number_labels[num] = lbl
+        def start_game(self, diff_name, puzzle=None, snapshot=None):
+            if puzzle is None and snapshot is None and self.box != 3:
+                # The bank and the pool only hold 9x9 puzzles, and a bigger one takes long
+                # enough to make that the window keeps running meanwhile
+                if self.generating is None:
+                    remove_count = scaled_remove_count(self.remove_counts[diff_name], self.box)
+                    self.generating = self.generate_in_background(remove_count)
+                    self.config(cursor="watch")
+                    self.after(HINT_POLL_MS, self.puzzle_ready, diff_name)
+                return
             self.current_diff = diff_name
             self.menu_frame.pack_forget()
             self.game_frame.pack(expand=True, fill="both")
-            self.new_game(diff_name)
+            self.new_game(diff_name, puzzle, snapshot)
+        def resume_game(self):
+            snapshot = load_saved_game()
+            if snapshot is None:
+                messagebox.showinfo("Resume Game", "There is no saved game to resume.")
+                return
+            diff_name = snapshot.difficulty.capitalize()
+            if diff_name not in self.multipliers:
+                messagebox.showinfo("Resume Game", f"The saved game has unknown difficulty {snapshot.difficulty!r}.")
+                return
+            self.start_game(diff_name, snapshot=snapshot)
+        def autosave(self):
+            """Hand the game in progress to the background autosaver; returns at once."""
+            if not self.in_game:
+                return
+            self.autosaver.save(GameSnapshot.of_game(
+                self.current_diff.lower(), self.original, self.board, self.journal, elapsed=self.clock.elapsed(),
+                paused=self.paused, notes_mode=self.notes_mode, selected=self.selected).to_bytes())
+        def start_bank_puzzle(self):
+            if self.bank is None or not len(self.bank):
+                messagebox.showinfo("Puzzle Bank", f"No puzzle bank found at {BANK_PATH}.")
+                return
+            number = simpledialog.askinteger("Puzzle Bank", f"Puzzle number (1-{len(self.bank)}):",
+                                             parent=self, minvalue=1, maxvalue=len(self.bank))
+            if number is None:
+                return
+            name, orig_flat, sol_flat = self.bank.get(number - 1)
+            diff_name = name.capitalize()
+            if diff_name not in self.multipliers:
+                messagebox.showinfo("Puzzle Bank", f"Puzzle #{number} has unknown difficulty {name!r}.")
+                return
+            self.start_game(diff_name, (orig_flat, sol_flat))
+        def generate_in_background(self, remove_count):
+            """Future of a generate_puzzle result at the current size, made by the pool's
+            worker processes where it has some and on a daemon thread otherwise."""
+            box = self.box
+            executor = self.pool.executor if self.pool is not None else None
+            if executor is not None:
+                try:
+                    return executor.submit(generate_puzzle, remove_count=remove_count, box=box)
+                except RuntimeError:  # executor shut down or broken
+                    pass
+            from concurrent.futures import Future
+            future = Future()
+            def run():
+                try:
+                    future.set_result(generate_puzzle(remove_count=remove_count, box=box))
+                except Exception as e:
+                    future.set_exception(e)
+            threading.Thread(target=run, daemon=True, name="pydoku-generate").start()
+            return future
+        def puzzle_ready(self, diff_name):
+            """Start the game once its puzzle is made, checking back rather than blocking the window."""
+            if not self.generating.done():
+                self.after(HINT_POLL_MS, self.puzzle_ready, diff_name)
+                return
+            future, self.generating = self.generating, None
+            self.config(cursor="")
+            try:
+                puzzle = future.result()
+            except Exception as e:
+                messagebox.showerror("New Game", f"Could not generate a puzzle: {e}")
+                return
+            self.start_game(diff_name, puzzle)
+        def next_puzzle(self, diff_name):
+            if self.bank is not None and self.bank.count(diff_name):
+                _, orig_flat, sol_flat = self.bank.draw(diff_name)
+                return orig_flat, sol_flat
+            if self.pool is not None:
+                return self.pool.take(self.remove_counts[diff_name])
+            return generate_puzzle(remove_count=self.remove_counts[diff_name])
         def back_to_menu(self):
+            self.autosave()
+            self.in_game = False
+            self.autosaver.flush()
             self.game_frame.pack_forget()
             self.menu_frame.pack(expand=True, fill="both")
         def toggle_pause(self):
@@ -418,112 +4969,73 @@ def launch_gui():
             text = "Resume" if self.paused else "Pause"
             self.pause_button.config(text=text)
             if self.paused:
+                self.clock.pause()
                 self.canvas.pack_forget()
                 self.paused_label.pack(expand=True, fill="both")
             else:
+                self.clock.resume()
                 self.paused_label.pack_forget()
                 self.canvas.pack()
+            self.autosave()
         def toggle_notes(self):
             self.notes_mode = not self.notes_mode
             if self.notes_mode:
                 self.notes_button.config(text="NOTES MODE (N)", bg=self.HIGHLIGHT_ALIGN, font=("Arial", 14, "bold"))
             else:
                 self.notes_button.config(text="Answer Mode (N)", bg=self.BUTTON_BG, font=("Arial", 12))
+        def toggle_auto_notes(self):
+            self.auto_notes = not self.auto_notes
+            self.board.set_auto_notes(self.auto_notes)
+            self.style_auto_notes_button()
+            self.draw_numbers()
+            self.autosave()
+        def style_auto_notes_button(self):
+            if self.auto_notes:
+                self.auto_notes_button.config(text="AUTO NOTES (A)", bg=self.HIGHLIGHT_ALIGN, font=("Arial", 14, "bold"))
+            else:
+                self.auto_notes_button.config(text="Auto Notes (A)", bg=self.BUTTON_BG, font=("Arial", 12))
         def update_timer(self):
             if hasattr(self, 'timer_running') and self.timer_running and not self.paused:
-                elapsed = int(time.time() - self.start_time)
+                elapsed = int(self.clock.elapsed())
                 m, s = divmod(elapsed, 60)
                 self.timer_label.config(text=f"Time: {m:02d}:{s:02d}")
             self.after(1000, self.update_timer)
         def update_remaining(self):
-            for num in range(1, 10):
-                placed_correct = sum(1 for r in range(9) for c in range(9)
-                                     if self.player[r, c] == num and self.solution[r, c] == num)
-                color = "gray" if placed_correct == 9 else self.REMAINING_COLOR
+            n = self.board.geometry.size
+            for num in range(1, n + 1):
+                color = "gray" if self.board.correct_count(num) == n else self.REMAINING_COLOR
                 self.number_labels[num].config(fg=color)
-        def draw_grid(self):
-            self.canvas.delete("grid")
-            self.selected_num = self.player[self.selected]  # get the current num located in (r,c)
-            for i in range(10):
-                width = 5 if i % 3 == 0 else 1
-                fill_color = self.GRID_THICK if i % 3 == 0 else self.GRID_THIN
-                self.canvas.create_line(i * self.cell_size, 0, i * self.cell_size, 9 * self.cell_size, fill=fill_color,
-                                        width=width, tags="grid")
-                self.canvas.create_line(0, i * self.cell_size, 9 * self.cell_size, i * self.cell_size, fill=fill_color,
-                                        width=width, tags="grid")
+        @timed("draw_numbers")
         def draw_numbers(self):
-            self.canvas.delete("numbers")
-            for r in range(9):
-                for c in range(9):
-                    val = self.player[r, c]
-                    if val != 0: # not an empty cell, a user-defined int has been recorded
-                        color = self.CLUE_COLOR if self.original[r, c] != 0 else \
-                            (self.INCORRECT_COLOR if cell_has_conflict(self.player, r, c) else self.CLUE_COLOR)
-                        if val == self.selected_num and self.selected_num != 0 and (val == self.solution[r, c]): # if the current index of the grid is a selected int
-                            color = self.CORRECT_COLOR # make all of like integers stand out more
-
-                        x = c * self.cell_size + self.cell_size // 2
-                        y = r * self.cell_size + self.cell_size // 2
-                        self.canvas.create_text(x, y, text=str(val), tags="numbers",
-                                                fill=color, font=("Arial", 32, "bold"))
-                    # Pencil marks (only on empty cells)
-                    if val == 0 and self.notes[r][c]:
-                        for note in sorted(self.notes[r][c]):
-                            mini_r = (note - 1) // 3
-                            mini_c = (note - 1) % 3
-                            offset_x = 12 + mini_c * 16
-                            offset_y = 16 + mini_r * 16
-                            x = c * self.cell_size + offset_x
-                            y = r * self.cell_size + offset_y
-                            self.canvas.create_text(x, y, text=str(note), tags="numbers",
-                                                    fill=self.PENCIL_COLOR, font=("Arial", 12))
+            self.renderer.draw_numbers(self.board, self.original, self.selected_num)
+            if self.shown_hint is not None and self.player.cells != self.shown_hint_board:
+                self.show_hint(None)  # the board moved on, so the explanation is stale
+            if self.in_game:
+                self.hints.submit(self.board)  # worked out while the player thinks, ready for the Hint button
+        @timed("highlight_selected")
         def highlight_selected(self):
-            self.canvas.delete("highlight")
-            r, c = self.selected
             self.selected_num = self.player[self.selected]  # get the current num located in (r,c)
             outline_color = self.HIGHLIGHT_ANSWER if not self.notes_mode else self.HIGHLIGHT_NOTES
-            self.canvas.create_rectangle(
-                c * self.cell_size + 4, r * self.cell_size + 4,
-                (c + 1) * self.cell_size - 4, (r + 1) * self.cell_size - 4,
-                outline=outline_color, width=4, tags="highlight"
-            )
+            self.renderer.highlight_selected(self.selected, outline_color)
             self.highlight_directionals()
         def highlight_directionals(self):
-            self.canvas.delete("highlight_directionals")
-            r, c = self.selected
-            block_y = math.floor((r/9)*3)
-            block_x = math.floor((c/9)*3)
-            block_top = 0 + (block_y * (self.cell_size * 3))
-            block_bottom = block_top + (self.cell_size * 3)
-            block_left = 0 + (block_x * (self.cell_size * 3))
-            block_right = block_left + (self.cell_size * 3)
-
-            # Horizontal Line
-            self.canvas.create_rectangle(
-                0, r * self.cell_size + 4,
-                9 * self.cell_size, (r + 1) * self.cell_size - 4,
-                fill=self.HIGHLIGHT_ALIGN, width=4, tags="highlight_directionals"
-            )
-            # Vertical Line
-            self.canvas.create_rectangle(
-                c * self.cell_size + 4, 0,
-                (c + 1) * self.cell_size - 4, 9 * self.cell_size,
-                fill=self.HIGHLIGHT_ALIGN, width=4, tags="highlight_directionals"
-            )
-            # Block
-            self.canvas.create_rectangle(
-                block_left, block_top, block_right, block_bottom,
-                fill=self.HIGHLIGHT_ALIGN, width=4, tags="highlight_directionals"
-            )
-            self.canvas.tag_lower("highlight_directionals")
-        def new_game(self, diff_name):
-            remove_count = self.remove_counts[diff_name]
-            orig_flat, sol_flat = generate_puzzle(remove_count=remove_count)
-            self.original = orig_flat.reshape(9, 9)
-            self.solution = sol_flat.reshape(9, 9)
-            self.player = self.original.copy()
-
-            self.start_time = time.time()
+            self.renderer.highlight_directionals(self.selected)
+        def new_game(self, diff_name, puzzle=None, snapshot=None):
+            if snapshot is not None:
+                self.original = snapshot.clues
+                self.board, self.journal = snapshot.restore(self.multipliers[diff_name])
+                self.solution = self.board.solution
+            else:
+                orig_flat, sol_flat = puzzle if puzzle is not None else self.next_puzzle(diff_name)
+                self.original = Board.from_array(orig_flat)
+                self.solution = Board.from_array(sol_flat)
+                self.board = BoardState(self.original.copy(), self.solution)
+                self.journal = MoveJournal(self.board, self.multipliers[diff_name])
+            self.player = self.board.player
+            if self.renderer.geometry is not self.board.geometry:
+                self.layout_board(self.board.geometry.box)
+
+            self.clock = GameClock(snapshot.elapsed if snapshot is not None else 0.0)
             self.timer_running = True
             self.paused = False
             self.pause_button.config(text="Pause")
@@ -531,53 +5043,126 @@ def launch_gui():
                 self.paused_label.pack_forget()
             self.canvas.pack()
 
-            self.score = 0
-            self.score_label.config(text="Score: 0")
-            self.mistakes = 0
-            self.mistakes_label.config(text="Mistakes: 0")
-            self.hinted = set()
-            self.notes_mode = False
-            self.toggle_notes()  # Force update button to Answer Mode
-            self.toggle_notes()  # Back to off (ensures correct style)
-            self.notes = [[set() for _ in range(9)] for _ in range(9)]
-
-            self.selected = (0, 0)
+            self.update_score()
+            self.notes_mode = not (snapshot is not None and snapshot.notes_mode)
+            self.toggle_notes()  # Flips into the wanted mode and styles the button for it
+            if snapshot is not None:
+                self.auto_notes = snapshot.auto_notes  # the saved marks are already on the board
+                self.style_auto_notes_button()
+            else:
+                self.board.set_auto_notes(self.auto_notes)
+            self.notes = self.board.notes
+
+            self.selected = snapshot.selected if snapshot is not None else (0, 0)
             self.selected_num = self.player[self.selected] # get the current num located in (0,0)
-            self.draw_grid()
+            self.show_hint(None)
+            self.in_game = True
             self.highlight_selected()
             self.highlight_directionals()
             self.draw_numbers()
             self.update_remaining()
+            if snapshot is not None and snapshot.paused:
+                self.toggle_pause()
+            self.autosave()
         def give_hint(self):
-            empties = [(r, c) for r in range(9) for c in range(9) if self.player[r, c] == 0]
-            if not empties:
+            """Explain the next logical step; pressing Hint again on the same board plays it."""
+            if self.paused or self.hint_waiting:
+                return
+            self.hint_waiting = True
+            self.hint_ready()
+        def hint_ready(self):
+            """Act on the hint once the worker has it, checking back rather than blocking the window."""
+            if self.paused or not self.in_game:
+                self.hint_waiting = False
+                return
+            try:
+                ready, hint = self.hints.poll(self.board)
+            except Exception as e:
+                self.hint_waiting = False
+                messagebox.showerror("Hint", f"Could not work out a hint: {e}")
+                return
+            if not ready:
+                self.after(HINT_POLL_MS, self.hint_ready)
+                return
+            self.hint_waiting = False
+            if hint is None:
                 messagebox.showinfo("Hint", "No empty cells left!")
                 return
-            r, c = random.choice(empties)
-            correct = self.solution[r, c]
-            self.player[r, c] = correct
-            self.hinted.add((r, c))
+            self.selected = divmod(hint.cell, self.board.geometry.size)
+            explain = hint is not self.shown_hint
+            if explain:
+                self.show_hint(hint)
+            elif hint.digit:
+                self.journal.hint(hint.cell)
+            else:
+                self.journal.place(hint.cell, 0)  # a wrong entry the hint pointed out
+                self.update_score()
             self.selected_num = self.player[self.selected]  # get the current num located in (r,c)
             self.draw_numbers()
+            self.highlight_selected()
+            self.highlight_directionals()
+            if not explain:
+                self.update_remaining()
+                self.autosave()
+                self.check_win()
+        def show_hint(self, hint):
+            """Shade the cells hint rests on and explain it below the board; None clears it."""
+            self.shown_hint = hint
+            self.shown_hint_board = bytes(self.player.cells) if hint is not None else None
+            self.renderer.highlight_hint(hint.reasons if hint is not None else ())
+            self.hint_label.config(text=hint.text if hint is not None else "")
+        def update_score(self):
+            self.score_label.config(text=f"Score: {self.journal.score}")
+            self.mistakes_label.config(text=f"Mistakes: {self.journal.mistakes}")
+        def undo(self):
+            if not self.paused:
+                self.show_history_move(self.journal.undo())
+        def redo(self):
+            if not self.paused:
+                self.show_history_move(self.journal.redo())
+        def show_history_move(self, i):
+            """Select and redraw the cell an undo or redo changed; i is None when there was nothing to do."""
+            if i is None:
+                return
+            self.selected = divmod(i, self.board.geometry.size)
+            self.selected_num = self.player[self.selected]
+            self.draw_numbers()
+            self.highlight_selected()
             self.update_remaining()
+            self.update_score()
+            self.autosave()
             self.check_win()
         def on_cell_click(self, event):
             if self.paused:
                 return
             c = event.x // self.cell_size
             r = event.y // self.cell_size
-            if 0 <= r < 9 and 0 <= c < 9:
+            n = self.board.geometry.size
+            if 0 <= r < n and 0 <= c < n:
                 self.selected = (r, c)
                 self.selected_num = self.player[self.selected]  # get the current num located in (0,0)
                 self.draw_numbers()
                 self.highlight_selected()
+        @timed("gui_key")
         def on_key_press(self, event):
             if self.paused:
                 return
 
-            if event.char.lower() == 'n':
+            # Digits past 9 are capital letters, so lowercase a and n stay free for the toggles
+            geo = self.board.geometry
+            digit = None if event.char.islower() else geo.digit(event.char)
+            if digit is None and event.char.lower() == 'n':
                 self.toggle_notes()
                 return
+            if digit is None and event.char.lower() == 'a':
+                self.toggle_auto_notes()
+                return
+            if digit is None and (event.char.lower() == 'u' or event.char == '\x1a'):  # u or Ctrl+Z
+                self.undo()
+                return
+            if digit is None and (event.char.lower() == 'r' or event.char == '\x19'):  # r or Ctrl+Y
+                self.redo()
+                return
 
             r, c = self.selected
             changed = False
@@ -586,48 +5171,33 @@ def launch_gui():
                 if event.keysym == "Left":
                     c = max(0, c - 1)
                 elif event.keysym == "Right":
-                    c = min(8, c + 1)
+                    c = min(geo.size - 1, c + 1)
                 elif event.keysym == "Up":
                     r = max(0, r - 1)
                 elif event.keysym == "Down":
-                    r = min(8, r + 1)
+                    r = min(geo.size - 1, r + 1)
             else:
-                if event.char in "123456789":
-                    num = int(event.char)
+                if digit is not None:
+                    num = digit
                     if not self.notes_mode:
                         if self.original[r, c] == 0:
-                            old_conflict = cell_has_conflict(self.player, r, c)
-                            candidates = len(self.get_candidates(self.player, r, c))
-                            is_correct = num == self.solution[r, c]
-                            self.player[r, c] = num
-                            new_conflict = cell_has_conflict(self.player, r, c)
-                            if new_conflict and not old_conflict:
-                                self.mistakes += 1
-                                self.mistakes_label.config(text=f"Mistakes: {self.mistakes}")
-                            if is_correct and (r, c) not in self.hinted:
-                                points = 100 * (9 - candidates + 1) * self.multipliers[self.current_diff]
-                                self.score += points
-                                self.score_label.config(text=f"Score: {self.score}")
+                            self.journal.place(r * geo.size + c, num)
+                            self.update_score()
                             changed = True
                     else:
                         if self.player[r, c] == 0:
-                            if num in self.notes[r][c]:
-                                self.notes[r][c].remove(num)
-                            else:
-                                self.notes[r][c].add(num)
+                            self.journal.toggle_note(r * geo.size + c, num)
                             changed = True
                 elif event.keysym in {"Delete", "BackSpace", "0"}:
                     if not self.notes_mode:
                         if self.original[r, c] == 0:
-                            old_conflict = cell_has_conflict(self.player, r, c)
-                            self.player[r, c] = 0
-                            if old_conflict and not cell_has_conflict(self.player, r, c):
-                                self.mistakes = max(0, self.mistakes - 1) #possibly remove this, resets a mistake when the correct int is inputted
-                                self.mistakes_label.config(text=f"Mistakes: {self.mistakes}")
+                            # Clearing a conflicting cell takes its mistake back
+                            self.journal.place(r * geo.size + c, 0)
+                            self.update_score()
                             changed = True
                     else:
                         if self.player[r, c] == 0:
-                            self.notes[r][c].clear()
+                            self.journal.clear_notes(r * geo.size + c)
                             changed = True
 
             self.selected = (r, c)
@@ -637,59 +5207,80 @@ def launch_gui():
             self.highlight_directionals()
             if changed:
                 self.update_remaining()
+                self.autosave()
                 self.check_win()
         def check_win(self):
-            if np.array_equal(self.player, self.solution):
+            if self.in_game and self.board.solved():
                 self.timer_running = False
-                elapsed = int(time.time() - self.start_time)
+                self.in_game = False
+                self.clock.pause()
+                self.autosaver.discard()
+                elapsed = int(self.clock.elapsed())
                 m, s = divmod(elapsed, 60)
                 timestr = f"{m:02d}:{s:02d}"
                 messagebox.showinfo("🎉 Congratulations!",
-                                    f"You solved the puzzle in {timestr}!\nFinal Score: {self.score}")
+                                    f"You solved the puzzle in {timestr}!\nFinal Score: {self.journal.score}")
 
                 nickname = simpledialog.askstring("Leaderboard", "Enter nickname (max 8 chars):",
                                                   parent=self)
                 if nickname:
                     nickname = nickname[:8]
                     date = datetime.now().strftime("%Y-%m-%d %H:%M")
-                    line = f"{nickname}|{self.score}|{timestr}|{date}|{self.current_diff}\n"
-                    with open("leaderboards.txt", "a") as f:
-                        f.write(line)
+                    self.open_leaderboard().add(nickname, self.journal.score, timestr, date,
+                                                difficulty_key(self.current_diff, self.board.geometry.box),
+                                                self.journal.to_bytes(), canonical_id(self.original))
+        def open_leaderboard(self):
+            if self.leaderboard is None:
+                self.leaderboard = Leaderboard()
+            return self.leaderboard
         def show_leaderboard(self):
             top = Toplevel(self)
             top.title("Leaderboards")
             top.resizable(False, False)
 
+            controls = tk.Frame(top)
+            controls.pack(padx=10, pady=(10, 0), fill="x")
             text = Text(top, font=("Courier", 12), width=70, height=20)
             text.pack(padx=10, pady=10)
+            view = {"difficulty": None, "page": 0}
 
-            entries = []
-            if os.path.exists("leaderboards.txt"):
-                with open("leaderboards.txt") as f:
-                    for line in f:
-                        parts = line.strip().split("|")
-                        if len(parts) == 5:
-                            nick, score, t, date, diff = parts
-                            entries.append((int(score), nick, t, date, diff))
-
-            if not entries:
-                text.insert("end", "No entries yet!")
-            else:
-                entries.sort(reverse=True)
-                header = f"{'Rank':<6}{'Score':<10}{'Nickname':<12}{'Time':<10}{'Date':<18}{'Difficulty'}\n"
-                header += "-" * 70 + "\n"
-                text.insert("end", header)
-                for rank, (score, nick, t, date, diff) in enumerate(entries, 1):
-                    line = f"{rank:<6}{score:<10}{nick:<12}{t:<10}{date:<18}{diff}\n"
-                    text.insert("end", line)
+            def render():
+                leaderboard = self.open_leaderboard()
+                offset = view["page"] * LEADERBOARD_PAGE
+                entries = leaderboard.top(view["difficulty"], limit=LEADERBOARD_PAGE, offset=offset)
+                text.config(state="normal")
+                text.delete("1.0", "end")
+                if not entries:
+                    text.insert("end", "No entries yet!")
+                else:
+                    header = f"{'Rank':<6}{'Score':<10}{'Nickname':<12}{'Time':<10}{'Date':<18}{'Difficulty'}\n"
+                    header += "-" * 70 + "\n"
+                    text.insert("end", header)
+                    for rank, (score, nick, t, date, diff) in enumerate(entries, offset + 1):
+                        line = f"{rank:<6}{score:<10}{nick:<12}{t:<10}{date:<18}{diff}\n"
+                        text.insert("end", line)
+                text.config(state="disabled")
+
+            def show(difficulty=None, page=0):
+                view["difficulty"], view["page"] = difficulty, max(0, page)
+                render()
 
-            text.config(state="disabled")
+            keys = [difficulty_key(d, self.box) for d in self.difficulties]
+            for label, diff in [("All", None)] + [(key, key) for key in keys]:
+                tk.Button(controls, text=label, command=lambda d=diff: show(d)).pack(side="left", padx=2)
+            tk.Button(controls, text="Next >", command=lambda: show(view["difficulty"], view["page"] + 1)).pack(side="right", padx=2)
+            tk.Button(controls, text="< Prev", command=lambda: show(view["difficulty"], view["page"] - 1)).pack(side="right", padx=2)
+            render()
 
     app = SudokuGUI()
     app.update_timer()
-    app.mainloop()
+    try:
+        app.mainloop()
+    finally:
+        app.release_resources()
 
 def mode_selection():
+    menu_shown = warm_up()
     while True:
         print("\033[2J\033[H", end="")
         print("="*55)
@@ -701,6 +5292,7 @@ def mode_selection():
         print("q - Quit")
         print()
 
+        menu_shown.set()
         choice = input("> ").strip().lower()
 
         if choice in {'1', 'cli'}:
@@ -715,9 +5307,11 @@ def mode_selection():
             input("Press Enter to continue...")
 
 if __name__ == "__main__":
-    args = sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != "--profile"]
     args_counted = False
 
+    if args and args[0] in COMMANDS:
+        sys.exit(COMMANDS[args[0]](args[1:]))
     if args and not args_counted:
         if '-g' in args or '--gui' in args:
             launch_gui()
@@ -726,7 +5320,7 @@ if __name__ == "__main__":
             launch_cli()
             args_counted = True
         else:
-            print("Usage: python pydoku.py [-c | --cli | -g | --gui]")
+            print("Usage: python pydoku.py [--profile] [-c | --cli | -g | --gui] | build-bank [PATH] [--count N] | solve [FILE ...] [--solver NAME] | compare-solvers [FILE ...] | dedup [FILE ...] [--ids] | audit [--db PATH] | race-server [--port N] | join [HOST:PORT] | race-loadtest [--rooms N,...] | serve [--port N] | serve-loadtest [--concurrency N,...] | bench [--baseline FILE] | startup-check [--budget MS]")
             sys.exit(1)
         mode_selection()
     else:
@@ -0,0 +1,403 @@
+import pytest
+
+import pydoku
+
+
+def _game(remove_count=40, seed=3, box=3):
+    """A fresh BoardState on the seeded puzzle."""
+    puzzle, solution = pydoku.generate_puzzle(remove_count, seed=seed, box=box)
+    return pydoku.BoardState(pydoku.Board.from_array(puzzle), pydoku.Board.from_array(solution))
+
+
+@pytest.fixture
+def board():
+    return _game()
+
+
+def test_generate_puzzles_prefix_does_not_depend_on_n():
+    puzzles, solutions = pydoku.generate_puzzles(2000, 40, seed=9)
+    for n in (1, 999, 1500):
+        head, head_solutions = pydoku.generate_puzzles(n, 40, seed=9)
+        assert (head == puzzles[:n]).all()
+        assert (head_solutions == solutions[:n]).all()
+    remixed, _ = pydoku.generate_puzzles(7, 40, seed=9, per_grid=4)
+    assert (pydoku.generate_puzzles(5, 40, seed=9, per_grid=4)[0] == remixed[:5]).all()
+
+
+def test_parse_seed_rejects_seeds_journals_cannot_store():
+    cli = pydoku.SudokuCLI()
+    assert cli.parse_seed("seed 5000000000 easy") is None
+    seed, settings = cli.parse_seed(f"seed {2 ** 32 - 1} easy")
+    assert seed == 2 ** 32 - 1 and settings["name"] == "easy"
+    data = pydoku.MoveJournal(_game(25, seed), seed=seed, remove_count=25).to_bytes()
+    assert pydoku.MoveJournal.from_bytes(data).seed == seed
+
+
+def _sparse_grid(box, clues, seed):
+    import random
+    rng = random.Random(seed)
+    full = [int(v) for v in pydoku.np.asarray(pydoku.BitmaskSolver(rng=rng, box=box).fill()).ravel()]
+    cells = [0] * len(full)
+    for i in rng.sample(range(len(full)), clues):
+        cells[i] = full[i]
+    return cells
+
+
+def test_canonical_form_is_quick_on_sparse_grids():
+    import time
+    for box, clues, budget in ((3, 0, 0.5), (3, 1, 2.0), (3, 12, 2.0), (4, 1, 5.0), (5, 2, 10.0)):
+        cells = _sparse_grid(box, clues, seed=clues)
+        start = time.perf_counter()
+        pydoku.canonical_form(cells)
+        assert time.perf_counter() - start < budget, (box, clues)
+
+
+def test_canonical_form_is_invariant_on_sparse_grids():
+    import numpy as np
+    cells = _sparse_grid(3, 17, seed=18)
+    grid = np.array(cells).reshape(9, 9)
+    form = pydoku.canonical_form(cells)
+    relabel = [0] + list(range(9, 0, -1))
+    copies = [grid.T, grid[[3, 4, 5, 0, 1, 2, 6, 7, 8]], grid[:, [1, 0, 2, 3, 4, 5, 6, 7, 8]],
+              np.array([relabel[v] for v in grid.ravel()]).reshape(9, 9)]
+    for copy in copies:
+        assert pydoku.canonical_form(copy) == form
+    assert pydoku.canonical_form(list(form)) == form
+
+
+def _double(batch, offset=0):
+    return [2 * x + offset for x in batch]
+
+
+def test_map_chunks_keeps_input_order():
+    for workers in (1, 2):
+        out = []
+        pydoku._map_chunks(_double, range(25), 4, workers, out.extend, 1)
+        assert out == [2 * x + 1 for x in range(25)]
+
+
+def test_hint_engine_survives_a_failing_search(monkeypatch, board):
+    engine = pydoku.HintEngine()
+    real_find_hint = pydoku.find_hint
+
+    def broken(*args):
+        raise RuntimeError("search failed")
+    monkeypatch.setattr(pydoku, "find_hint", broken)
+    with pytest.raises(RuntimeError):
+        engine.get(board, timeout=5)
+    with pytest.raises(RuntimeError):
+        engine.poll(board)
+    monkeypatch.setattr(pydoku, "find_hint", real_find_hint)
+    i = board.player.cells.index(0)
+    board.set(*divmod(i, 9), board.solution.cells[i])
+    assert engine.get(board, timeout=5) is not None
+    assert engine.thread.is_alive()
+
+
+def test_rated_generation_raises_when_the_band_is_missed():
+    with pytest.raises(pydoku.RatingBandMissed) as missed:
+        pydoku.generate_puzzle(seed=1, rating=("x-wing", "swordfish"), attempts=1)
+    assert pydoku.rating_level(missed.value.rating) < pydoku.rating_level("x-wing")
+    assert pydoku.BitmaskSolver().count_solutions(missed.value.puzzle) == 1
+    stats = {}
+    pydoku.generate_puzzle(seed=1, rating=("naked single", "hidden single"), stats=stats)
+    assert stats["rating"] in ("naked single", "hidden single")
+
+
+def test_puzzle_pool_shares_an_executor_it_does_not_own():
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pool = pydoku.PuzzlePool([25], size=1, executor=executor)
+        assert pool.started.wait(5)
+        assert pool.executor is executor
+        pool.shutdown()
+        assert executor.submit(int).result() == 0
+
+
+def test_terminal_renderer_redraws_frames_wider_than_the_terminal():
+    import io
+    import os
+
+    class FixedTerminal(pydoku.TerminalRenderer):
+        def __init__(self, columns, lines):
+            super().__init__(io.StringIO())
+            self.fixed = os.terminal_size((columns, lines))
+
+        def terminal_size(self):
+            return self.fixed
+
+    board = _game(300, seed=1, box=5)
+    cli = pydoku.SudokuCLI()
+    clues = board.player.copy()
+    frame = lambda cursor: cli.block_grid_frame(clues, board.player, board.solution, cursor=cursor, board=board)
+    for columns, redraws in ((80, True), (200, False)):
+        renderer = FixedTerminal(columns, 100)
+        renderer.render(frame((0, 0)))
+        renderer.stream.seek(0)
+        renderer.stream.truncate()
+        renderer.render(frame((0, 1)))
+        assert renderer.stream.getvalue().startswith("\033[2J") == redraws
+
+
+def test_bitmask_search_and_enumeration_agree():
+    puzzle, _ = pydoku.generate_puzzle(40, seed=5)
+    cells = [int(v) for v in puzzle.ravel()]
+    for i in [i for i, v in enumerate(cells) if v][:4]:
+        cells[i] = 0  # opens up more solutions
+    solver = pydoku.BitmaskSolver()
+    enumerated = list(solver.enumerate(cells, 50))
+    assert solver.count_solutions(cells, 50) == len(enumerated) > 1
+    assert (solver.solve(cells) == enumerated[0]).all()
+
+
+def _run_profiled(code, tmp_path):
+    import os
+    import subprocess
+    import sys
+    env = dict(os.environ, PYDOKU_PROFILE="1", PYDOKU_PROFILE_FILE=str(tmp_path / "profile.json"),
+               PYTHONPATH=os.path.dirname(os.path.abspath(pydoku.__file__)))
+    return subprocess.run([sys.executable, "-c", "import pydoku\n" + code], env=env, cwd=tmp_path,
+                          capture_output=True, text=True, timeout=120)
+
+
+def test_profiling_times_generate_puzzle_and_keeps_rating_band_missed_a_class(tmp_path):
+    result = _run_profiled(
+        "assert isinstance(pydoku.RatingBandMissed, type)\n"
+        "assert pydoku.generate_puzzle.__wrapped__.__name__ == 'generate_puzzle'\n"
+        "pydoku.generate_puzzle(40, seed=1)\n"
+        "assert 'generate_puzzle' in pydoku.INSTRUMENTATION.report()\n", tmp_path)
+    assert result.returncode == 0, result.stderr
+
+
+def test_seeded_puzzles_do_not_depend_on_the_solver_backend(monkeypatch):
+    puzzles = []
+    for backend in pydoku.SOLVERS:
+        monkeypatch.setattr(pydoku, "SOLVER_BACKEND", backend)
+        puzzles.append(pydoku.generate_puzzle(40, seed=7))
+    for puzzle, solution in puzzles[1:]:
+        assert (puzzle == puzzles[0][0]).all() and (solution == puzzles[0][1]).all()
+
+
+def test_timed_functions_pickle_with_profiling_on(tmp_path):
+    result = _run_profiled(
+        "import pickle\n"
+        "assert pickle.loads(pickle.dumps(pydoku.generate_puzzle)) is pydoku.generate_puzzle\n"
+        "assert pydoku.generate_puzzle.__qualname__ == 'generate_puzzle'\n", tmp_path)
+    assert result.returncode == 0, result.stderr
+
+
+def test_seeded_journals_check_the_clues_they_are_given(monkeypatch, capsys):
+    board = _game(30, seed=11)
+    data = pydoku.MoveJournal(board, seed=11, remove_count=30).to_bytes()
+    clues = board.player.copy()
+    assert pydoku.MoveJournal.from_bytes(data, clues).board.player == clues
+    other = _game(30, seed=12)
+    with pytest.raises(ValueError):
+        pydoku.MoveJournal.from_bytes(data, other.player)
+    snapshot = pydoku.GameSnapshot.of_game("easy", other.player, other,
+                                           pydoku.MoveJournal(board, seed=11, remove_count=30))
+    monkeypatch.setattr(pydoku, "load_saved_game", lambda: snapshot)
+    monkeypatch.setattr("builtins.input", lambda prompt="": "")
+    pydoku.SudokuCLI().resume_game()
+    assert "could not be restored" in capsys.readouterr().out
+
+
+def test_canonical_form_is_quick_and_invariant_on_full_grids():
+    import random
+    import time
+    rng = random.Random(4)
+    for box, budget in ((3, 0.5), (4, 2.0), (5, 5.0)):
+        n = box * box
+        cells = [int(v) for v in pydoku.BitmaskSolver(rng=rng, box=box).fill().ravel()]
+        start = time.perf_counter()
+        form = pydoku.canonical_form(cells)
+        assert time.perf_counter() - start < budget, box
+        bands, stacks = rng.sample(range(box), box), rng.sample(range(box), box)
+        rows = [b * box + r for b in bands for r in rng.sample(range(box), box)]
+        cols = [s * box + c for s in stacks for c in rng.sample(range(box), box)]
+        relabel = [0] + rng.sample(range(1, n + 1), n)
+        copy = [relabel[cells[r * n + c]] for c in cols for r in rows]  # shuffled and transposed
+        assert pydoku.canonical_form(copy) == form
+        assert sorted(form) == sorted(cells)
+
+
+def test_startup_stays_within_its_budget(capsys):
+    assert pydoku.startup_check_command(["--runs", "7"]) == 0, capsys.readouterr()
+
+
+def test_warm_up_puzzles_start_the_first_pool(monkeypatch):
+    monkeypatch.setattr(pydoku, "WARM_PUZZLES", {})
+    menu_shown = pydoku.warm_up()
+    menu_shown.set()
+    for _ in range(500):
+        if len(pydoku.WARM_PUZZLES) == len(pydoku.SERVE_DIFFICULTIES):
+            break
+        pydoku.time.sleep(0.01)
+    warm = pydoku.WARM_PUZZLES[25]
+    pool = pydoku.PuzzlePool([25], executor=None, workers=1)
+    assert pool.take_ready(25) is warm
+    pool.shutdown()
+
+
+def test_race_moves_use_the_board_geometry(tmp_path):
+    import json
+
+    class Writer:
+        def __init__(self):
+            self.sent = []
+            self.transport = self
+
+        def is_closing(self):
+            return False
+
+        def write(self, data):
+            self.sent.append(json.loads(data))
+
+        def get_write_buffer_size(self):
+            return 0
+
+    server = pydoku.RaceServer(leaderboard_path=str(tmp_path / "leaderboard.db"))
+    room = pydoku.RaceRoom("1", "easy", 1, seed=3)
+    board = _game(100, seed=3, box=4)
+    room.clues, room.state = board.player.copy(), "racing"
+    player = pydoku.RacePlayer("ann", Writer(), room)
+    player.journal = pydoku.MoveJournal(board, 1, 3, 100, room.clues)
+    cell = max(i for i, v in enumerate(room.clues.cells) if not v)
+    digit = player.journal.board.solution.cells[cell]
+    server._move(player, {"cell": cell, "digit": digit})
+    assert player.writer.sent[-1]["cell"] == cell and not player.writer.sent[-1]["conflict"]
+    with pytest.raises(ValueError):
+        server._move(player, {"cell": 256, "digit": 1})
+    server.recorder.shutdown()
+
+
+def test_compare_solvers_accepts_any_two_solutions_of_an_open_puzzle(tmp_path, capsys):
+    puzzle, _ = pydoku.generate_puzzle(40, seed=5)
+    cells = [int(v) for v in puzzle.ravel()]
+    for i in [i for i, v in enumerate(cells) if v][:12]:
+        cells[i] = 0
+    path = tmp_path / "open.txt"
+    path.write_text("".join(map(str, cells)) + "\n" + "".join(str(v) for v in puzzle.ravel()) + "\n")
+    assert pydoku.compare_solvers_command([str(path)]) == 0, capsys.readouterr().err
+
+
+def _play_a_little(board, journal):
+    """A correct move, a conflicting one undone and redone, a note, a hint and a cleared cell."""
+    blanks = [i for i, v in enumerate(board.player.cells) if not v]
+    size = board.geometry.size
+    journal.place(blanks[0], board.solution.cells[blanks[0]])
+    row = blanks[1] // size
+    journal.place(blanks[1], next(v for v in board.player.cells[row * size:(row + 1) * size] if v))
+    journal.undo()
+    journal.redo()
+    journal.toggle_note(blanks[2], 5)
+    journal.hint(blanks[3])
+    journal.place(blanks[1], 0)
+    return blanks
+
+
+def test_journal_replay_recomputes_the_game(board):
+    clues = board.player.copy()
+    journal = pydoku.MoveJournal(board, multiplier=2)
+    _play_a_little(board, journal)
+    assert journal.score > 0 and journal.mistakes == 0 and journal.hinted
+    for with_clues in (True, False):
+        data = journal.to_bytes(with_clues)
+        replayed = pydoku.MoveJournal.from_bytes(data, None if with_clues else clues)
+        assert replayed.board.player == board.player
+        assert (replayed.score, replayed.mistakes, replayed.hinted) == (journal.score, journal.mistakes, journal.hinted)
+        assert len(replayed) == len(journal)
+        with pytest.raises(ValueError):
+            pydoku.MoveJournal.from_bytes(data[:-1], None if with_clues else clues)
+    with pytest.raises(ValueError):
+        pydoku.MoveJournal.from_bytes(journal.to_bytes(with_clues=False))
+
+
+def test_snapshot_round_trip_restores_the_game(board):
+    clues = board.player.copy()
+    journal = pydoku.MoveJournal(board, multiplier=3)
+    blanks = _play_a_little(board, journal)
+    snapshot = pydoku.GameSnapshot.of_game("hard", clues, board, journal, elapsed=12.5, paused=True,
+                                           notes_mode=True, selected=(4, 7))
+    loaded = pydoku.GameSnapshot.from_bytes(snapshot.to_bytes())
+    assert (loaded.difficulty, loaded.elapsed, loaded.paused, loaded.notes_mode, loaded.selected) == \
+        ("hard", 12.5, True, True, (4, 7))
+    restored, restored_journal = loaded.restore()
+    assert restored.player == board.player and restored.notes == board.notes
+    assert (restored_journal.score, restored_journal.mistakes, len(restored_journal)) == \
+        (journal.score, journal.mistakes, len(journal))
+    for _ in range(3):  # the undo history survives the save
+        journal.undo()
+        restored_journal.undo()
+        assert restored.player == board.player
+    assert restored.player.cells[blanks[1]] != 0  # back to the conflicting digit
+
+
+def test_puzzle_bank_holds_unique_puzzles_by_difficulty(tmp_path):
+    import random
+    path = str(tmp_path / "bank.bin")
+    assert pydoku.build_bank(path, {"easy": 25, "hard": 40}, 3, seed=1, chunk=2, workers=1) == 0
+    bank = pydoku.PuzzleBank(path)
+    try:
+        assert len(bank) == 6 and bank.count("Easy") == bank.count("hard") == 3
+        for index in range(6):
+            name, puzzle, solution = bank.get(index)
+            assert name == ("easy" if index < 3 else "hard")
+            cells, full = puzzle.ravel().tolist(), solution.ravel().tolist()
+            assert all(v in (0, s) for v, s in zip(cells, full))
+            assert pydoku.BitmaskSolver().count_solutions(cells) == 1
+        assert 3 <= bank.draw("hard", random.Random(2))[0] < 6
+    finally:
+        bank.close()
+    (tmp_path / "junk.bin").write_bytes(b"not a bank")
+    assert pydoku.open_puzzle_bank(str(tmp_path / "junk.bin")) is None
+
+
+def test_leaderboard_migrates_older_databases(tmp_path, board):
+    import sqlite3
+    legacy = tmp_path / "leaderboards.txt"
+    legacy.write_text("ann|900|01:00|2024-01-01|hard\nnot a score\n")
+    fresh = pydoku.Leaderboard(str(tmp_path / "fresh.db"), legacy_path=str(legacy))
+    assert fresh.top() == [(900, "ann", "01:00", "2024-01-01", "hard")]
+    fresh.close()
+
+    # A version 2 database has journals but no puzzle IDs yet
+    path = str(tmp_path / "v2.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE scores (id INTEGER PRIMARY KEY, nickname TEXT NOT NULL, score INTEGER NOT NULL, "
+                 "time TEXT NOT NULL, date TEXT NOT NULL, difficulty TEXT NOT NULL, journal BLOB)")
+    conn.executemany("INSERT INTO scores (nickname, score, time, date, difficulty, journal) VALUES (?, ?, ?, ?, ?, ?)",
+                     [("ann", 900, "01:00", "2024-01-01", "hard", pydoku.MoveJournal(board).to_bytes()),
+                      ("bob", 500, "02:00", "2024-01-02", "hard", None)])
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+    conn.close()
+    leaderboard = pydoku.Leaderboard(path, legacy_path=str(legacy))
+    try:
+        assert leaderboard.conn.execute("PRAGMA user_version").fetchone()[0] == 3
+        assert leaderboard.count() == 2  # the legacy file only seeds new databases
+        assert leaderboard.top(puzzle_id=pydoku.canonical_id(board.player)) == \
+            [(900, "ann", "01:00", "2024-01-01", "hard")]
+    finally:
+        leaderboard.close()
+
+
+def test_puzzle_index_spots_symmetric_copies(board):
+    import numpy as np
+    grid = np.array(board.player.cells).reshape(9, 9)
+    index = pydoku.PuzzleIndex()
+    assert index.add(pydoku.canonical_id(grid), "first")
+    assert not index.add(pydoku.canonical_id(np.rot90(grid)), "rotated")
+    assert index.first_seen(pydoku.canonical_id(grid[::-1])) == "first"
+    assert index.add(pydoku.canonical_id(_game(40, seed=4).player), "other")
+
+
+def test_seeded_puzzles_match_across_processes():
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        remote = executor.submit(pydoku.generate_puzzle, 45, 99).result()
+    local = pydoku.generate_puzzle(45, seed=99)
+    cached = pydoku.PUZZLE_CACHE.get(99, 45)
+    for a, b, c in zip(remote, local, cached):
+        assert (a == b).all() and (b == c).all()
+    assert not (pydoku.generate_puzzle(45, seed=100)[0] == local[0]).all()